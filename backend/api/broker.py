@@ -0,0 +1,200 @@
+import abc
+import asyncio
+import os
+import time
+from typing import Callable, Optional
+from urllib.parse import urlparse
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from log_service.logging_utils import get_logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = get_logger("broker")
+
+# Pub/sub between the app processes (gunicorn workers, dynos), so that a message published by one process
+# reaches the WebSockets connected to all of them. ConnectionRegistry.publish() (api/websockets.py) hands its
+# messages to the broker; the broker delivers every message, including the publisher's own, to the registries
+# subscribed to its namespace in each process.
+#
+# PUBSUB_URL (or REDIS_URL) picks the backend:
+#   unset                            InMemoryBroker: this process only (development, tests, a single worker)
+#   redis://[:password@]host:port    RedisBroker: Redis (or anything speaking its protocol) through redis.asyncio;
+#   rediss://...                     messages are PUBLISHed on PUBSUB_PREFIX:<namespace>:<key>, and every process
+#                                    PSUBSCRIBEs to PUBSUB_PREFIX:*
+# start() returns once the subscription is confirmed. Messages published while Redis is unreachable wait in a
+# bounded queue and are sent when it is back; what the subscription misses while it is re-established cannot
+# be recovered, and both are logged.
+
+PUBSUB_URL = os.getenv("PUBSUB_URL") or os.getenv("REDIS_URL") or ""
+PUBSUB_PREFIX = os.getenv("PUBSUB_PREFIX", "groupgrade")
+PUBSUB_QUEUE_SIZE : int = int(os.getenv("PUBSUB_QUEUE_SIZE", "10000"))
+PUBSUB_SUBSCRIBE_TIMEOUT_SECONDS : float = float(os.getenv("PUBSUB_SUBSCRIBE_TIMEOUT_SECONDS", "5"))
+PUBSUB_RECONNECT_SECONDS : float = float(os.getenv("PUBSUB_RECONNECT_SECONDS", "1"))
+PUBSUB_MAX_RECONNECT_SECONDS = 30.0
+PUBSUB_PUBLISH_BATCH = 500
+
+Handler = Callable[[str, str], None]  # (key, text)
+
+
+class Broker(abc.ABC):
+    local_only = False  # True when messages never leave this process
+
+    def __init__(self):
+        self.handlers : dict[str, Handler] = {}
+
+    def subscribe(self, namespace: str, handler: Handler) -> None:
+        """Have `handler` called with (key, text) for every message published under `namespace`."""
+        self.handlers[namespace] = handler
+
+    def _deliver(self, namespace: str, key: str, text: str) -> None:
+        handler = self.handlers.get(namespace)
+        if handler is not None:
+            handler(key, text)
+
+    @abc.abstractmethod
+    def publish(self, namespace: str, key: str, text: str) -> None:
+        """Queue a message for every process; returns immediately. Safe to call from any thread or event loop."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class InMemoryBroker(Broker):
+    local_only = True
+
+    def publish(self, namespace: str, key: str, text: str) -> None:
+        self._deliver(namespace, key, text)
+
+
+class RedisBroker(Broker):
+    def __init__(self, client: redis.Redis, prefix: str = PUBSUB_PREFIX):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.loop : Optional[asyncio.AbstractEventLoop] = None
+        self.outgoing : Optional[asyncio.Queue] = None
+        self.pubsub = None
+        self.subscribed = False
+        self.tasks : list[asyncio.Task] = []
+
+    def channel(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def publish(self, namespace: str, key: str, text: str) -> None:
+        if self.loop is None:
+            # not started (no lifespan, e.g. a script): nobody else is listening through us either
+            self._deliver(namespace, key, text)
+            return
+        self.loop.call_soon_threadsafe(self._put, self.channel(namespace, key), text)
+
+    def _put(self, channel: str, text: str) -> None:
+        try:
+            self.outgoing.put_nowait((channel, text))
+        except asyncio.QueueFull:
+            logger.error("Pub/sub publish queue full, dropped a message for %s", channel)
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.outgoing = asyncio.Queue(maxsize=PUBSUB_QUEUE_SIZE)
+        try:
+            await self._subscribe()
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            logger.error("Pub/sub subscription failed, retrying in the background: %s", e)
+        self.tasks = [asyncio.create_task(self._publisher()), asyncio.create_task(self._listener())]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.outgoing is not None and not self.outgoing.empty():
+            logger.warning("Pub/sub stopped with %d messages not published", self.outgoing.qsize())
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        self.loop = None
+
+    async def _subscribe(self) -> None:
+        """(Re)open the subscription and wait until Redis confirms it."""
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        self.subscribed = False
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.psubscribe(f"{self.prefix}:*")
+        deadline = time.monotonic() + PUBSUB_SUBSCRIBE_TIMEOUT_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await self.pubsub.get_message(timeout=remaining)
+            if message is not None and message["type"] == "psubscribe":
+                self.subscribed = True
+                return
+        raise asyncio.TimeoutError("Pub/sub subscription was not confirmed")
+
+    async def _listener(self) -> None:
+        delay = PUBSUB_RECONNECT_SECONDS
+        lost_at = None
+        while True:
+            try:
+                if not self.subscribed:
+                    await self._subscribe()
+                    if lost_at is not None:
+                        logger.warning(
+                            "Pub/sub subscription restored; messages published in the last %.0fs by other processes were lost",
+                            time.monotonic() - lost_at,
+                        )
+                    lost_at, delay = None, PUBSUB_RECONNECT_SECONDS
+                message = await self.pubsub.get_message(timeout=None)
+                if message is None or message["type"] != "pmessage":
+                    continue
+                namespace, key = message["channel"].decode()[len(self.prefix) + 1:].split(":", 1)
+                self._deliver(namespace, key, message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError, asyncio.TimeoutError) as e:
+                self.subscribed = False
+                if lost_at is None:
+                    lost_at = time.monotonic()
+                    logger.error("Pub/sub subscription lost, messages from other processes are not delivered until it is back: %s", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, PUBSUB_MAX_RECONNECT_SECONDS)
+
+    async def _publisher(self) -> None:
+        delay = PUBSUB_RECONNECT_SECONDS
+        batch : list[tuple[str, str]] = []
+        while True:
+            if not batch:
+                batch = [await self.outgoing.get()]
+                while not self.outgoing.empty() and len(batch) < PUBSUB_PUBLISH_BATCH:
+                    batch.append(self.outgoing.get_nowait())
+            try:
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for channel, text in batch:
+                        pipe.publish(channel, text)
+                    await pipe.execute()
+                if delay > PUBSUB_RECONNECT_SECONDS:
+                    logger.warning("Pub/sub publishing restored")
+                batch, delay = [], PUBSUB_RECONNECT_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                # keep the batch: it is sent again once Redis is back (new messages queue up behind it meanwhile)
+                logger.error(
+                    "Pub/sub publish failed, %d messages waiting, retrying in %.0fs: %s", len(batch) + self.outgoing.qsize(), delay, e,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, PUBSUB_MAX_RECONNECT_SECONDS)
+
+
+def broker_from_env() -> Broker:
+    if not PUBSUB_URL:
+        return InMemoryBroker()
+    options = {}
+    if urlparse(PUBSUB_URL).scheme == "rediss" and os.getenv("PUBSUB_SSL_VERIFY", "True").lower() != "true":
+        options["ssl_cert_reqs"] = None  # e.g. Heroku Redis' self-signed certificates
+    return RedisBroker(redis.from_url(PUBSUB_URL, **options))
+
+
+broker = broker_from_env()
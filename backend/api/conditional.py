@@ -0,0 +1,42 @@
+import hashlib
+import json
+from typing import Iterable
+from fastapi import Request, Response
+from db.versions import get_versions
+
+# Conditional requests for list endpoints: the ETag of a list is derived from the version counters of the data it
+# depends on (db/versions.py) plus what identifies the request, so an unchanged list is answered with
+# 304 Not Modified after one read of the versions collection, without querying or serializing the list.
+
+# browsers keep the response but revalidate it (If-None-Match) on every request, so 304s work without client code
+CACHE_CONTROL = "private, no-cache"
+# part of every ETag: bump it when the JSON of the list endpoints changes, or after a migration rewrites their data
+RESPONSE_FORMAT = 3
+
+
+async def list_etag(request: Request, keys: Iterable[str], *identity) -> str:
+    """ETag for the list at this URL; `identity` adds request body fields that select the list."""
+    versions = await get_versions(keys)
+    fingerprint = json.dumps([RESPONSE_FORMAT, request.url.path, request.url.query, identity, sorted(versions.items())], default=str)
+    return f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()[:32]}"'
+
+
+def _opaque(tag: str) -> str:
+    # weak comparison: W/"x" and "x" match
+    return tag.strip().removeprefix("W/")
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {_opaque(tag) for tag in header.split(",")}
+    return "*" in tags or _opaque(etag) in tags
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -0,0 +1,68 @@
+import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+from db.query_stats import RequestDbStats, current_request_stats, route_db_stats
+from log_service.logging_utils import request_id_var
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+class DbTimingMiddleware:
+    """
+    Counts the Mongo commands each HTTP request issues (see db.query_stats), returns them in a
+    Server-Timing header and adds them to the per-route totals served by GET /health/db/routes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = current_request_stats.set(stats)
+
+        async def send_with_server_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            current_request_stats.reset(token)
+            # the router stores the matched route in the scope, so requests are grouped by path template
+            route = scope.get("route")
+            route_db_stats.record(f"{scope['method']} {route.path if route else '<unmatched>'}", stats)
+
+
+class RequestIdMiddleware:
+    """
+    Gives every request a correlation id: the caller's X-Request-ID if it sent a usable one, otherwise a new one.
+    The id is attached to every log record written while handling the request and returned in the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or len(request_id) > 128 or not request_id.isprintable():
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
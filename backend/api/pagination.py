@@ -0,0 +1,50 @@
+import base64
+import json
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+
+# Keyset (cursor) pagination: a page ends with the sort key of its last document, and the next page asks for
+# documents strictly after it. Unlike skip/limit the cost of a page does not grow with how deep it is,
+# as long as an index covers (filter fields..., sort field, _id).
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, dict):
+            raise ValueError
+        return values
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def after_cursor(field: Optional[str], cursor: dict, descending: bool = False) -> dict:
+    """
+    Query matching the documents that come after `cursor` when sorted by (field, _id),
+    or by _id alone when field is None. `cursor` holds {"v": last field value, "id": last _id}.
+    """
+    try:
+        last_id = ObjectId(cursor["id"])
+    except (KeyError, InvalidId, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    op = "$lt" if descending else "$gt"
+    if field is None:
+        return {"_id": {op: last_id}}
+    # null / missing values sort before every other value, i.e. first ascending and last descending
+    value = cursor.get("v")
+    if value is None:
+        if descending:
+            return {field: None, "_id": {op: last_id}}
+        return {"$or": [{field: {"$ne": None}}, {field: None, "_id": {op: last_id}}]}
+    after = [{field: {op: value}}, {field: value, "_id": {op: last_id}}]
+    if descending:
+        after.append({field: None})  # {"$lt": value} does not match null
+    return {"$or": after}
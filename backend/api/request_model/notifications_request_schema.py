@@ -16,8 +16,3 @@ class MarkNotificationAsReadRequest(BaseModel):
 class GetNotificationsByUserRequest(BaseModel):
     """Request schema for getting notifications by user."""
     user_email: str # the email of the user that needs to receive the notification
-
-class GetNotificationsByGroupRequest(BaseModel):
-    """Request schema for getting notifications by group."""
-    group_id: str # the group that the notification is related to
-    user_email: str # the email of the user that needs to receive the notification
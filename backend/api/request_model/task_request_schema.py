@@ -0,0 +1,20 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+from db.models import Task
+
+MAX_BULK_TASKS = 200
+
+class BulkCreateTasksRequest(BaseModel):
+    tasks: list[Task] = Field(min_length=1, max_length=MAX_BULK_TASKS)  # same fields as POST /tasks/
+
+class BulkUpdateTaskItem(BaseModel):
+    task_id: str
+    updated_fields: dict  # same fields as PUT /tasks/edit/
+
+class BulkUpdateTasksRequest(BaseModel):
+    updates: list[BulkUpdateTaskItem] = Field(min_length=1, max_length=MAX_BULK_TASKS)
+
+class MoveTaskRequest(BaseModel):
+    status: Optional[str] = None  # column to move to, default: the task's current status
+    previous_id: Optional[str] = None  # task that ends up right above it, None for the top of the column
+    next_id: Optional[str] = None  # task that ends up right below it, None for the bottom of the column
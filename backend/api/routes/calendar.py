@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from db.database import users_collection, groups_collection
+from db.repository import users_repository, groups_repository
 from pydantic import BaseModel
 import openai
 import os
@@ -7,15 +7,18 @@ from dotenv import load_dotenv
 from api.utils import is_valid_email
 import json
 from api.request_model.calendar_request_schema import GetAllFreeTimeRequest, UpdateUserFreeTimeRequest, GetOverlappingTimeSlotRequest, SendCalendarInvitationRequest
-from api.utils import get_current_user
+from api.utils import get_current_user, invalidate_principal
+from db.versions import bump_versions, co_member_keys
 from bson import ObjectId
 from calendar_service.google_calendar_service import google_calendar_client
+from log_service.logging_utils import get_logger
 
 # Load API Key from environment variables
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 calendar_router = APIRouter()
+logger = get_logger("calendar")
 
 # Define a request model
 class ChatRequest(BaseModel):
@@ -31,7 +34,7 @@ async def get_user_freetime_for_user(current_user: dict = Depends(get_current_us
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Email: {user_email} is not a valid email"
             )
-    user = users_collection.find_one({"email": user_email})
+    user = await users_repository.find_one({"email": user_email})
     
     if not user:
         return HTTPException(
@@ -45,7 +48,7 @@ async def get_user_freetime_for_user(current_user: dict = Depends(get_current_us
 @calendar_router.put("/getGroupFreeTime")
 async def get_all_freetime_for_user(request : GetAllFreeTimeRequest, current_user: dict = Depends(get_current_user)):
     free_time_slots = []
-    cur_group = groups_collection.find_one({"_id": ObjectId(request.group_id)})
+    cur_group = await groups_repository.find_one({"_id": ObjectId(request.group_id)})
     if not cur_group:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -53,7 +56,7 @@ async def get_all_freetime_for_user(request : GetAllFreeTimeRequest, current_use
         )
         
     for member_email in cur_group["members"]:
-      user = users_collection.find_one({"email": member_email})
+      user = await users_repository.find_one({"email": member_email}, {"name": 1, "email": 1, "free_time": 1})
       if user is not None:
         if user["free_time"] is not None:
           obj = {
@@ -89,7 +92,7 @@ async def send_calendar_invitation(request :SendCalendarInvitationRequest, curre
     if user_email not in attendee_emails:
         attendee_emails.append(user_email)
         
-    print(f"\n\n\n google_calendar_client: {google_calendar_client}\n\n\n")
+    logger.debug("Creating calendar event for %d attendees", len(attendee_emails))
         
     start_datetime, end_datetime = google_calendar_client.get_next_weekday_datetime(request.day, request.start, request.end)
     
@@ -123,7 +126,7 @@ async def update_free_time(request : UpdateUserFreeTimeRequest, current_user: di
     for day, slots in free_time_added.items():
       if len(slots) > 0:
         slots_to_be_added = [slot.model_dump() for slot in slots]
-        users_collection.update_one(
+        await users_repository.update_one(
           {"email": user_email},
           
           {"$addToSet": {f"free_time.free_time.{day}": {"$each": slots_to_be_added}}}
@@ -132,13 +135,16 @@ async def update_free_time(request : UpdateUserFreeTimeRequest, current_user: di
     for day, slots in free_time_removed.items():
       # print(day)
       for slot in slots:
-            users_collection.update_one(
+            await users_repository.update_one(
                 {"email": user_email},
                 {"$pull": {f"free_time.free_time.{day}": slot.model_dump()}}
             )
     
+    invalidate_principal(user_email)
+    await bump_versions(await co_member_keys(user_email))  # free time is shown in the group lists
+
     # Retrieve the updated user document to send back as response
-    updated_user = users_collection.find_one({"email": user_email})
+    updated_user = await users_repository.find_one({"email": user_email})
     if updated_user:
         updated_user["_id"] = str(updated_user["_id"])
         return {"message": "Free time updated successfully", "data": updated_user["free_time"]}
@@ -231,7 +237,7 @@ async def ask_chatgpt_for_free_time(request: GetOverlappingTimeSlotRequest, curr
     if len(request.free_time_slots) > 0:
         free_time_slots = request.free_time_slots
     else:
-        cur_group = groups_collection.find_one({"_id": ObjectId(request.group_id)})
+        cur_group = await groups_repository.find_one({"_id": ObjectId(request.group_id)})
         # print(f"cur_group: {cur_group}")
         if cur_group is None:
             raise HTTPException(
@@ -240,7 +246,7 @@ async def ask_chatgpt_for_free_time(request: GetOverlappingTimeSlotRequest, curr
             )
 
         for member_email in cur_group["members"]:
-          user = users_collection.find_one({"email": member_email})
+          user = await users_repository.find_one({"email": member_email})
           # print(f"user: {user}")
           if user is not None:
             if len(user["free_time"]) > 0:
@@ -261,7 +267,7 @@ async def ask_chatgpt_for_free_time(request: GetOverlappingTimeSlotRequest, curr
         # Prepare the final prompt
         formatted_prompt = PROMPT_TEMPLATE.format(time_slots=str(processed_slots_json))
         # print("formyed prompts")
-        print(f"\n\nformatted_prompt: {formatted_prompt}\n\n")
+        logger.debug("getOverlappingTime prompt: %d members, %d chars", len(free_time_slots), len(formatted_prompt))
         # Call OpenAI API
         response = openai.ChatCompletion.create(
             model="gpt-4o",  # Use "gpt-4o" for best performance
@@ -326,7 +332,7 @@ async def ask_chatgpt_for_free_time(request : FindMeetingSlotRequest):
             messages=[{"role": "user", "content": formatted_prompt}],
             max_completion_tokens=10000,  # Limit response length
         )
-    print(f"response: { str(response)}")
+    logger.debug("getMeetingTime response usage: %s", response.get("usage"))
     return {"data": response["choices"][0]["message"]["content"]}
   except Exception as e:
     raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR , detail=str(e))
@@ -1,15 +1,19 @@
 import bson.errors
-from fastapi import WebSocket, WebSocketDisconnect, APIRouter, HTTPException, status,Depends
-from db.database import chat_collection
+from fastapi import WebSocket, APIRouter, HTTPException, status, Depends, Query
+from typing import Optional
+from db.repository import chat_repository
+from db.chat_messages import append_chat_message, chat_messages_page, chat_messages_json
 from pydantic import BaseModel
 from bson import ObjectId
-from datetime import datetime
-from api.utils import get_current_user
-import asyncio
+from api.utils import get_current_user, FastJSONResponse
+from api.websockets import ConnectionRegistry, serve
 import bson
+import os
+from log_service.logging_utils import get_logger
 chat_router = APIRouter()
 
-active_connections = {}
+# connection lifecycle messages are logged for this fraction of websockets only
+logger = get_logger("chat", sample_rate=float(os.getenv("CHAT_LOG_SAMPLE_RATE", "0.1")))
 
 class SendMessageQuery(BaseModel):
     chat_id : str
@@ -20,21 +24,61 @@ class CreateChatQuery(BaseModel):
     participants : list[str]
     
     
-@chat_router.get("/api/chat/{group_id}")
-async def get_groupchat(group_id : str, current_user: dict = Depends(get_current_user)):
-    
-    chat = chat_collection.find_one({"group_id": group_id})
+DEFAULT_MESSAGE_PAGE_SIZE = 50  # also the number of messages sent with the chat when it is opened
+MAX_MESSAGE_PAGE_SIZE = 200
+
+
+async def get_chat_of_group(group_id: str, current_user: dict) -> dict:
+    # messages live in db/chat_messages.py buckets, not on the chat document
+    chat = await chat_repository.find_one({"group_id": group_id}, {"chat_history": 0})
     
     if chat is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found")
     
     if current_user["email"] not in chat["participants"]:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    return chat
+
+
+# the chat with its latest messages in "chat_history", oldest first; older ones are paged by /messages
+@chat_router.get("/api/chat/{group_id}")
+async def get_groupchat(group_id : str, current_user: dict = Depends(get_current_user)):
+    
+    chat = await get_chat_of_group(group_id, current_user)
+    messages, has_more = await chat_messages_page(str(chat["_id"]), DEFAULT_MESSAGE_PAGE_SIZE)
     
     chat["_id"] = str(chat["_id"])
     chat["group_id"] = str(chat["group_id"])
-    return {"data": chat, "message": "Successful!"}
-        
+    chat["chat_history"] = chat_messages_json(messages)
+    chat["has_older_messages"] = has_more
+    return FastJSONResponse({"data": chat, "message": "Successful!"})
+
+
+def message_id(value: Optional[str]) -> Optional[ObjectId]:
+    if value is None:
+        return None
+    try:
+        return ObjectId(value)
+    except bson.errors.InvalidId:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid message id {value}")
+
+
+# one page of messages, oldest first: the latest ones, or those just before / after a message the client has;
+# "has_more" tells whether there are more in that direction
+@chat_router.get("/api/chat/{group_id}/messages")
+async def get_chat_messages(
+    group_id: str,
+    limit: int = Query(DEFAULT_MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    before: Optional[str] = Query(None, description="Id of the oldest message the client has"),
+    after: Optional[str] = Query(None, description="Id of the newest message the client has"),
+    current_user: dict = Depends(get_current_user),
+):
+    if before and after:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pass either before or after")
+    chat = await get_chat_of_group(group_id, current_user)
+    messages, has_more = await chat_messages_page(str(chat["_id"]), limit, before=message_id(before), after=message_id(after))
+    return FastJSONResponse({"messages": chat_messages_json(messages), "has_more": has_more})
+    
     
 
 # REST API: Send a message (Stored in DB)
@@ -79,8 +123,9 @@ async def get_groupchat(group_id : str, current_user: dict = Depends(get_current
 
 # wscat -c ws://localhost:8000/api/chat/ws/chat/67d5cf2f40c6349bfba2112d
 
-# Active WebSocket connections
-active_connections = {}
+# Active WebSocket connections of this process; messages are broadcast to those of every process by the
+# pub/sub broker (api/broker.py)
+chat_connections = ConnectionRegistry("chat")
 
 # guide for frontend:
 # The frontend should send a heatbeat message to the websock every 40 seconds
@@ -100,20 +145,18 @@ active_connections = {}
 #    AND
 #   "ws://group-grade-backend-5f919d63857a.herokuapp.com/ws/chat/67d5cf2f40c6349bfba2112d/nzhang@tcd.ie"
 #   to establish the code.
-#  Note: 
-# Due to the limitation of Heroku instances, it may take few seconds for the active connections to be updated in memory.
-# So, after you establish a websocket connection, you should wait for 10-20 seconds before you open a new connection so that
-# both connections are aware of each other.
+#  Note:
+# Both connections may land on different gunicorn workers or dynos; messages still reach both once PUBSUB_URL points
+# at a Redis server (see api/broker.py). "live_users" counts the connections of the worker that sent the message.
 
 
 @chat_router.websocket("/ws/chat/{chat_id}/{sender_email}")
 async def websocket_chat(chat_id: str, sender_email : str, websocket: WebSocket):
-    print(f"New WebSocket connection request for chat: {chat_id}")
     await websocket.accept()
-    print(f"WebSocket connection accepted for chat: {chat_id}")
+    logger.info("WebSocket connection accepted for chat %s", chat_id)
     
     try:
-        chat = chat_collection.find_one({"_id": ObjectId(chat_id)})
+        chat = await chat_repository.find_one({"_id": ObjectId(chat_id)}, {"participants": 1})
     except bson.errors.BSONError:
         await websocket.send_json({"message":f"Chat {chat_id} does not exist"})
         await websocket.close()
@@ -130,66 +173,16 @@ async def websocket_chat(chat_id: str, sender_email : str, websocket: WebSocket)
         await websocket.close()
         return
 
-    # Add WebSocket to active connections
-    if chat_id not in active_connections:
-        active_connections[chat_id] = []
-    print(f"Added websocket to chat: {chat_id}")
-    active_connections[chat_id].append(websocket)
-
-    try:
-        while True:
-            try:
-                # Set a timeout of 30 seconds for receiving messages
-                message = await asyncio.wait_for(websocket.receive_json(), timeout=50)
-                # print("message", message)
-                if "close_connection" in message:
-                    if message["close_connection"] == True or message["close_connection"] == "True":
-                        print(f"Received close request from {message['sender_email']} in chat {chat_id}")
-                        await websocket.send_json({"message":"Close Connection request is successful"})
-                        break
-                    
-                if "is_heartbeat_msg" in message:
-                    if message["is_heartbeat_msg"] == True or message["is_heartbeat_msg"] == "True":
-                        await websocket.send_json({"message": "Health ping received!", "live_users": len(active_connections[chat_id])})
-                        continue
-                
-                # Create message object
-                new_msg_obj = {
-                    "sender": sender_email, 
-                    "message": message["message"],
-                    "delivered_time": datetime.now()  # Use UTC time for consistency
-                }
-            
-                # Save to MongoDB chat history
-                chat_collection.find_one_and_update(
-                    {"_id": ObjectId(chat_id)},
-                    {"$addToSet": {"chat_history": new_msg_obj}},
-                    return_document=True
-                )
-                new_msg_obj["delivered_time"] = new_msg_obj["delivered_time"].isoformat()
-                new_msg_obj["live_users"] = len(active_connections[chat_id])
-                # Broadcast to all clients in this chat
-                for ws  in active_connections[chat_id]:
-                    await ws.send_json(new_msg_obj)
-
-            except asyncio.TimeoutError:
-                print(f"WebSocket for chat {chat_id} inactive for 30s. Closing connection.")
-                
-                break  # Exit the loop to close the connection
-
-    except WebSocketDisconnect:
-        print(f"WebSocket disconnected from chat {chat_id}")
-
-    finally:
-        # Cleanup: Remove WebSocket connection
-        if websocket in active_connections[chat_id]:
-            active_connections[chat_id].remove(websocket)
-        
-        if not active_connections[chat_id]:
-            del active_connections[chat_id]
+    async def on_message(connection, message):
+        # Save to the chat's current message bucket
+        new_msg_obj = chat_messages_json([await append_chat_message(chat_id, sender_email, message["message"])])[0]
+        new_msg_obj["delivered_time"] = new_msg_obj["delivered_time"].isoformat()
+        new_msg_obj["live_users"] = chat_connections.count(chat_id)
+        # Broadcast to all clients in this chat
+        chat_connections.publish(chat_id, new_msg_obj)
 
-        await websocket.close()
-        print(f"WebSocket connection for chat {chat_id} closed")
+    # heartbeats, close requests and cleanup are handled by api/websockets.py
+    await serve(websocket, chat_connections, chat_id, on_message)
 
 
 
@@ -5,7 +5,7 @@ from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Query
 from botocore.exceptions import NoCredentialsError
 from dotenv import load_dotenv
 from bson import ObjectId
-from db.database import db, groups_collection 
+from db.repository import groups_repository, files_repository
 from api.utils import get_current_user
 
 load_dotenv()
@@ -34,7 +34,7 @@ async def get_presigned_url(
     current_user: dict = Depends(get_current_user)
 ):
     # verify the group exists
-    group = groups_collection.find_one({"_id": ObjectId(group_id)})
+    group = await groups_repository.find_one({"_id": ObjectId(group_id)})
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
@@ -43,8 +43,7 @@ async def get_presigned_url(
         raise HTTPException(status_code=403, detail="You are not a member of this group")
     
     # check if the file exists in database and is linked to this group
-    files_collection = db["files"]
-    file_record = files_collection.find_one({"filename": filename, "group_id": group_id})
+    file_record = await files_repository.find_one({"filename": filename, "group_id": group_id})
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
     
@@ -67,7 +66,7 @@ async def get_files_for_group(
 ):
     
     # see if the group exists
-    group = groups_collection.find_one({"_id": ObjectId(group_id)})
+    group = await groups_repository.find_one({"_id": ObjectId(group_id)})
     if not group:
         
         raise HTTPException(status_code=404, detail="group not found")
@@ -78,8 +77,7 @@ async def get_files_for_group(
         raise HTTPException(status_code=403, detail="You are not a member of this group")
     
     # query every file associated with the group
-    files_collection = db["files"]
-    file_records = list(files_collection.find({"group_id": group_id}))
+    file_records = await files_repository.find({"group_id": group_id})
     
     #convert ObjectID and date objects for serialisation
     for file_record in file_records:
@@ -101,7 +99,7 @@ async def upload_file(
 ):
     
     # see if the group exists
-    group = groups_collection.find_one({"_id": ObjectId(group_id)})
+    group = await groups_repository.find_one({"_id": ObjectId(group_id)})
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
@@ -121,7 +119,6 @@ async def upload_file(
     file_url = f"https://{AWS_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{file.filename}"
     
     # store file metadata in MongoDB (using "files" collection)
-    files_collection = db["files"]
     file_metadata = {
         "filename": file.filename,
         "file_url": file_url,
@@ -129,7 +126,7 @@ async def upload_file(
         "uploaded_by": current_user["email"],
         "upload_date": datetime.datetime.utcnow()
     }
-    files_collection.insert_one(file_metadata)
+    await files_repository.insert_one(file_metadata)
     
     return {"message": "File uploaded successfully", "file_url": file_url}
 
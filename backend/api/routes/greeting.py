@@ -1,8 +1,21 @@
 from fastapi import APIRouter
 from typing import Dict
+from db.db_utils import pool_metrics
+from db.query_stats import route_db_stats
 
 greeting_router = APIRouter()
 
 @greeting_router.get("/")
 def hello() -> Dict[str, str]:
-    return {"message": "Hello from GroupGrade server", "vesion": "v6"}
\ No newline at end of file
+    return {"message": "Hello from GroupGrade server", "vesion": "v6"}
+
+@greeting_router.get("/health/db")
+def database_health() -> Dict[str, dict]:
+    """Connection pool counters for this worker (saturation = checked out / maxPoolSize)."""
+    return {"pool": pool_metrics.snapshot()}
+
+
+@greeting_router.get("/health/db/routes")
+def database_route_stats() -> Dict[str, dict]:
+    """Mongo query count and time per route handled by this worker, to spot N+1 query patterns."""
+    return {"routes": route_db_stats.snapshot()}
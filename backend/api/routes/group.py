@@ -1,68 +1,76 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from db.database import groups_collection, users_collection, chat_collection
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from db.repository import groups_repository, users_repository, chat_repository
 from db.models import Group
-from db.schemas import groups_serial, users_serial
+from db.schemas import groups_serial, groups_json, users_json, GROUP_PROJECTION, USER_PROJECTION
 from api.request_model.group_request_schema import CreateGroupRequest, DeleteGroupRequest, UpdateGroupRequest
 from bson import ObjectId
 from email_service.email_utils import email_sender
 from api.utils import is_valid_email
-from api.utils import get_current_user
+from api.utils import get_current_user, FastJSONResponse
+from api.conditional import list_etag, is_not_modified, not_modified, cache_headers
+from db.versions import bump_versions, member_keys, groups_of_user
 from dotenv import load_dotenv
 import os
 from params.frontend_params import frontend_url
+from log_service.logging_utils import get_logger
 
 
 # Load environment variables
 load_dotenv()
 
 group_router = APIRouter()
+logger = get_logger("group")
 
 BASE_URL = "{frontend_url}/confirmMembership/{user_email}/{group_id}"
 
 
 @group_router.get("/")
 async def get_groups_handler(
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     user_email = current_user["email"]
+    etag = None
     if user_email:
-        user = users_collection.find_one({"email": user_email})
+        # unchanged group lists are answered with 304 (api/conditional.py)
+        etag = await list_etag(request, [groups_of_user(user_email)], user_email)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        user = await users_repository.find_one({"email": user_email}, {"groups": 1})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         query = {"_id": {"$in": [ObjectId(group_id) for group_id in user.get("groups", [])]}}
-        groups_cursor = groups_collection.find(query)
+        groups_list = await groups_repository.find(query, GROUP_PROJECTION)
     else:
-        groups_cursor = groups_collection.find()
+        groups_list = await groups_repository.find({}, GROUP_PROJECTION)
 
-    # Retrieve groups and serialize them using your groups_serial function
-    groups_list = list(groups_cursor)
-    groups_data = groups_serial(groups_list)
+    # Retrieve groups and serialize them using your groups_json function
+    groups_data = groups_json(groups_list)
 
     # Collect all member emails from the groups
     member_emails = set()
     for group in groups_list:
         member_emails.update(group.get("members", []))
     # Query the users_collection for all members using the gathered emails
-    users_cursor = users_collection.find({"email": {"$in": list(member_emails)}})
-    users_list = list(users_cursor)
-    serialized_users = users_serial(users_list)  # Use your provided serialization function
+    users_list = await users_repository.find({"email": {"$in": list(member_emails)}}, USER_PROJECTION)
+    serialized_users = users_json(users_list)  # Use your provided serialization function
     # Create a mapping from email to serialized User
-    user_map = {user.email: user for user in serialized_users}
+    user_map = {user["email"]: user for user in serialized_users}
 
     # For each group, attach a new key "members_details" with the corresponding User objects
     groups_with_members = []
     for group in groups_data:
-        group_dict = group.model_dump()
+        group_dict = {"id": group.pop("_id"), **group}
         group_dict["members_details"] = [
-            user_map[email] for email in group.members if email in user_map
+            user_map[email] for email in group["members"] if email in user_map
         ]
         groups_with_members.append(group_dict)
 
-    return {"data": groups_with_members}
+    return FastJSONResponse({"data": groups_with_members}, headers=cache_headers(etag) if etag else None)
 
 @group_router.post("/create", status_code=status.HTTP_201_CREATED)
 async def create_group_handler(request : CreateGroupRequest):
-    user = users_collection.find_one({"email": request.creator_email})
+    user = await users_repository.find_one({"email": request.creator_email})
     if not user:
         raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -81,7 +89,7 @@ async def create_group_handler(request : CreateGroupRequest):
     }
 
     # insert into database
-    inserted_group = groups_collection.insert_one(newGroup)
+    inserted_group = await groups_repository.insert_one(newGroup)
 
     # send invitation email to the user
     send_project_invitation_email(request.members, request.creator_email, str(inserted_group.inserted_id), request.group_name)
@@ -90,7 +98,7 @@ async def create_group_handler(request : CreateGroupRequest):
     newGroup["_id"] = str(inserted_group.inserted_id)
    
     # add group id to the user's "groups" field
-    users_collection.find_one_and_update(
+    await users_repository.find_one_and_update(
         {"email": request.creator_email}, # find by user email
         {"$addToSet": {"groups": str(inserted_group.inserted_id)}}
     , return_document=True)
@@ -99,22 +107,22 @@ async def create_group_handler(request : CreateGroupRequest):
     new_chat = {
         "is_groupchat" : True,
         "participants" : [request.creator_email],
-        "chat_history" : [],
         "group_id": str(inserted_group.inserted_id)
     }
     
-    chat_collection.insert_one(new_chat)
+    await chat_repository.insert_one(new_chat)
+    await bump_versions([groups_of_user(request.creator_email)])
 
     return {"data":newGroup, "message":"Group created successfully"}
 
 @group_router.delete("/deleteGroup",  status_code=status.HTTP_200_OK)
 async def delete_group_handler(request : DeleteGroupRequest):
-    if not users_collection.find_one({"email": request.email}):
+    if not await users_repository.find_one({"email": request.email}):
         raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"User with email {request.creator_email} does not exist."
             )
-    group : Group = groups_serial([groups_collection.find_one({"group": request.group_id})])[0]
+    group : Group = groups_serial([await groups_repository.find_one({"group": request.group_id})])[0]
 
     if request.email not in group.members:
         raise HTTPException(
@@ -125,12 +133,10 @@ async def delete_group_handler(request : DeleteGroupRequest):
 
 @group_router.get("/confirmMembership/{user_email}/{group_id}")
 async def confirm_member(user_email: str, group_id: str):
-    print(f"user email: {user_email}")
-    group = groups_collection.find_one({"_id": ObjectId(group_id)})
-    user = users_collection.find_one({"email":user_email})
-    print(f"user found: {user}")
+    group = await groups_repository.find_one({"_id": ObjectId(group_id)})
+    user = await users_repository.find_one({"email":user_email})
     if not user:
-        print("user not found")
+        logger.info("confirm_member: %s is not a registered user", user_email)
         return HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={"message": f"User with email: '{user_email}' is not a registered user.", "emailNotRegistered": True}
@@ -157,7 +163,7 @@ async def confirm_member(user_email: str, group_id: str):
     # Encode the key by replacing the dot with a placeholder (e.g., "[dot]")
     encoded_email = email_key.replace('.', '[dot]')
     
-    updated_group = groups_collection.find_one_and_update(
+    updated_group = await groups_repository.find_one_and_update(
         {"_id": ObjectId(group_id)},
         {
             "$addToSet": {"members": user_email},
@@ -177,7 +183,7 @@ async def confirm_member(user_email: str, group_id: str):
     updated_user = None
     if group_id not in user["groups"]:
         # add group id to the user's "groups" field
-        updated_user = users_collection.find_one_and_update(
+        updated_user = await users_repository.find_one_and_update(
             {"email": user_email}, # find by user email
             {"$addToSet": {"groups": group_id}}
         , return_document=True)
@@ -189,8 +195,9 @@ async def confirm_member(user_email: str, group_id: str):
                 )
             
     # add new user to the chat   
-    chat_collection.find_one_and_update({"group_id": group_id},
-                                        {"$addToSet": {"participants": user_email}})
+    await chat_repository.find_one_and_update({"group_id": group_id},
+                                              {"$addToSet": {"participants": user_email}})
+    await bump_versions(member_keys([updated_group]))
     
     
     if updated_user:
@@ -318,7 +325,7 @@ def send_project_invitation_email(user_emails:list[str], creator_email:str, new_
 @group_router.put("/updateGroup", status_code=status.HTTP_200_OK)
 async def update_group_handler(request: UpdateGroupRequest):
     # find group
-    group = groups_collection.find_one({"_id": ObjectId(request.group_id)})
+    group = await groups_repository.find_one({"_id": ObjectId(request.group_id)})
     if not group:
         return HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -348,7 +355,7 @@ async def update_group_handler(request: UpdateGroupRequest):
     update_fields["members"] = list(existing_members)
     update_fields["pending_members"] = list(pending_members)
 
-    updated_group = groups_collection.find_one_and_update(
+    updated_group = await groups_repository.find_one_and_update(
         {"_id": ObjectId(request.group_id)}, 
         {"$set": update_fields},
         return_document=True
@@ -360,6 +367,7 @@ async def update_group_handler(request: UpdateGroupRequest):
                 detail={"message": f"Something went wrong when updating the group"}
             )
     
+    await bump_versions(member_keys([group, updated_group]))
     updated_group["_id"] = str(updated_group["_id"])
 
     return {"message": "Group updated successfully", "data": updated_group}
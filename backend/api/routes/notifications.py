@@ -1,16 +1,84 @@
-from db.models import Notification
-from db.database import notifications_collection, groups_collection, users_collection
-from db.schemas import _notification_serial, notifications_serial
-from fastapi import APIRouter, HTTPException
+from db.models import Notification, utc_now
+from db.repository import notifications_repository, groups_repository
+from db.schemas import _notification_serial, notifications_json, NOTIFICATION_PROJECTION
+from fastapi import APIRouter, HTTPException, Request, Query
 from email_service.email_utils import email_sender
-from api.utils import is_valid_email
+from api.utils import is_valid_email, FastJSONResponse
 from bson import ObjectId
-from api.request_model.notifications_request_schema import CreateNotificationRequest, MarkNotificationAsReadRequest, GetNotificationsByUserRequest, GetNotificationsByGroupRequest
+from api.request_model.notifications_request_schema import CreateNotificationRequest, MarkNotificationAsReadRequest, GetNotificationsByUserRequest
 from datetime import datetime
+from typing import Optional
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+from dispatch_service.dispatch_utils import new_job, register_handler
+from api.conditional import list_etag, is_not_modified, not_modified, cache_headers
+from db.versions import bump_versions, notifications_of_user, notifications_of_group
 
 
 notifications_router = APIRouter()
 
+
+def notification_document(request: CreateNotificationRequest, timestamp: Optional[datetime] = None) -> dict:
+    return {
+        "user": request.user_email,
+        "task_id": request.task_id,
+        "group_id": request.group_id,
+        "notification_type": request.notification_type,
+        "message":request.content,
+        "timestamp": timestamp or utc_now(),
+        "read":False
+    }
+
+
+def notification_keys(notifications: list[dict]) -> set[str]:
+    """Versions of the notification lists the given notification documents appear in."""
+    return {key for n in notifications for key in (notifications_of_user(n["user"]), notifications_of_group(n["group_id"]))}
+
+
+def notification_job(request: CreateNotificationRequest) -> dict:
+    """Outbox job creating the notification in the background (see dispatch_service), stamped with the request time."""
+    return new_job("notification", {**request.model_dump(), "requested_at": utc_now()})
+
+
+async def invalid_notifications(requests: dict) -> dict:
+    """The checks of create_notification for {key: CreateNotificationRequest}, with one group lookup: {key: error}."""
+    # email validation may look the domain up, keep it off the event loop
+    errors = await run_in_threadpool(
+        lambda: {key: "Invalid email format" for key, request in requests.items() if not is_valid_email(request.user_email)}
+    )
+    group_ids = {request.group_id for request in requests.values() if ObjectId.is_valid(request.group_id)}
+    existing = {str(group["_id"]) for group in await groups_repository.find({"_id": {"$in": [ObjectId(g) for g in group_ids]}}, {"_id": 1})} if group_ids else set()
+    for key, request in requests.items():
+        if key not in errors and request.group_id not in existing:
+            errors[key] = f"Group with ID {request.group_id} does not exist."
+    return errors
+
+
+async def deliver_notifications(jobs: list[dict]) -> dict:
+    """
+    Dispatch handler: validate the notifications of a batch of jobs like create_notification, then insert the
+    valid ones at once. Each notification reuses its job's _id, so when a retried batch was partly inserted
+    before, the duplicates are simply skipped.
+    """
+    requests = {job["_id"]: CreateNotificationRequest(**{k: v for k, v in job["payload"].items() if k != "requested_at"}) for job in jobs}
+    errors = await invalid_notifications(requests)
+    documents = [{
+        **notification_document(requests[job["_id"]], job["payload"].get("requested_at", job["created_at"])),
+        "_id": job["_id"],
+    } for job in jobs if job["_id"] not in errors]
+    if not documents:
+        return errors
+    try:
+        await notifications_repository.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors.update({error["op"]["_id"]: error["errmsg"] for error in e.details["writeErrors"] if error["code"] != 11000})
+    await bump_versions(notification_keys(documents))
+    return errors
+
+
+register_handler("notification", deliver_notifications)
+
+
 @notifications_router.post("/create_notification")
 async def create_notification(request: CreateNotificationRequest):
     """
@@ -21,28 +89,21 @@ async def create_notification(request: CreateNotificationRequest):
         raise HTTPException(status_code=400, detail="Invalid email format")
 
     # Check if the group exists
-    if not groups_collection.find_one({"_id": ObjectId(request.group_id)}):
+    if not await groups_repository.find_one({"_id": ObjectId(request.group_id)}):
         raise HTTPException(
                 status_code=404,
                 detail=f"Group with ID {request.group_id} does not exist."
             )
 
     # Create a new notification
-    notification = {
-        "user": request.user_email,
-        "task_id": request.task_id,
-        "group_id": request.group_id,
-        "notification_type": request.notification_type,
-        "message":request.content,
-        "timestamp":datetime.now(),
-        "read":False
-    }
+    notification = notification_document(request)
     
     # Send email notification
     # email_sender.send_notification_email(request.user_email, request.notification_type, request.content)
 
     # Insert the notification into the database
-    new_notification = notifications_collection.insert_one(notification)
+    new_notification = await notifications_repository.insert_one(notification)
+    await bump_versions(notification_keys([notification]))
 
     return {
         "message": "Notification created successfully",
@@ -59,85 +120,99 @@ async def mark_notification_as_read(request: MarkNotificationAsReadRequest):
         raise HTTPException(status_code=400, detail="Invalid email format")
 
     # Check if the notification exists
-    notification = notifications_collection.find_one({"_id": ObjectId(request.notification_id)})
+    notification = await notifications_repository.find_one({"_id": ObjectId(request.notification_id)})
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
 
     # Update the notification to mark it as read
-    notifications_collection.update_one(
+    await notifications_repository.update_one(
         {"_id": ObjectId(request.notification_id)},
         {"$set": {"read": True}}
     )
+    await bump_versions(notification_keys([notification]))
 
     return {"message": "Notification marked as read successfully"}
 
 
+# The GET lookups take query parameters so that browsers and proxies can revalidate them with If-None-Match
+# (api/conditional.py); the older POST lookup with a JSON body is always answered in full.
+
 @notifications_router.post("/get_notifications_by_user")
-async def get_notifications_by_user(request: GetNotificationsByUserRequest):
+async def post_notifications_by_user(request: GetNotificationsByUserRequest):
     """
-    Get notifications by user.
+    Get notifications by user (JSON body; GET /get_notifications_by_user?user_email= can be cached).
     """
     if not is_valid_email(request.user_email):
         raise HTTPException(status_code=400, detail="Invalid email format")
 
-    notifications = notifications_serial(
-        notifications_collection.find({"user": request.user_email})
+    notifications = notifications_json(
+        await notifications_repository.find({"user": request.user_email}, NOTIFICATION_PROJECTION)
     )
 
-    return {"notifications": notifications}
+    return FastJSONResponse({"notifications": notifications})
 
 
-@notifications_router.get("/get_notifications_by_group")
-async def get_notifications_by_group(request: GetNotificationsByGroupRequest):
-    """
-    Get notifications by group.
-    """
-    # Check if the group exists
-    if not groups_collection.find_one({"_id": ObjectId(request.group_id)}):
+async def user_notifications(http_request: Request, user_email: str, query: dict):
+    if not is_valid_email(user_email):
+        raise HTTPException(status_code=400, detail="Invalid email format")
+
+    etag = await list_etag(http_request, [notifications_of_user(user_email)], user_email)
+    if is_not_modified(http_request, etag):
+        return not_modified(etag)
+
+    notifications = notifications_json(
+        await notifications_repository.find({"user": user_email, **query}, NOTIFICATION_PROJECTION)
+    )
+
+    return FastJSONResponse({"notifications": notifications}, headers=cache_headers(etag))
+
+
+async def group_notifications(http_request: Request, group_id: str, query: dict):
+    # Check if the group exists (before any 304: a deleted group's old ETag must not look current)
+    if not ObjectId.is_valid(group_id) or not await groups_repository.find_one({"_id": ObjectId(group_id)}, {"_id": 1}):
         raise HTTPException(
                 status_code=404,
-                detail=f"Group with ID {request.group_id} does not exist."
+                detail=f"Group with ID {group_id} does not exist."
             )
 
-    # Find notifications for the group
-    notifications = notifications_serial(
-        notifications_collection.find({"group_id": request.group_id})
+    etag = await list_etag(http_request, [notifications_of_group(group_id)], group_id)
+    if is_not_modified(http_request, etag):
+        return not_modified(etag)
+
+    notifications = notifications_json(
+        await notifications_repository.find({"group_id": group_id, **query}, NOTIFICATION_PROJECTION)
     )
 
-    return {"notifications": notifications}
+    return FastJSONResponse({"notifications": notifications}, headers=cache_headers(etag))
+
+
+@notifications_router.get("/get_notifications_by_user")
+async def get_notifications_by_user(http_request: Request, user_email: str = Query(...)):
+    """
+    Get notifications by user.
+    """
+    return await user_notifications(http_request, user_email, {})
+
+
+@notifications_router.get("/get_notifications_by_group")
+async def get_notifications_by_group(http_request: Request, group_id: str = Query(...)):
+    """
+    Get notifications by group.
+    """
+    return await group_notifications(http_request, group_id, {})
 
 
 @notifications_router.get("/get_unread_notifications_by_user")
-async def get_unread_notifications_by_user(request: GetNotificationsByUserRequest):
+async def get_unread_notifications_by_user(http_request: Request, user_email: str = Query(...)):
     """
     Get unread notifications by user.
     """
-    # Validate email
-    if not is_valid_email(request.user_email):
-        raise HTTPException(status_code=400, detail="Invalid email format")
-
-    # Find unread notifications for the user
-    notifications = notifications_serial(
-        notifications_collection.find({"user": request.user_email, "read": False})
-    )
+    return await user_notifications(http_request, user_email, {"read": False})
 
-    return {"notifications": notifications}
 
 @notifications_router.get("/get_unread_notifications_by_group")
-async def get_unread_notifications_by_group(request: GetNotificationsByGroupRequest):
+async def get_unread_notifications_by_group(http_request: Request, group_id: str = Query(...)):
     """
     Get unread notifications by group.
     """
-    # Check if the group exists
-    if not groups_collection.find_one({"_id": ObjectId(request.group_id)}):
-        raise HTTPException(
-                status_code=404,
-                detail=f"Group with ID {request.group_id} does not exist."
-            )
-
-    # Find unread notifications for the group
-    notifications = notifications_serial(
-        notifications_collection.find({"group_id": request.group_id, "read": False})
-    )
-
-    return {"notifications": notifications}
\ No newline at end of file
+    return await group_notifications(http_request, group_id, {"read": False})
@@ -1,18 +1,23 @@
 from fastapi import APIRouter, HTTPException, status
-from db.database import groups_collection, users_collection, tasks_collection, subteams_collection
+from db.repository import groups_repository, users_repository, tasks_repository, subteams_repository
 from db.models import SubTeam, Task
-from db.schemas import subteams_serial, tasks_serial
+from db.schemas import subteams_json, tasks_serial, SUBTEAM_PROJECTION, TASK_PROJECTION
+from api.utils import FastJSONResponse
+from api.routes.task_events import publish_task_event
 from api.request_model.subteam_request_schema import CreateSubteamRequest, DeleteSubteamRequest, AssignTaskToSubteamRequest, RemoveTaskFromSubteamRequest, GetSubteamsByGroupRequest, GetTasksBySubteamRequest
 from bson import ObjectId
+from db.task_stats import record_task_changes, STATS_FIELDS
+from log_service.logging_utils import get_logger
 
 subteam_router = APIRouter()
+logger = get_logger("subteams")
 
 #### GET Requests ####
 @subteam_router.get("/")
 async def get_subteams():
-    subteams = subteams_serial(subteams_collection.find())
+    subteams = subteams_json(await subteams_repository.find({}, SUBTEAM_PROJECTION))
     #return {"data":subteams}
-    return subteams
+    return FastJSONResponse(subteams)
 
 
     # get subteams within a project
@@ -20,51 +25,47 @@ async def get_subteams():
 async def get_subteams_by_group(request: GetSubteamsByGroupRequest):
     group_id = request.group_id
     # Validate group ID
-    if not groups_collection.find_one({"_id": ObjectId(group_id)}):
+    if not await groups_repository.find_one({"_id": ObjectId(group_id)}):
         raise HTTPException(status_code=400, detail=f"Group {group_id} does not exist")
     
-    subteams = subteams_serial(subteams_collection.find({"group": ObjectId(group_id)}))
-    return {"data": {"group": group_id, "subteams": subteams}}
+    subteams = subteams_json(await subteams_repository.find({"group": ObjectId(group_id)}, SUBTEAM_PROJECTION))
+    return FastJSONResponse({"data": {"group": group_id, "subteams": subteams}})
 
 
     # get all task for a subteam
 @subteam_router.get("/getTasksBySubteam")
 async def get_tasks_by_subteam(request: GetTasksBySubteamRequest):
     subteam_id = request.subteam_id   
-    subteam = subteams_collection.find_one({"_id": ObjectId(subteam_id)})
+    subteam = await subteams_repository.find_one({"_id": ObjectId(subteam_id)})
     # Check if subteam exists
     if not subteam:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Subteam with id {subteam_id} does not exist."
             )
-    tasks = []
-    for task_id in subteam["tasks"]:
-        task = tasks_collection.find_one({"_id": ObjectId(task_id)})
-        tasks.append(task)
-    tasks = tasks_serial(tasks)
-    return {"data": {"subteam": subteam_id, "tasks": tasks}}
+    # fetch all of the subteam's tasks in one query, then put them back in the subteam's order
+    task_ids = [ObjectId(task_id) for task_id in subteam.get("tasks", [])]
+    tasks_by_id = {task["_id"]: task for task in await tasks_repository.find({"_id": {"$in": task_ids}}, TASK_PROJECTION)}
+    tasks = tasks_serial(tasks_by_id[task_id] for task_id in task_ids if task_id in tasks_by_id)
+    return FastJSONResponse({"data": {"subteam": subteam_id, "tasks": tasks}})
 
 #### POST Requests ####
 @subteam_router.post("/createSubteam", status_code=status.HTTP_201_CREATED)
 async def create_subteam(request : CreateSubteamRequest):
     # Check if team_name already exists
-    if subteams_collection.find_one({"team_name": request.team_name}):
+    if await subteams_repository.find_one({"team_name": request.team_name}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Team {request.team_name} already exists"
             )
-    print("no duplicate team_name")
     # Validate group ID
-    if not groups_collection.find_one({"_id": ObjectId(request.group)}):
-        print("group does not exist")
+    if not await groups_repository.find_one({"_id": ObjectId(request.group)}):
         raise HTTPException(status_code=400, detail=f"Group {request.group} does not exist")
     
     # Validate member IDs
     valid_member_ids = []
     for member_id in request.members:
-        if not users_collection.find_one({"email": member_id}):
-            print("user_doesnt exist")
+        if not await users_repository.find_one({"email": member_id}):
             raise HTTPException(status_code=400, detail=f"User {member_id} does not exist")
         valid_member_ids.append(member_id)
 
@@ -72,7 +73,7 @@ async def create_subteam(request : CreateSubteamRequest):
     valid_task_ids = []
     if request.tasks:
         for task_id in request.tasks:
-            if not tasks_collection.find_one({"_id": ObjectId(task_id)}):
+            if not await tasks_repository.find_one({"_id": ObjectId(task_id)}):
                 raise HTTPException(status_code=400, detail=f"Task {task_id} does not exist")
             valid_task_ids.append(task_id)
 
@@ -83,11 +84,9 @@ async def create_subteam(request : CreateSubteamRequest):
         "group": ObjectId(request.group),
         "tasks": valid_task_ids
     }
-    print("prepare to inster new subteam")
-
     # Insert subteam
-    inserted_subteam = subteams_collection.insert_one(newSubTeam)
-    print("after inster new subteam")
+    inserted_subteam = await subteams_repository.insert_one(newSubTeam)
+    logger.debug("Created subteam %s in group %s", inserted_subteam.inserted_id, request.group)
     # created_subteam = subteams_collection.find_one({"team_name": request.team_name})
     newSubTeam["_id"] = str(inserted_subteam.inserted_id)
     newSubTeam["group"] = str(newSubTeam["group"])
@@ -104,27 +103,27 @@ async def create_subteam(request : CreateSubteamRequest):
 @subteam_router.delete("/deleteSubteam",  status_code=status.HTTP_201_CREATED)
 async def delete_subteam(request : DeleteSubteamRequest):
     # Check if subteam exists
-    if not subteams_collection.find_one({"team_name": request.team_name}):
+    if not await subteams_repository.find_one({"team_name": request.team_name}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Subteam with team name {request.team_name} does not exist."
             )
     
     # Check if member exists
-    if not users_collection.find_one({"email": request.email}):
+    if not await users_repository.find_one({"email": request.email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"User with email {request.email} does not exist."
             )
     
     # delete subteam from user
-    users_collection.update_many(
+    await users_repository.update_many(
         {},
         {"$pull": {"subteams": request.team_name}}
     )
 
     # Delete subteam
-    subteams_collection.delete_one({"team_name": request.team_name})
+    await subteams_repository.delete_one({"team_name": request.team_name})
 
     return {"message": "Deletion was successful"}
 
@@ -135,32 +134,35 @@ async def delete_subteam(request : DeleteSubteamRequest):
 async def assign_task_to_subteam(request: AssignTaskToSubteamRequest):
     subteam_id = request.subteam_id
     # Check if subteam exists
-    if not subteams_collection.find_one({"_id": ObjectId(subteam_id)}):
+    if not await subteams_repository.find_one({"_id": ObjectId(subteam_id)}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Subteam with id {subteam_id} does not exist."
             )
     
-    subteam = subteams_collection.find_one({"_id": ObjectId(subteam_id)})
+    subteam = await subteams_repository.find_one({"_id": ObjectId(subteam_id)})
     
     # Check if task exists
-    if not tasks_collection.find_one({"_id": ObjectId(request.task_id)}):
+    task = await tasks_repository.find_one({"_id": ObjectId(request.task_id)}, STATS_FIELDS)
+    if not task:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Task with ID {request.task_id} does not exist."
             )
     
     # Update subteam
-    subteams_collection.update_one(
+    await subteams_repository.update_one(
         {"_id": ObjectId(request.subteam_id)},
         {"$push": {"tasks": request.task_id}}
     )
 
     # Update task
-    tasks_collection.update_one(
+    await tasks_repository.update_one(
         {"_id": ObjectId(request.task_id)},
         {"$set": {"subteam": request.subteam_id}}
     )
+    await record_task_changes([(task, {**task, "subteam": request.subteam_id})])
+    publish_task_event(task["group"], "task_updated", request.task_id, changes={"subteam": request.subteam_id})
 
     return {"message": "Task assigned to subteam successfully.", "data": {"subteam": request.subteam_id, "task": request.task_id}}
 
@@ -168,29 +170,32 @@ async def assign_task_to_subteam(request: AssignTaskToSubteamRequest):
 @subteam_router.put("/removeTaskFromSubteam", status_code=status.HTTP_201_CREATED)
 async def remove_task_from_subteam(request: RemoveTaskFromSubteamRequest):
     # Check if subteam exists
-    if not subteams_collection.find_one({"team_name": request.team_name}):
+    if not await subteams_repository.find_one({"team_name": request.team_name}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Subteam with team name {request.team_name} does not exist."
             )
     
     # Check if task exists
-    if not tasks_collection.find_one({"_id": ObjectId(request.task)}):
+    task = await tasks_repository.find_one({"_id": ObjectId(request.task)}, STATS_FIELDS)
+    if not task:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Task with ID {request.task} does not exist."
             )
     
     # Update subteam
-    subteams_collection.update_one(
+    await subteams_repository.update_one(
         {"team_name": request.team_name},
         {"$pull": {"tasks": request.task}}
     )
 
     # Update task
-    tasks_collection.update_one(
+    await tasks_repository.update_one(
         {"_id": ObjectId(request.task)},
         {"$unset": {"subteam": request.team_name}}
     )
+    await record_task_changes([(task, {**task, "subteam": None})])
+    publish_task_event(task["group"], "task_updated", request.task, changes={"subteam": None})
 
     return {"message": "Task removed from subteam successfully"}
\ No newline at end of file
@@ -0,0 +1,70 @@
+import bson.errors
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, WebSocket
+from starlette.concurrency import run_in_threadpool
+from starlette.status import WS_1008_POLICY_VIOLATION
+from api.utils import principal_from_token, websocket_token
+from api.websockets import ConnectionRegistry, serve
+from db.models import utc_now
+from db.repository import groups_repository
+from log_service.logging_utils import get_logger
+
+task_events_router = APIRouter()
+logger = get_logger("task_events")
+
+# Live task board: members of a group keep a socket open on /ws/tasks/{group_id}/{user_email} (authenticated with
+# their login token, see websocket_token() in api/utils.py; user_email must be theirs) and receive the
+# changes the task routes (tasks.py, subteams.py) make in that group as they happen, instead of re-polling:
+#   {"type": "task_created",   "group_id": ..., "task_id": ..., "task": {...task json...}, "time": ...}
+#   {"type": "task_updated",   "group_id": ..., "task_id": ..., "changes": {field: new value}, "time": ...}
+#   {"type": "task_assigned",  "group_id": ..., "task_id": ..., "assigned_to": email, "time": ...}
+#   {"type": "task_moved",     "group_id": ..., "task_id": ..., "status": ..., "rank": ..., "time": ...}
+#   {"type": "task_commented", "group_id": ..., "task_id": ..., "comment": {...}, "comment_count": n, "time": ...}
+#   {"type": "task_archived",  "group_id": ..., "task_id": ..., "time": ...}
+# Heartbeats and close requests follow the chat protocol (api/websockets.py). Events reach the sockets connected
+# to every app process through the pub/sub broker (api/broker.py).
+
+TASK_EVENT_TYPES = ("task_created", "task_updated", "task_assigned", "task_moved", "task_commented", "task_archived")
+
+task_event_connections = ConnectionRegistry("tasks")
+
+
+def publish_task_event(group_id: str, event_type: str, task_id: str, **delta) -> None:
+    """Push a task change to the group's subscribers; returns immediately."""
+    task_event_connections.publish(str(group_id), {
+        "type": event_type,
+        "group_id": str(group_id),
+        "task_id": str(task_id),
+        **delta,
+        "time": utc_now(),
+    })
+
+
+@task_events_router.websocket("/ws/tasks/{group_id}/{user_email}")
+async def websocket_task_events(group_id: str, user_email: str, websocket: WebSocket):
+    token, subprotocol = websocket_token(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+
+    # the handshake is authenticated like the HTTP routes (get_current_user); the email in the path must be the caller's
+    try:
+        principal = await run_in_threadpool(principal_from_token, token or "")
+    except HTTPException as e:
+        await websocket.send_json({"message": e.detail})
+        await websocket.close(code=WS_1008_POLICY_VIOLATION)
+        return
+
+    try:
+        group = await groups_repository.find_one({"_id": ObjectId(group_id)}, {"members": 1})
+    except bson.errors.BSONError:
+        group = None
+    if not group:
+        await websocket.send_json({"message": f"Group {group_id} does not exist"})
+        await websocket.close()
+        return
+    if user_email != principal["email"] or principal["email"] not in group["members"]:
+        await websocket.send_json({"message": "You are not authorized to follow this group"})
+        await websocket.close(code=WS_1008_POLICY_VIOLATION)
+        return
+
+    logger.info("Task events socket opened for group %s", group_id)
+    await serve(websocket, task_event_connections, group_id)
@@ -1,36 +1,411 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Dict, Optional
-from db.database import groups_collection, users_collection, tasks_collection, subteams_collection
-from db.models import User, Group, Task, Notification
-from db.schemas import users_serial, groups_serial, tasks_serial
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Header
+from typing import Dict, Literal, Optional
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from db.repository import groups_repository, users_repository, tasks_repository, subteams_repository, comments_repository, task_stats_repository, archived_tasks_repository, status_log_repository, status_daily_repository
+from db.models import User, Group, Task, Notification, VALID_TASK_STATUSES, VALID_TASK_PRIORITIES, parse_due_date, utc_now
+from db.task_stats import record_task_changes, stats_json, OPEN_STATUSES, STATS_FIELDS
+from db.task_search import task_search_tokens, with_search_tokens, comment_search_tokens, query_terms, search_filter, rank, SEARCH_CANDIDATES
+from db.task_rank import rank_between, needs_rebalance, rebalance_column
+from db.status_log import analytics_json
+from db.schemas import users_serial, groups_serial, tasks_serial, comments_json, TASK_PROJECTION
 from bson import ObjectId # mongodb uses ObjectId to store _id
 from typing import List
-from datetime import datetime
+from datetime import datetime, timedelta
 from api.request_model.comment_request_schema import AddCommentRequest
-from api.utils import get_current_user 
+from api.request_model.task_request_schema import BulkCreateTasksRequest, BulkUpdateTasksRequest, MoveTaskRequest
+from api.utils import get_current_user, FastJSONResponse
+from api.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, after_cursor
+from api.conditional import list_etag, is_not_modified, not_modified, cache_headers
+from db.versions import bump_versions, task_keys, member_keys, tasks_of_group, tasks_of_user
+from db.idempotency import (
+    IDEMPOTENCY_KEY_HEADER, MAX_IDEMPOTENCY_KEY_LENGTH, request_fingerprint, claim_idempotency_key,
+    save_idempotent_response, release_idempotency_key, task_dedupe_key,
+)
 from api.utils import is_valid_email 
-from api.routes.notifications import create_notification
+from api.routes.notifications import notification_job
+from api.routes.task_events import publish_task_event
 from api.request_model.notifications_request_schema import CreateNotificationRequest
 from email_service.email_utils import email_sender
 from params.frontend_params import frontend_url
+from starlette.concurrency import run_in_threadpool
+from dispatch_service.dispatch_utils import new_job, enqueue, register_handler
+from log_service.logging_utils import get_logger
 tasks_router = APIRouter()
+logger = get_logger("tasks")
 
 
 
-# returns all tasks or tasks assigned to a specific user
+DEFAULT_TASK_PAGE_SIZE = 100
+MAX_TASK_PAGE_SIZE = 500
+# sort option -> (sort field, or None for creation order via _id; descending)
+TASK_SORTS = {
+    "due_date": ("due_date", False),
+    "-due_date": ("due_date", True),
+    "created": (None, False),
+    "-created": (None, True),
+}
+
+
+# returns one page of tasks, optionally filtered; the cursor of the next page is in the X-Next-Cursor header
 @tasks_router.get("/tasks/")
-async def get_tasks(assigned_to: Optional[str] = Query(None, description="User email to filter tasks, or blank for all tasks")):
-    query = {} if not assigned_to else {"assigned_to": assigned_to}
-    tasks = tasks_serial(tasks_collection.find(query))
-    return tasks
+async def get_tasks(
+    request: Request,
+    assigned_to: Optional[str] = Query(None, description="User email to filter tasks, or blank for all tasks"),
+    group: Optional[str] = Query(None, description="Group id"),
+    task_status: Optional[str] = Query(None, alias="status"),
+    priority: Optional[str] = Query(None),
+    label: Optional[str] = Query(None),
+    due_from: Optional[str] = Query(None, description="Earliest due date (YYYY-MM-DD or ISO datetime), inclusive"),
+    due_to: Optional[str] = Query(None, description="Latest due date (YYYY-MM-DD or ISO datetime), inclusive"),
+    sort: Literal["due_date", "-due_date", "created", "-created"] = Query("due_date"),
+    limit: int = Query(DEFAULT_TASK_PAGE_SIZE, ge=1, le=MAX_TASK_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+):
+    # a group's or a user's list can be revalidated with If-None-Match (api/conditional.py)
+    version_keys = ([tasks_of_group(group)] if group else []) + ([tasks_of_user(assigned_to)] if assigned_to else [])
+    etag = await list_etag(request, version_keys) if version_keys else None
+    if etag and is_not_modified(request, etag):
+        return not_modified(etag)
+
+    query = {}
+    if assigned_to:
+        query["assigned_to"] = assigned_to
+    if group:
+        query["group"] = group
+    if task_status:
+        query["status"] = task_status
+    if priority:
+        query["priority"] = priority
+    if label:
+        query["labels"] = label
+    if due_from or due_to:
+        query["due_date"] = due_range(due_from, due_to)
+
+    field, descending = TASK_SORTS[sort]
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("s") != sort:
+            raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+        if field == "due_date":
+            position["v"] = cursor_datetime(position)
+        query = {"$and": [query, after_cursor(field, position, descending)]} if query else after_cursor(field, position, descending)
+
+    direction = DESCENDING if descending else ASCENDING
+    sort_keys = [(field, direction), ("_id", direction)] if field else [("_id", direction)]
+    tasks = await tasks_repository.find(query, TASK_PROJECTION, sort=sort_keys, limit=limit + 1)
+
+    headers = cache_headers(etag) if etag else {}
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"s": sort, "v": cursor_value(last.get(field)) if field else None, "id": str(last["_id"])})
+    return FastJSONResponse(tasks_serial(tasks), headers=headers)
+
+
+def due_range(due_from: Optional[str], due_to: Optional[str]) -> dict:
+    """due_date condition for an inclusive range; a date alone as the upper bound includes that whole day."""
+    try:
+        condition = {}
+        if due_from:
+            condition["$gte"] = parse_due_date(due_from)
+        if due_to:
+            end = parse_due_date(due_to)
+            if len(due_to.strip()) == 10:
+                condition["$lt"] = end + timedelta(days=1)
+            else:
+                condition["$lte"] = end
+        return condition
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def cursor_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def cursor_datetime(position: dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(position["v"]) if position.get("v") is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def start_of_today() -> datetime:
+    # a task is overdue once the day it is due has passed (UTC), like the YYYY-MM-DD comparison it replaces
+    return utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def due_tasks_page(scope: dict, due_date: dict, limit: int, cursor: Optional[str]) -> FastJSONResponse:
+    """One page of the open tasks in scope whose due date matches `due_date`, soonest first."""
+    query = {**scope, "status": {"$in": OPEN_STATUSES}, "due_date": due_date}
+    if cursor:
+        position = decode_cursor(cursor)
+        position["v"] = cursor_datetime(position)
+        query = {"$and": [query, after_cursor("due_date", position)]}
+    tasks = await tasks_repository.find(query, TASK_PROJECTION, sort=[("due_date", ASCENDING), ("_id", ASCENDING)], limit=limit + 1)
+
+    headers = {}
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"v": cursor_value(tasks[-1]["due_date"]), "id": str(tasks[-1]["_id"])})
+    return FastJSONResponse(tasks_serial(tasks), headers=headers)
+
+
+def task_scope(group: Optional[str], user: Optional[str]) -> dict:
+    if bool(group) == bool(user):
+        raise HTTPException(status_code=400, detail="Pass either group or user")
+    return {"group": group} if group else {"assigned_to": user}
+
+
+# open tasks due between today and `days` days from now, soonest first
+@tasks_router.get("/tasks/upcoming")
+async def get_upcoming_tasks(
+    group: Optional[str] = Query(None, description="Group id"),
+    user: Optional[str] = Query(None, description="User email"),
+    days: int = Query(7, ge=0, le=366, description="0 means due today"),
+    limit: int = Query(DEFAULT_TASK_PAGE_SIZE, ge=1, le=MAX_TASK_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+):
+    today = start_of_today()
+    return await due_tasks_page(task_scope(group, user), {"$gte": today, "$lt": today + timedelta(days=days + 1)}, limit, cursor)
+
+
+# open tasks whose due day has passed, oldest first
+@tasks_router.get("/tasks/overdue")
+async def get_overdue_tasks(
+    group: Optional[str] = Query(None, description="Group id"),
+    user: Optional[str] = Query(None, description="User email"),
+    limit: int = Query(DEFAULT_TASK_PAGE_SIZE, ge=1, le=MAX_TASK_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+):
+    return await due_tasks_page(task_scope(group, user), {"$lt": start_of_today()}, limit, cursor)
+
+
+# task counts by status / priority / overdue, for a group (with per-member and per-subteam breakdowns) or a user
+@tasks_router.get("/tasks/stats")
+async def get_task_stats(
+    group: Optional[str] = Query(None, description="Group id"),
+    user: Optional[str] = Query(None, description="User email, counts across all their groups"),
+):
+    if bool(group) == bool(user):
+        raise HTTPException(status_code=400, detail="Pass either group or user")
+
+    # counters are maintained on every task write (db/task_stats.py); only overdue tasks are counted here
+    overdue_match = {"status": {"$in": OPEN_STATUSES}, "due_date": {"$lt": start_of_today()}}
+
+    if group:
+        counters = await task_stats_repository.find({"group": group})
+        overdue = (await tasks_repository.aggregate([
+            {"$match": {"group": group, **overdue_match}},
+            {"$facet": {
+                "group": [{"$count": "n"}],
+                "users": [{"$unwind": "$assigned_to"}, {"$group": {"_id": "$assigned_to", "n": {"$sum": 1}}}],
+                "subteams": [{"$match": {"subteam": {"$ne": None}}}, {"$group": {"_id": "$subteam", "n": {"$sum": 1}}}],
+            }},
+        ]))[0]
+        overdue_by_user = {entry["_id"]: entry["n"] for entry in overdue["users"]}
+        overdue_by_subteam = {str(entry["_id"]): entry["n"] for entry in overdue["subteams"]}
+        return {
+            "group": stats_json(
+                next((c for c in counters if c["scope"] == "group"), None),
+                overdue["group"][0]["n"] if overdue["group"] else 0,
+            ),
+            "users": {c["user"]: stats_json(c, overdue_by_user.get(c["user"], 0)) for c in counters if c["scope"] == "user"},
+            "subteams": {c["subteam"]: stats_json(c, overdue_by_subteam.get(c["subteam"], 0)) for c in counters if c["scope"] == "subteam"},
+        }
+
+    counters = await task_stats_repository.find({"user": user})
+    overdue_by_group = {entry["_id"]: entry["n"] for entry in await tasks_repository.aggregate([
+        {"$match": {"assigned_to": user, **overdue_match}},
+        {"$group": {"_id": "$group", "n": {"$sum": 1}}},
+    ])}
+    totals = {"total": 0, "status": {}, "priority": {}}
+    for c in counters:
+        totals["total"] += c.get("total", 0)
+        for field in ("status", "priority"):
+            for value, n in c.get(field, {}).items():
+                totals[field][value] = totals[field].get(value, 0) + n
+    return {
+        "user": stats_json(totals, sum(overdue_by_group.values())),
+        "groups": {c["group"]: stats_json(c, overdue_by_group.get(c["group"], 0)) for c in counters},
+    }
+
+
+MAX_ANALYTICS_WEEKS = 104
+
+
+# lead time, cycle time and throughput of a group or a user over the last `weeks` weeks (this one included), from
+# the daily summaries of the status log (db/status_log.py); today's numbers lag by up to a roll-up interval
+@tasks_router.get("/tasks/analytics")
+async def get_task_analytics(
+    group: Optional[str] = Query(None, description="Group id"),
+    user: Optional[str] = Query(None, description="User email, across all their groups"),
+    weeks: int = Query(12, ge=1, le=MAX_ANALYTICS_WEEKS),
+):
+    if bool(group) == bool(user):
+        raise HTTPException(status_code=400, detail="Pass either group or user")
+    today = start_of_today()
+    since = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    scope = {"scope": "group", "group": group} if group else {"scope": "user", "user": user}
+    summaries = await status_daily_repository.find({**scope, "day": {"$gte": since}}, {"_id": 0, "scope": 0, "group": 0, "user": 0})
+    return FastJSONResponse({**({"group": group} if group else {"user": user}), **analytics_json(summaries, since, weeks)})
+
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+# searches task names, descriptions, labels and comments in a group or among a user's tasks, best matches first;
+# every word of q must match the start of a word in the task
+@tasks_router.get("/tasks/search")
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    group: Optional[str] = Query(None, description="Group id"),
+    user: Optional[str] = Query(None, description="User email, searches the tasks assigned to them"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+):
+    if bool(group) == bool(user):
+        raise HTTPException(status_code=400, detail="Pass either group or user")
+    terms = query_terms(q)
+    if not terms:
+        return FastJSONResponse([])
+
+    scope = {"group": group} if group else {"assigned_to": user}
+    candidates = await tasks_repository.find(
+        search_filter(scope, terms), {**TASK_PROJECTION, "comment_tokens": 1}, limit=SEARCH_CANDIDATES,
+    )
+    ranked = [task for score, task in rank(candidates, terms)[:limit]]
+    return FastJSONResponse(tasks_serial(ranked))
+
+
+MAX_BOARD_TASKS = 2000
+
+
+# the tasks of a group by status column, each column in board order (see db/task_rank.py)
+@tasks_router.get("/tasks/board")
+async def get_board(request: Request, group: str = Query(..., description="Group id")):
+    etag = await list_etag(request, [tasks_of_group(group)])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    tasks = await tasks_repository.find(
+        {"group": group}, TASK_PROJECTION, sort=[("status", ASCENDING), ("rank", ASCENDING), ("_id", ASCENDING)], limit=MAX_BOARD_TASKS,
+    )
+    columns = {status: [] for status in VALID_TASK_STATUSES}
+    for task in tasks_serial(tasks):
+        columns.setdefault(task["status"], []).append(task)
+    return FastJSONResponse({"group": group, "columns": columns}, headers=cache_headers(etag))
+
+
+# completed tasks moved to the archive (dispatch_service/archiver.py) of a group or a user, most recently completed first
+@tasks_router.get("/tasks/archive")
+async def get_archived_tasks(
+    group: Optional[str] = Query(None, description="Group id"),
+    user: Optional[str] = Query(None, description="User email"),
+    limit: int = Query(DEFAULT_TASK_PAGE_SIZE, ge=1, le=MAX_TASK_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+):
+    query = task_scope(group, user)
+    if cursor:
+        position = decode_cursor(cursor)
+        position["v"] = cursor_datetime(position)
+        query = {"$and": [query, after_cursor("completed_at", position, descending=True)]}
+    tasks = await archived_tasks_repository.find(
+        query, TASK_PROJECTION, sort=[("completed_at", DESCENDING), ("_id", DESCENDING)], limit=limit + 1,
+    )
+
+    headers = {}
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"v": cursor_value(tasks[-1]["completed_at"]), "id": str(tasks[-1]["_id"])})
+    return FastJSONResponse(tasks_serial(tasks), headers=headers)
+
+
+UPDATABLE_TASK_FIELDS = ["name", "description", "due_date", "status", "priority", "labels"]
+ASSIGNEE_PROJECTION = {"email": 1, "name": 1}
+
+
+DUPLICATE_TASK_DETAIL = "Task already exists for this user/subteam in the group"
+
+
+def completed_at(task_status: str) -> Optional[datetime]:
+    # when the task was completed, for the archiver (dispatch_service/archiver.py)
+    return utc_now() if task_status == "Completed" else None
+
+
+def derived_task_fields(task_data: dict) -> dict:
+    """
+    Fields stored alongside a new task: its search words, its dedupe key, the pending due-date reminder, completion
+    time and (empty) comment summary.
+    """
+    return {
+        "comment_count": 0,
+        "latest_comment": None,
+        "search_tokens": task_search_tokens(task_data),
+        "dedupe_key": task_dedupe_key(task_data["group"], task_data["name"], task_data["assigned_to"]),
+        "reminder_sent": False,
+        "completed_at": completed_at(task_data["status"]),
+    }
+
+
+def task_update_set(task: dict, update_data: dict) -> dict:
+    """
+    $set document for an update of `task`; a new due date gets a new reminder, a new name a new dedupe key and
+    a new status a new completion time.
+    """
+    update_set = with_search_tokens(task, update_data)
+    if "due_date" in update_data:
+        update_set = {**update_set, "reminder_sent": False}
+    if "name" in update_data:
+        update_set = {**update_set, "dedupe_key": task_dedupe_key(task["group"], update_data["name"], task["assigned_to"])}
+    if update_data.get("status", task.get("status")) != task.get("status"):
+        update_set = {**update_set, "completed_at": completed_at(update_data["status"])}
+    return update_set
+
+
+async def resolve_users(emails: list[str]) -> dict[str, dict]:
+    """Look up all of `emails` with a single query: {email: user} for the ones that are registered."""
+    users = await users_repository.find({"email": {"$in": list(set(emails))}}, ASSIGNEE_PROJECTION)
+    return {user["email"]: user for user in users}
 
 
 #creates task and assigns it to user
+# with an Idempotency-Key header, retries of the same request get the first response back and create nothing
 @tasks_router.post("/tasks/")
-async def create_task(task: Task):
+async def create_task(
+    task: Task,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
+):
+    if not idempotency_key:
+        return await insert_task(task)
+
+    fingerprint = request_fingerprint(task.model_dump(mode="json"))
+    previous = await claim_idempotency_key("create_task", idempotency_key, fingerprint)
+    if previous is not None:
+        return replayed_response(previous, fingerprint)
+    try:
+        response = await insert_task(task)
+    except Exception:
+        await release_idempotency_key("create_task", idempotency_key)
+        raise
+    await save_idempotent_response("create_task", idempotency_key, 200, response)
+    return response
+
+
+def replayed_response(previous: dict, fingerprint: str) -> FastJSONResponse:
+    """What a retry gets: the stored response, or an error when the key cannot be replayed."""
+    if previous["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request")
+    if previous["status"] != "done":
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress, retry later")
+    return FastJSONResponse(previous["response"], status_code=previous["status_code"], headers={"Idempotent-Replayed": "true"})
+
+
+async def insert_task(task: Task) -> dict:
 
     # Validate group
-    assigned_group = groups_collection.find_one({"_id": ObjectId(task.group)})
+    assigned_group = await groups_repository.find_one({"_id": ObjectId(task.group)})
     if not assigned_group:
         raise HTTPException(status_code=400, detail=f"Group {task.group} does not exist")
 
@@ -40,7 +415,7 @@ async def create_task(task: Task):
     if len(assigned_to) == 1:
         possible_subteam_id = assigned_to[0]
         try:
-            subteam = subteams_collection.find_one({"_id": ObjectId(possible_subteam_id)})
+            subteam = await subteams_repository.find_one({"_id": ObjectId(possible_subteam_id)})
         except:
             subteam = None
 
@@ -53,69 +428,58 @@ async def create_task(task: Task):
             if non_members:
                 raise HTTPException(status_code=400, detail=f"User(s) {non_members} in subteam are not part of the group")
 
-            # Send emails to subteam members
-            send_assigned_task_email_subteam(
-                subteam_id=subteam_id,
-                task_name=task.name,
-                task_description=task.description,
-                task_id="pending",  # Will update after insertion
-                group=assigned_group
-            )
-
-        else:
-            # Not a subteam, continue as individual user assignment
-            assigned_to = [user for user in assigned_to if users_collection.find_one({"email": user})]
-            if not assigned_to:
-                raise HTTPException(status_code=400, detail=f"No valid users found in {task.assigned_to}")
-    else:
+    # One query for every assignee; the result is reused for validation, emails and notifications below
+    assignees = await resolve_users(assigned_to)
+    if not subteam_id:
         # Individual users case
-        assigned_to = [user for user in assigned_to if users_collection.find_one({"email": user})]
+        assigned_to = [user for user in assigned_to if user in assignees]
         if not assigned_to:
             raise HTTPException(status_code=400, detail=f"No valid users found in {task.assigned_to}")
 
-    # Check duplicate task for same users
-    existing_task = tasks_collection.find_one({
-        "assigned_to": assigned_to,
-        "name": task.name,
-        "group": task.group
-    })
-    if existing_task:
-        raise HTTPException(status_code=400, detail="Task already exists for this user/subteam in the group")
-
     # Validate task status and priority
-    valid_statuses = ["To Do", "In Progress", "Completed"]
-    valid_priorities = ["Low", "Medium", "High"]
-    if task.status not in valid_statuses:
-        raise HTTPException(status_code=400, detail=f"Invalid status, choose from {valid_statuses}")
-    if task.priority not in valid_priorities:
-        raise HTTPException(status_code=400, detail=f"Invalid priority, choose from {valid_priorities}")
+    if task.status not in VALID_TASK_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status, choose from {VALID_TASK_STATUSES}")
+    if task.priority not in VALID_TASK_PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid priority, choose from {VALID_TASK_PRIORITIES}")
 
     # Prepare and insert task
-    task_data = task.dict()
+    task_data = task.model_dump()
     task_data["assigned_to"] = assigned_to
     if subteam_id:
         task_data["subteam"] = str(subteam_id)  # Store subteam ID as string
+    # new tasks go to the bottom of their board column
+    last = await tasks_repository.find_one({"group": task.group, "status": task.status}, {"rank": 1}, sort=[("rank", DESCENDING)])
+    task_data["rank"] = rank_between(last.get("rank") if last else None, None)
 
-    new_task = tasks_collection.insert_one(task_data)
+    # the unique dedupe_key index refuses a second task for the same users (see db/idempotency.py)
+    try:
+        new_task = await tasks_repository.insert_one({**task_data, **derived_task_fields(task_data)})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=DUPLICATE_TASK_DETAIL)
 
     # Update group's task list
-    groups_collection.update_one(
+    await groups_repository.update_one(
         {"_id": ObjectId(task.group)},
         {"$push": {"tasks": str(new_task.inserted_id)}}
     )
-
-    # Send emails to individual users if not subteam
-    if not subteam_id:
-        for user in assigned_to:
-            send_assigned_task_email(
-                user_email=user,
-                task_name=task.name,
-                task_description=task.description,
-                task_id=str(new_task.inserted_id),
-                group_id=task.group,
-                group_name=assigned_group["name"]
-            )
-
+    await record_task_changes([(None, {**task_data, "_id": new_task.inserted_id})], versions=member_keys([assigned_group]))
+
+    # Emails (and notifications for individual users) are sent in the background by dispatch_service
+    jobs = []
+    for user in assigned_to:
+        if user not in assignees:
+            continue  # subteam member without an account
+        jobs.append(task_email_job(
+            user_email=user,
+            task_id=str(new_task.inserted_id),
+            task_name=task.name,
+            task_description=task.description,
+            group_id=task.group,
+            group_name=assigned_group["name"],
+            subteam_name=subteam["team_name"] if subteam_id else None,
+            user_name=assignees[user].get("name"),
+        ))
+        if not subteam_id:
             # Create notification for each user
             notification_dir = {
                 "user_email": user,
@@ -124,8 +488,9 @@ async def create_task(task: Task):
                 "content": f"You have been assigned a new task: {task.name}",
                 "task_id": str(new_task.inserted_id)
             }
-            notification = CreateNotificationRequest(**notification_dir)
-            await create_notification(notification)
+            jobs.append(notification_job(CreateNotificationRequest(**notification_dir)))
+    await enqueue(jobs)
+    publish_task_event(task.group, "task_created", new_task.inserted_id, task=tasks_serial([{**task_data, "_id": new_task.inserted_id}])[0])
 
     return {
         "id": str(new_task.inserted_id),
@@ -139,23 +504,32 @@ async def create_task(task: Task):
 @tasks_router.put("/tasks/assign/")
 async def assign_task(task_id: str, new_user_email: str):
     # check if task exists
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_repository.find_one({"_id": ObjectId(task_id)})
     if not task:
         raise HTTPException(status_code=404, detail="task not found")
 
     # check if user exists
-    user = users_collection.find_one({"email": new_user_email})
+    user = await users_repository.find_one({"email": new_user_email})
     if not user:
         raise HTTPException(status_code=404, detail=" User not found")
 
     # task assignment
-    tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$addToSet": {"assigned_to": new_user_email}}  # add user to existing list
-    )
+    if new_user_email not in task.get("assigned_to", []):
+        assigned_to = task.get("assigned_to", []) + [new_user_email]
+        try:
+            await tasks_repository.update_one(
+                {"_id": ObjectId(task_id)},
+                {
+                    "$addToSet": {"assigned_to": new_user_email},  # add user to existing list
+                    "$set": {"dedupe_key": task_dedupe_key(task["group"], task["name"], assigned_to)},
+                }
+            )
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail=DUPLICATE_TASK_DETAIL)
+        await record_task_changes([(task, {**task, "assigned_to": assigned_to})])
 
     # send email to new user
-    send_assigned_task_email(new_user_email, task["name"], task["description"], task_id, task["group"], task["group_name"])
+    jobs = [task_email_job(new_user_email, task_id, task["name"], task["description"], task["group"], user_name=user.get("name"))]
     # create notification for new user
     notification_dir = {
         "user_email": new_user_email,
@@ -166,42 +540,49 @@ async def assign_task(task_id: str, new_user_email: str):
     }
 
     # create notification in database
-    notification = CreateNotificationRequest(**notification_dir)
-    await create_notification(notification)
+    jobs.append(notification_job(CreateNotificationRequest(**notification_dir)))
+    await enqueue(jobs)
+    publish_task_event(task["group"], "task_assigned", task_id, assigned_to=new_user_email)
 
     return {"message": "task assigned successfully", "task_id": task_id, "assigned_to": new_user_email}
 
 @tasks_router.put("/tasks/edit/")
 async def update_task(task_id: str, request_body: dict):
-    print(f"Received task_id: {task_id}")
-    print(f"Updated fields received: {request_body}")
+    logger.debug("update_task %s fields: %s", task_id, list(request_body.get("updated_fields", {})))
 
     # extract 'updated_fields' from request body 
     updated_fields = request_body.get("updated_fields", {})
 
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    task = await tasks_repository.find_one({"_id": ObjectId(task_id)})
 
     # If no task is found, return a 404 error
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Define the list of allowed fields that can be updated
-    allowed_fields = ["name", "description", "due_date", "status", "priority", "labels"]
-
     # Filter out any fields that are not in the allowed list
-    update_data = {key: value for key, value in updated_fields.items() if key in allowed_fields}
+    update_data = {key: value for key, value in updated_fields.items() if key in UPDATABLE_TASK_FIELDS}
 
      # If no valid fields remain after filtering, return a 400 error
     if not update_data:
         raise HTTPException(status_code=400, detail="No valid fields to update")
+    if "due_date" in update_data:
+        try:
+            update_data["due_date"] = parse_due_date(update_data["due_date"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     # Perform the update in the database by setting the new values
-    tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": update_data}
-    )
+    try:
+        await tasks_repository.update_one(
+            {"_id": ObjectId(task_id)},
+            {"$set": task_update_set(task, update_data)}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail=DUPLICATE_TASK_DETAIL)
+    await record_task_changes([(task, {**task, **update_data})])
 
     # create notification for updated task
+    jobs = []
     for user in task["assigned_to"]:
         notification_dir = {
             "user_email": user,
@@ -212,33 +593,282 @@ async def update_task(task_id: str, request_body: dict):
         }
 
         # create notification in database
-        notification = CreateNotificationRequest(**notification_dir)
-        await create_notification(notification)
+        jobs.append(notification_job(CreateNotificationRequest(**notification_dir)))
+    await enqueue(jobs)
+    publish_task_event(task["group"], "task_updated", task_id, changes=update_data)
 
     # Return a success response with the updated fields
     return {"message": "Task updated successfully", "task_id": task_id, "updated_fields": update_data}
 
 
+# creates many tasks at once: same rules as POST /tasks/, but a fixed number of queries for the whole batch
+@tasks_router.post("/tasks/bulk")
+async def create_tasks_bulk(request: BulkCreateTasksRequest):
+    tasks = request.tasks
+    errors = []  # every problem is reported, and nothing is written unless the whole batch is valid
+
+    groups = {}
+    group_ids = {task.group for task in tasks if ObjectId.is_valid(task.group)}
+    for group in await groups_repository.find({"_id": {"$in": [ObjectId(group_id) for group_id in group_ids]}}, {"name": 1, "members": 1}):
+        groups[str(group["_id"])] = group
+
+    # a single assignee that is a subteam id means "assign to the subteam"
+    possible_subteam_ids = {task.assigned_to[0] for task in tasks if len(task.assigned_to) == 1 and ObjectId.is_valid(task.assigned_to[0])}
+    subteams = {}
+    if possible_subteam_ids:
+        for subteam in await subteams_repository.find({"_id": {"$in": [ObjectId(subteam_id) for subteam_id in possible_subteam_ids]}}, {"members": 1, "team_name": 1}):
+            subteams[str(subteam["_id"])] = subteam
+
+    all_assignees = [user for task in tasks for user in (subteams[task.assigned_to[0]]["members"] if len(task.assigned_to) == 1 and task.assigned_to[0] in subteams else task.assigned_to)]
+    assignees = await resolve_users(all_assignees)
+
+    task_docs, subteam_of, request_index = [], [], []  # request_index: position in the request of each task_docs entry
+    for index, task in enumerate(tasks):
+        group = groups.get(task.group)
+        if not group:
+            errors.append({"index": index, "detail": f"Group {task.group} does not exist"})
+            continue
+        if task.status not in VALID_TASK_STATUSES:
+            errors.append({"index": index, "detail": f"Invalid status, choose from {VALID_TASK_STATUSES}"})
+        if task.priority not in VALID_TASK_PRIORITIES:
+            errors.append({"index": index, "detail": f"Invalid priority, choose from {VALID_TASK_PRIORITIES}"})
+
+        subteam = subteams.get(task.assigned_to[0]) if len(task.assigned_to) == 1 else None
+        if subteam:
+            assigned_to = subteam["members"]
+            non_members = [user for user in assigned_to if user not in group["members"]]
+            if non_members:
+                errors.append({"index": index, "detail": f"User(s) {non_members} in subteam are not part of the group"})
+        else:
+            assigned_to = [user for user in task.assigned_to if user in assignees]
+            if not assigned_to:
+                errors.append({"index": index, "detail": f"No valid users found in {task.assigned_to}"})
+
+        task_data = task.model_dump()
+        task_data["assigned_to"] = assigned_to
+        if subteam:
+            task_data["subteam"] = str(subteam["_id"])
+        task_docs.append(task_data)
+        subteam_of.append(subteam)
+        request_index.append(index)
+
+    # Check duplicate tasks for the same users, both in the database and inside the batch
+    seen = {}  # dedupe key -> request index
+    for index, task_data in zip(request_index, task_docs):
+        key = task_dedupe_key(task_data["group"], task_data["name"], task_data["assigned_to"])
+        if key in seen:
+            errors.append({"index": index, "detail": "Task appears twice in the request"})
+        seen.setdefault(key, index)
+    if task_docs and not errors:
+        existing = await tasks_repository.find({"dedupe_key": {"$in": list(seen)}}, {"dedupe_key": 1})
+        errors += sorted(
+            ({"index": seen[task_data["dedupe_key"]], "detail": DUPLICATE_TASK_DETAIL} for task_data in existing),
+            key=lambda error: error["index"],
+        )
+
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    # new tasks go to the bottom of their board columns, in request order; one query for the last rank of every column
+    # (sorted like the group_status_rank index, read backwards, so each $first is a single index entry)
+    last_ranks = {(column["_id"]["group"], column["_id"]["status"]): column["rank"] for column in await tasks_repository.aggregate([
+        {"$match": {"$or": [{"group": group_id, "status": status} for group_id, status in {(t["group"], t["status"]) for t in task_docs}]}},
+        {"$sort": {"group": DESCENDING, "status": DESCENDING, "rank": DESCENDING}},
+        {"$group": {"_id": {"group": "$group", "status": "$status"}, "rank": {"$first": "$rank"}}},
+    ])}
+    for task_data in task_docs:
+        column = (task_data["group"], task_data["status"])
+        task_data["rank"] = last_ranks[column] = rank_between(last_ranks.get(column), None)
+
+    new_docs = [{**task_data, **derived_task_fields(task_data)} for task_data in task_docs]
+    try:
+        inserted_ids = [str(task_id) for task_id in (await tasks_repository.insert_many(new_docs)).inserted_ids]
+    except BulkWriteError:
+        # a concurrent request created one of the tasks since the check above: undo the part of the batch
+        # that was inserted (insert_many has set the _id of every document)
+        await tasks_repository.delete_many({"_id": {"$in": [doc["_id"] for doc in new_docs]}})
+        raise HTTPException(status_code=400, detail=[{"detail": DUPLICATE_TASK_DETAIL}])
+
+    # Update each group's task list with one $push per group, all in one round trip
+    ids_by_group = {}
+    for task_id, task_data in zip(inserted_ids, task_docs):
+        ids_by_group.setdefault(task_data["group"], []).append(task_id)
+    await groups_repository.bulk_write([
+        UpdateOne({"_id": ObjectId(group_id)}, {"$push": {"tasks": {"$each": ids}}}) for group_id, ids in ids_by_group.items()
+    ])
+    await record_task_changes(
+        ((None, doc) for doc in new_docs), versions=member_keys(groups[group_id] for group_id in ids_by_group),
+    )
+
+    jobs = []
+    for task_id, task_data, subteam in zip(inserted_ids, task_docs, subteam_of):
+        for user in task_data["assigned_to"]:
+            if user not in assignees:
+                continue
+            jobs.append(task_email_job(
+                user_email=user,
+                task_id=task_id,
+                task_name=task_data["name"],
+                task_description=task_data["description"],
+                group_id=task_data["group"],
+                group_name=groups[task_data["group"]]["name"],
+                subteam_name=subteam["team_name"] if subteam else None,
+                user_name=assignees[user].get("name"),
+            ))
+            if not subteam:
+                jobs.append(notification_job(CreateNotificationRequest(
+                    user_email=user,
+                    group_id=task_data["group"],
+                    notification_type="Task Assigned",
+                    content=f"You have been assigned a new task: {task_data['name']}",
+                    task_id=task_id,
+                )))
+    await enqueue(jobs)
+    for task_id, task_data in zip(inserted_ids, task_docs):
+        publish_task_event(task_data["group"], "task_created", task_id, task=tasks_serial([{**task_data, "_id": task_id}])[0])
+
+    return {"message": f"{len(inserted_ids)} tasks created and assigned successfully", "ids": inserted_ids}
+
+
+# updates many tasks at once: same rules as PUT /tasks/edit/
+@tasks_router.put("/tasks/bulk")
+async def update_tasks_bulk(request: BulkUpdateTasksRequest):
+    errors = []
+    updates = {}
+    for index, item in enumerate(request.updates):
+        update_data = {key: value for key, value in item.updated_fields.items() if key in UPDATABLE_TASK_FIELDS}
+        if not ObjectId.is_valid(item.task_id):
+            errors.append({"index": index, "detail": f"Invalid task id {item.task_id}"})
+        elif not update_data:
+            errors.append({"index": index, "detail": "No valid fields to update"})
+        elif update_data.get("status", VALID_TASK_STATUSES[0]) not in VALID_TASK_STATUSES:
+            errors.append({"index": index, "detail": f"Invalid status, choose from {VALID_TASK_STATUSES}"})
+        elif update_data.get("priority", VALID_TASK_PRIORITIES[0]) not in VALID_TASK_PRIORITIES:
+            errors.append({"index": index, "detail": f"Invalid priority, choose from {VALID_TASK_PRIORITIES}"})
+        else:
+            try:
+                if "due_date" in update_data:
+                    update_data["due_date"] = parse_due_date(update_data["due_date"])
+            except ValueError as e:
+                errors.append({"index": index, "detail": str(e)})
+                continue
+            updates.setdefault(item.task_id, {}).update(update_data)
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    tasks = {str(task["_id"]): task for task in await tasks_repository.find(
+        {"_id": {"$in": [ObjectId(task_id) for task_id in updates]}}, {"assigned_to": 1, "group": 1, "name": 1, "description": 1, "labels": 1, "subteam": 1, "status": 1, "priority": 1},
+    )}
+    missing = [task_id for task_id in updates if task_id not in tasks]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {missing}")
+
+    try:
+        result = await tasks_repository.bulk_write([
+            UpdateOne({"_id": ObjectId(task_id)}, {"$set": task_update_set(tasks[task_id], update_data)})
+            for task_id, update_data in updates.items()
+        ])
+    except BulkWriteError as e:
+        # a rename onto an existing task; the updates before it in the (ordered) batch were applied
+        failed = e.details["writeErrors"][0]["index"]
+        await record_task_changes((tasks[task_id], {**tasks[task_id], **update_data}) for task_id, update_data in list(updates.items())[:failed])
+        raise HTTPException(status_code=400, detail=[{"task_id": list(updates)[failed], "detail": DUPLICATE_TASK_DETAIL}])
+    await record_task_changes((tasks[task_id], {**tasks[task_id], **update_data}) for task_id, update_data in updates.items())
+
+    # create notification for every updated task, in one batch
+    jobs = [
+        notification_job(CreateNotificationRequest(
+            user_email=user,
+            group_id=task["group"],
+            notification_type="Task Updated",
+            content=f"Your task has been updated: {task['name']}",
+            task_id=task_id,
+        ))
+        for task_id, task in tasks.items() for user in task["assigned_to"]
+    ]
+    await enqueue(jobs)
+    for task_id, update_data in updates.items():
+        publish_task_event(tasks[task_id]["group"], "task_updated", task_id, changes=update_data)
+
+    return {"message": "Tasks updated successfully", "modified": result.modified_count, "updated": updates}
+
+
+# moves a task on the board, to another position in its column or to another column; only the moved task is written
+@tasks_router.put("/tasks/{task_id}/move")
+async def move_task(task_id: str, request: MoveTaskRequest):
+    # the task and its new neighbours, in one query
+    ids = [tid for tid in (task_id, request.previous_id, request.next_id) if tid]
+    if not all(ObjectId.is_valid(tid) for tid in ids):
+        raise HTTPException(status_code=400, detail="Invalid task id")
+    found = {str(task["_id"]): task for task in await tasks_repository.find(
+        {"_id": {"$in": [ObjectId(tid) for tid in ids]}}, {**STATS_FIELDS, "rank": 1},
+    )}
+    task = found.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    new_status = request.status or task["status"]
+    if new_status not in VALID_TASK_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status, choose from {VALID_TASK_STATUSES}")
+
+    neighbours = []
+    for neighbour_id in (request.previous_id, request.next_id):
+        neighbour = found.get(neighbour_id) if neighbour_id else None
+        if neighbour_id and not neighbour:
+            raise HTTPException(status_code=404, detail=f"Task {neighbour_id} not found")
+        if neighbour and (neighbour["group"] != task["group"] or neighbour["status"] != new_status or neighbour_id == task_id):
+            raise HTTPException(status_code=400, detail=f"Task {neighbour_id} is not in the {new_status} column of this group")
+        neighbours.append(neighbour.get("rank") if neighbour else None)
+    if not request.previous_id and not request.next_id:
+        # no neighbours: to the bottom of the column, as new tasks (insert_task)
+        last = await tasks_repository.find_one(
+            {"group": task["group"], "status": new_status, "_id": {"$ne": task["_id"]}}, {"rank": 1}, sort=[("rank", DESCENDING)],
+        )
+        neighbours[0] = last.get("rank") if last else None
+    try:
+        new_rank = rank_between(*neighbours)
+    except ValueError:
+        # the client's board is out of date, or two tasks share a rank (created at the same moment)
+        if neighbours[0] == neighbours[1]:
+            await enqueue([new_job("rank_rebalance", {"group": task["group"], "status": new_status})])
+        raise HTTPException(status_code=409, detail="The board has changed, reload it and retry")
+
+    await tasks_repository.update_one({"_id": ObjectId(task_id)}, {"$set": {**task_update_set(task, {"status": new_status}), "rank": new_rank}})
+    await record_task_changes([(task, {**task, "status": new_status})])
+    if needs_rebalance(new_rank):
+        await enqueue([new_job("rank_rebalance", {"group": task["group"], "status": new_status})])
+    publish_task_event(task["group"], "task_moved", task_id, status=new_status, rank=new_rank)
+
+    return {"message": "Task moved successfully", "task_id": task_id, "status": new_status, "rank": new_rank}
+
+
 @tasks_router.post("/tasks/{task_id}/comments", summary="Add a comment to a task")
 async def add_comment(task_id: str, comment_request: AddCommentRequest, current_user: dict = Depends(get_current_user)):
     # create the comment object 
     new_comment = {
         "commenter": current_user["email"],
         "content": comment_request.content,
-        "timestamp": datetime.utcnow()
+        "timestamp": utc_now()
     }
     
-    # append tasks to current list of tasks
-    result = tasks_collection.update_one(
+    # the task only keeps a count and the newest comment; the comment itself goes to the comments collection
+    task = await tasks_repository.find_one_and_update(
         {"_id": ObjectId(task_id)},
-        {"$push": {"comments": new_comment}}
+        {
+            "$inc": {"comment_count": 1},
+            "$set": {"latest_comment": new_comment},
+            "$addToSet": {"comment_tokens": {"$each": comment_search_tokens(comment_request.content)}},
+        },
+        projection={"assigned_to": 1, "group": 1, "name": 1, "comment_count": 1},
     )
     
-    if result.modified_count == 0:
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found or comment not added")
     
+    await comments_repository.insert_one({"task_id": task_id, **new_comment})
+    await bump_versions(task_keys([task]))  # comment_count / latest_comment are part of the task lists
+    
     # create notification for each user assigned to the task
-    task = tasks_collection.find_one({"_id": ObjectId(task_id)})
+    jobs = []
     for user in task["assigned_to"]:
         notification_dir = {
             "user_email": user,
@@ -249,11 +879,53 @@ async def add_comment(task_id: str, comment_request: AddCommentRequest, current_
         }
 
         # create notification in database
-        notification = CreateNotificationRequest(**notification_dir)
-        await create_notification(notification)
+        jobs.append(notification_job(CreateNotificationRequest(**notification_dir)))
+    await enqueue(jobs)
+    # find_one_and_update returned the task from before the $inc
+    publish_task_event(task["group"], "task_commented", task_id, comment=new_comment, comment_count=task.get("comment_count", 0) + 1)
     
     return {"message": "Comment added successfully", "comment": new_comment}
 
+
+DEFAULT_COMMENT_PAGE_SIZE = 20
+MAX_COMMENT_PAGE_SIZE = 100
+
+
+# returns one page of a task's comments, newest first; the cursor of the next (older) page is in the X-Next-Cursor header
+@tasks_router.get("/tasks/{task_id}/comments", summary="List the comments of a task")
+async def get_comments(
+    task_id: str,
+    limit: int = Query(DEFAULT_COMMENT_PAGE_SIZE, ge=1, le=MAX_COMMENT_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    current_user: dict = Depends(get_current_user),
+):
+    query = {"task_id": task_id}
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            position["v"] = datetime.fromisoformat(position["v"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$and": [query, after_cursor("timestamp", position, descending=True)]}
+
+    comments = await comments_repository.find(query, sort=[("timestamp", DESCENDING), ("_id", DESCENDING)], limit=limit + 1)
+
+    headers = {}
+    if len(comments) > limit:
+        comments = comments[:limit]
+        last = comments[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor({"v": last["timestamp"].isoformat(), "id": str(last["_id"])})
+    return FastJSONResponse(comments_json(comments), headers=headers)
+
+
+# every status the task has had, oldest first: {"from": ..., "to": ..., "at": ..., "users": [...]}
+@tasks_router.get("/tasks/{task_id}/history", summary="List the status changes of a task")
+async def get_task_history(task_id: str):
+    entries = await status_log_repository.find(
+        {"task": task_id}, {"_id": 0, "from": 1, "to": 1, "at": 1, "users": 1}, sort=[("at", ASCENDING), ("_id", ASCENDING)],
+    )
+    return FastJSONResponse(entries)
+
 TASK_ASSIGNMENT_EMAIL_TEMPLATE = """<!DOCTYPE html>
 <html>
 <head>
@@ -372,39 +1044,6 @@ TASK_ASSIGNMENT_EMAIL_TEMPLATE = """<!DOCTYPE html>
 # BASE_URL = "{frontend_url}/tasks/{user_email}/{group_id}/{task_id}"
 BASE_URL = "{frontend_url}/projects/{group_id}"
 
-def send_assigned_task_email(user_email: str, task_name: str, task_description: str, task_id: str, group_id: str, group_name: str):
-    # Validate email
-    if not is_valid_email(user_email):
-        return {"error": "Invalid email format"}
-
-    # Check if the user is registered
-    user_email_for_link = user_email if users_collection.find_one({"email": user_email}) else "notRegistered"
-
-    # Generate task link
-    # task_link = f"{BASE_URL.format(frontend_url=frontend_url_dev, user_email=user_email_for_link, group_id=group_id, task_id=task_id)}"
-    task_link = f"{BASE_URL.format(frontend_url=frontend_url, group_id=group_id)}"
-
-    # get user
-    user = users_collection.find_one({"email": user_email})
-
-    # Format email content with new template
-    email_content = TASK_ASSIGNMENT_EMAIL_TEMPLATE.format(
-        user_name=user["name"],  # Extracting name from email
-        task_name=task_name,
-        task_description=task_description,
-        task_link=task_link
-    )
-
-    # Send email
-    email_sender.send_email(
-        receipient=user_email,
-        email_message=email_content,
-        subject_line=f"New Task Assigned {task_name} from {group_name}"
-    )
-
-    return {"message": "Task assignment email sent successfully", "task_id": task_id, "assigned_to": user_email}
-
-
 TASK_ASSIGNMENT_EMAIL_TEMPLATE_SUBTEAM = """<!DOCTYPE html>
 <html>
 <head>
@@ -516,49 +1155,92 @@ TASK_ASSIGNMENT_EMAIL_TEMPLATE_SUBTEAM = """<!DOCTYPE html>
 </body>
 </html>"""
 
-def send_assigned_task_email_subteam(subteam_id: str, task_name: str, task_description: str, task_id: str, group: dict):
+def task_email_job(user_email: str, task_id: str, task_name: str, task_description: str, group_id: str,
+                   group_name: Optional[str] = None, subteam_name: Optional[str] = None, user_name: Optional[str] = None) -> dict:
+    """Outbox job sending the task assignment email in the background (see dispatch_service)."""
+    return new_job("task_email", {
+        "user_email": user_email,
+        "task_id": task_id,
+        "task_name": task_name,
+        "task_description": task_description,
+        "group_id": group_id,
+        "group_name": group_name,  # looked up at delivery time when missing
+        "subteam_name": subteam_name,  # set when the task was assigned to a subteam
+        "user_name": user_name,  # looked up at delivery time when missing
+    })
+
+
+async def deliver_task_emails(jobs: list[dict]) -> dict:
     """
-    Sends task assignment emails to all members of a subteam given its ID.
+    Dispatch handler: render the assignment emails of a batch of jobs, looking up any recipient names and
+    group names the jobs do not carry with one query each, then send them. Unregistered recipients are skipped.
     """
-    # Fetch subteam from DB
-    subteam = subteams_collection.find_one({"_id": ObjectId(subteam_id)})
-    if not subteam:
-        return {"error": f"Subteam with ID {subteam_id} not found."}
-
-    for user_email in subteam["members"]:
-        # Validate email format
-        if not is_valid_email(user_email):
-            continue  # Skip invalid emails
-
-        # Use fallback in case user is not in DB
-        user = users_collection.find_one({"email": user_email})
-        user_email_for_link = user_email if user else "notRegistered"
-
-        # Generate task link
-        task_link = f"{BASE_URL.format(frontend_url=frontend_url, group_id=group['_id'])}"
-
-        if not user:
-            continue  # Skip if user doesn't exist
-
-        # Format email content using subteam template
-        email_content = TASK_ASSIGNMENT_EMAIL_TEMPLATE_SUBTEAM.format(
-            user_name=user["name"],
-            subteam_name=subteam["team_name"],
-            task_name=task_name,
-            task_description=task_description,
-            group_name=group["name"],
-            task_link=task_link
-        )
+    payloads = {job["_id"]: job["payload"] for job in jobs}
+    user_names = {p["user_email"]: p["user_name"] for p in payloads.values() if p.get("user_name")}
+    missing_users = [p["user_email"] for p in payloads.values() if p["user_email"] not in user_names]
+    if missing_users:
+        user_names.update({email: user.get("name") for email, user in (await resolve_users(missing_users)).items()})
+    missing_groups = {p["group_id"] for p in payloads.values() if not p.get("group_name")}
+    group_names = {}
+    if missing_groups:
+        groups = await groups_repository.find({"_id": {"$in": [ObjectId(group_id) for group_id in missing_groups]}}, {"name": 1})
+        group_names = {str(group["_id"]): group["name"] for group in groups}
+
+    emails = {}
+    for job_id, payload in payloads.items():
+        if payload["user_email"] not in user_names:
+            continue
+        group_name = payload.get("group_name") or group_names.get(payload["group_id"], "")
+        task_link = f"{BASE_URL.format(frontend_url=frontend_url, group_id=payload['group_id'])}"
+        if payload.get("subteam_name"):
+            # Format email content using subteam template
+            email_content = TASK_ASSIGNMENT_EMAIL_TEMPLATE_SUBTEAM.format(
+                user_name=user_names[payload["user_email"]],
+                subteam_name=payload["subteam_name"],
+                task_name=payload["task_name"],
+                task_description=payload["task_description"],
+                group_name=group_name,
+                task_link=task_link
+            )
+            subject_line = f"New Task Assigned to Subteam '{payload['subteam_name']}' - {payload['task_name']}"
+        else:
+            email_content = TASK_ASSIGNMENT_EMAIL_TEMPLATE.format(
+                user_name=user_names[payload["user_email"]],
+                task_name=payload["task_name"],
+                task_description=payload["task_description"],
+                task_link=task_link
+            )
+            subject_line = f"New Task Assigned {payload['task_name']} from {group_name}"
+        emails[job_id] = (payload["user_email"], email_content, subject_line)
 
-        # Send email
-        email_sender.send_email(
-            receipient=user_email,
-            email_message=email_content,
-            subject_line=f"New Task Assigned to Subteam '{subteam['team_name']}' - {task_name}"
-        )
+    return await run_in_threadpool(send_emails, emails)
 
-    return {
-        "message": "Subteam task notification emails sent successfully",
-        "task_id": task_id,
-        "subteam": subteam["team_name"]
-    }
\ No newline at end of file
+
+def send_emails(emails: dict) -> dict:
+    """
+    Send {job id: (recipient, html, subject)} one after another (the Gmail client is not thread-safe)
+    and return {job id: error} for the ones that failed. Invalid addresses are skipped.
+    """
+    errors = {}
+    for job_id, (recipient, email_content, subject_line) in emails.items():
+        if not is_valid_email(recipient):
+            continue
+        try:
+            if email_sender.send_email(receipient=recipient, email_message=email_content, subject_line=subject_line) is False:
+                errors[job_id] = "Email was not accepted by the Gmail API"
+        except Exception as e:
+            errors[job_id] = str(e)
+    return errors
+
+
+register_handler("task_email", deliver_task_emails)
+
+
+async def rebalance_ranks(jobs: list[dict]) -> dict:
+    """Background job queued when a board column's ranks get long: rewrites that column's ranks evenly."""
+    for group, status in {(job["payload"]["group"], job["payload"]["status"]) for job in jobs}:
+        logger.info("Rebalanced %d ranks of %s / %s", await rebalance_column(group, status), group, status)
+    return {}
+
+
+register_handler("rank_rebalance", rebalance_ranks)
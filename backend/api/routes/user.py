@@ -1,17 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, status, File, UploadFile
-from db.database import groups_collection, users_collection, tasks_collection, subteams_collection
+from db.repository import groups_repository, users_repository, tasks_repository, subteams_repository, files_repository, comments_repository, archived_tasks_repository
 from api.request_model.user_request_schema import DeleteUserRequest, UpdateUserRequest, UserRegisterRequest, UserLoginRequest
 from bson import ObjectId # mongodb uses ObjectId to store _id
 import bcrypt
 import jwt
-from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
 import os
 from email_service.email_utils import email_sender
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 import datetime
 import pdfplumber
-from db.database import files_collection
+from log_service.logging_utils import get_logger
+from db.task_stats import record_task_changes, STATS_FIELDS
+from db.versions import bump_versions, co_member_keys
+from db.idempotency import task_dedupe_key
 import boto3
 from botocore.exceptions import NoCredentialsError
 import openai
@@ -19,6 +22,7 @@ import requests
 import tempfile
 import json
 from params.frontend_params import frontend_url
+from api.utils import get_current_user, invalidate_principal
 
 # Load environment variables
 load_dotenv()
@@ -39,11 +43,8 @@ s3_client = boto3.client(
 # Load API Key from environment variables
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# OAuth2 password bearer for authentication
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/users/login")
-
-
 user_router = APIRouter()
+logger = get_logger("user")
 
 BASE_URL = "{frontend_url}/confirmRegistration/{confirmationCode}"
 
@@ -63,7 +64,6 @@ def verify_password(plain_password: str, hashed_password : str) -> bool:
     # if type(hash_password) is bytes:
     #     real_password.decode("utf-8")
     # else:
-    print(f"plain_password: {plain_password}, hashed_password.encode('utf-8'): {hashed_password.encode('utf-8')} ")
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
@@ -72,22 +72,9 @@ def generate_token(user_id: str, user_email:str) -> str:
     return jwt.encode({"id": user_id, "email": user_email}, JWT_SECRET, algorithm="HS256")
 
 
-# Middleware to get current user
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        user = users_collection.find_one({"_id": payload["id"]})
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
 @user_router.post("/register")
 async def register_user(request : UserRegisterRequest):
-    existing_user = users_collection.find_one({"email": request.email})
+    existing_user = await users_repository.find_one({"email": request.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -97,7 +84,7 @@ async def register_user(request : UserRegisterRequest):
     # Validate group IDs
     valid_group_ids = []
     for group_id in request.groups:
-        if not groups_collection.find_one({"_id": ObjectId(group_id)}):
+        if not await groups_repository.find_one({"_id": ObjectId(group_id)}):
             raise HTTPException(status_code=400, detail=f"Group {group_id} does not exist")
         valid_group_ids.append(ObjectId(group_id))
     
@@ -116,10 +103,10 @@ async def register_user(request : UserRegisterRequest):
         "skills": request.skills
     }
 
-    result = users_collection.insert_one(new_user)
+    result = await users_repository.insert_one(new_user)
     unique_token = generate_token(str(result.inserted_id), request.email)
     
-    users_collection.update_one(
+    await users_repository.update_one(
         {"_id": result.inserted_id},
         {"$set": {"confirmation_code": unique_token}}
     )
@@ -146,21 +133,22 @@ async def register_user(request : UserRegisterRequest):
 
 @user_router.get("/confirm/{confirmationCode}")
 async def verify_user(confirmationCode: str):
-    user = users_collection.find_one({"confirmation_code": confirmationCode})
+    user = await users_repository.find_one({"confirmation_code": confirmationCode})
     if not user:
         raise HTTPException(status_code=400, detail="User not found")
 
-    users_collection.update_one(
+    await users_repository.update_one(
         {"confirmation_code": confirmationCode},
         {"$set": {"status": "Active"}}
     )
+    invalidate_principal(user["email"])
 
     return {"message": "Updated User Status"}
 
 
 @user_router.post("/login")
 async def login_user(request: UserLoginRequest):
-    user = users_collection.find_one({"email": request.email})
+    user = await users_repository.find_one({"email": request.email})
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
@@ -172,7 +160,7 @@ async def login_user(request: UserLoginRequest):
         if not verify_password(request.password, user["password"]):
             raise HTTPException(status_code=400, detail="Invalid password")
     except Exception as e:
-        print(e)
+        logger.warning("Password check failed for %s: %s", request.email, e)
         raise HTTPException(status_code=400, detail="Invalid password")
     
     user["_id"] = str(user["_id"])
@@ -190,40 +178,68 @@ async def login_user(request: UserLoginRequest):
 @user_router.delete("/deleteUser",  status_code=status.HTTP_201_CREATED)
 async def delete_user(request : DeleteUserRequest):
     # Check if user exists
-    if not users_collection.find_one({"email": request.email}):
+    if not await users_repository.find_one({"email": request.email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"User with email {request.email} does not exist."
             )
     
     # Delete user
-    users_collection.delete_one({"email": request.email})
+    await users_repository.delete_one({"email": request.email})
+    invalidate_principal(request.email)
+
+    # everyone who shared a group with the user sees them disappear from their group list
+    group_list_keys = await co_member_keys(request.email)
 
     # delete user from groups
-    groups_collection.update_many(
+    await groups_repository.update_many(
         {},
         {"$pull": {"members": request.email}}
     )
 
     # if there are no members in the group, delete it
-    groups_collection.delete_many({"members": []})
+    await groups_repository.delete_many({"members": []})
 
     # if there are no members in the subteam, delete it
-    subteams_collection.delete_many({"members": []})
+    await subteams_repository.delete_many({"members": []})
 
     # find tasks where the user is the only assignee ( orphan tasks)
-    orphan_tasks = tasks_collection.find({"assigned_to": [request.email]})
-    orphan_task_ids = [task["_id"] for task in orphan_tasks]
+    user_tasks = await tasks_repository.find({"assigned_to": request.email}, {**STATS_FIELDS, "name": 1})
+    orphan_task_ids = [task["_id"] for task in user_tasks if task["assigned_to"] == [request.email]]
     
     # remove user from tasks
-    tasks_collection.update_many(
+    await tasks_repository.update_many(
         {"assigned_to": request.email},
         {"$pull": {"assigned_to": request.email}}
     )
     
+    # the remaining tasks have new assignees, hence new dedupe keys; a task that now duplicates another one
+    # keeps its old key
+    remaining = [task for task in user_tasks if task["_id"] not in orphan_task_ids]
+    if remaining:
+        try:
+            await tasks_repository.bulk_write([
+                UpdateOne({"_id": task["_id"]}, {"$set": {"dedupe_key": task_dedupe_key(
+                    task["group"], task["name"], [user for user in task["assigned_to"] if user != request.email],
+                )}})
+                for task in remaining
+            ], ordered=False)
+        except BulkWriteError as e:
+            logger.warning("%d tasks of %s now duplicate other tasks", len(e.details["writeErrors"]), request.email)
+
     # delete tasks where the user was the only assignee
     if orphan_task_ids:
-        tasks_collection.delete_many({"_id": {"$in": orphan_task_ids}})
+        await tasks_repository.delete_many({"_id": {"$in": orphan_task_ids}})
+        await comments_repository.delete_many({"task_id": {"$in": [str(task_id) for task_id in orphan_task_ids]}})
+
+    await record_task_changes((
+        (task, None if task["_id"] in orphan_task_ids else {**task, "assigned_to": [u for u in task["assigned_to"] if u != request.email]})
+        for task in user_tasks
+    ), versions=group_list_keys)
+
+    # same for the archived tasks (their counters are left to rebuild_task_stats)
+    await archived_tasks_repository.delete_many({"assigned_to": [request.email]})
+    await archived_tasks_repository.update_many({"assigned_to": request.email}, {"$pull": {"assigned_to": request.email}})
     
     return {"message": "User deleted successfully"}
 
@@ -231,7 +247,7 @@ async def delete_user(request : DeleteUserRequest):
 @user_router.put("/updateUser", status_code=status.HTTP_201_CREATED)
 async def update_user(request : UpdateUserRequest):
     # Check if user exists
-    user = users_collection.find_one({"email": request.email})
+    user = await users_repository.find_one({"email": request.email})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -255,17 +271,19 @@ async def update_user(request : UpdateUserRequest):
         updated_fields["skills"] = list(set(updated_fields["skills"]) - set(request.remove_skills))
 
     # Update user
-    updated_user = users_collection.find_one_and_update(
+    updated_user = await users_repository.find_one_and_update(
         {"email": request.email},
         {"$set": updated_fields},
         return_document=ReturnDocument.AFTER
     )
+    invalidate_principal(request.email)
 
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to update user with email {request.email}"
         )
+    await bump_versions(await co_member_keys(request.email))  # the profile is shown in the group lists
 
     updated_user["_id"] = str(updated_user["_id"])
 
@@ -393,7 +411,7 @@ async def upload_cv(
     new_filename = f"{user_name}_cv.pdf"
 
     # check if user exists
-    if not users_collection.find_one({"email": current_user["email"]}):
+    if not await users_repository.find_one({"email": current_user["email"]}):
         raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"User with email {current_user['email']} does not exist."
@@ -424,7 +442,7 @@ async def upload_cv(
         "uploaded_by": current_user["email"],
         "upload_date": datetime.datetime.utcnow()
     }
-    files_collection.insert_one(file_metadata)
+    await files_repository.insert_one(file_metadata)
 
     return {"message": "CV uploaded successfully", "filename": new_filename}
 
@@ -432,7 +450,7 @@ async def upload_cv(
 # @user_router.post("/getCVSkills")
 async def ask_chatgpt_for_cv_skills(current_user: dict = Depends(get_current_user)):
      # get user cv file
-     user_cv_file = files_collection.find_one({"user_email": current_user["email"]})
+     user_cv_file = await files_repository.find_one({"user_email": current_user["email"]})
      if not user_cv_file:
          raise HTTPException(status_code=400, detail="CV file not found")
 
@@ -493,13 +511,13 @@ async def get_user_presigned_url(
 ):
     """Generate a presigned URL for the uploaded CV file."""
     # check if the user exists
-    user = users_collection.find_one({"email": current_user["email"]})
+    user = await users_repository.find_one({"email": current_user["email"]})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     filename = "user_cv.pdf"  # or whatever the filename is
     # get the file from files_collection
-    user_cv_file = files_collection.find_one({"filename": filename, "user_email": user["email"]})
+    user_cv_file = await files_repository.find_one({"filename": filename, "user_email": user["email"]})
 
     # check if the file is linked to the current user
     # user_cv_file = user.get("cv_file")  # assuming you have a field for the user's CV file
@@ -532,7 +550,7 @@ async def update_skills_from_cv(
      extracted_skills = await ask_chatgpt_for_cv_skills(current_user)
 
      # get current user skills
-     user = users_collection.find_one({"email": current_user["email"]})
+     user = await users_repository.find_one({"email": current_user["email"]})
      
      # Flatten the skills dictionary
      extracted_skills_list = flatten_skills_dict(extracted_skills)
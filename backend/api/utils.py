@@ -1,5 +1,5 @@
 from email_validator import validate_email, EmailNotValidError
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, WebSocket
 import jwt
 from fastapi.security import OAuth2PasswordBearer
 from db.database import users_collection
@@ -8,6 +8,14 @@ from dotenv import load_dotenv
 from db.schemas import _user_serial
 from db.models import User
 from bson import ObjectId
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Optional
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from datetime import date, datetime
+import json
 # Load environment variables
 load_dotenv()
 JWT_SECRET = os.getenv("JWT_SECRET")
@@ -24,15 +32,108 @@ def is_valid_email(email: str) -> bool:
 # OAuth2 scheme for extracting Bearer token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/users/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+# Only the identity fields are loaded for the authenticated user (no password hash or free_time)
+PRINCIPAL_PROJECTION = {"email": 1, "name": 1, "status": 1}
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "1024"))
+
+
+class PrincipalCache:
+    """Thread-safe LRU cache of authenticated users keyed by email, entries expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries : OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, email: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return dict(user)
+
+    def set(self, email: str, user: dict) -> None:
+        with self._lock:
+            self._entries[email] = (monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(email: str) -> None:
+    """Call whenever a user document is modified or deleted so the next request reloads it."""
+    principal_cache.invalidate(email)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """Middleware function to authenticate users based on JWT token"""
+    return principal_from_token(token)
+
+
+def principal_from_token(token: str) -> dict:
+    """The user a JWT token was issued to; raises a 401 HTTPException for invalid or expired tokens."""
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        user = users_collection.find_one({"email": str(payload["email"])})
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid token")
+        email = str(payload["email"])
+        user = principal_cache.get(email)
+        if user is None:
+            user = users_collection.find_one({"email": email}, PRINCIPAL_PROJECTION)
+            if not user:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            principal_cache.set(email, user)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+
+# Browsers cannot set an Authorization header on a WebSocket handshake: the token comes either as the `token` query
+# parameter or as the subprotocol after "bearer" (new WebSocket(url, ["bearer", token])).
+WEBSOCKET_TOKEN_PROTOCOL = "bearer"
+
+
+def websocket_token(websocket: WebSocket) -> tuple[Optional[str], Optional[str]]:
+    """(token, subprotocol to accept the socket with) of a WebSocket handshake; the token is None when missing."""
+    protocols = [protocol.strip() for protocol in websocket.headers.get("sec-websocket-protocol", "").split(",")]
+    if len(protocols) >= 2 and protocols[0] == WEBSOCKET_TOKEN_PROTOCOL:
+        return protocols[1], WEBSOCKET_TOKEN_PROTOCOL
+    return websocket.query_params.get("token"), None
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse for content that is already (almost) JSON: skips FastAPI's recursive jsonable_encoder pass,
+    which dominates the cost of large list responses. Datetimes and ObjectIds are converted while encoding.
+    """
+
+    def render(self, content) -> bytes:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_json_default).encode("utf-8")
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+from api.utils import _json_default
+from api.broker import Broker, broker
+from log_service.logging_utils import get_logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = get_logger("websockets", sample_rate=float(os.getenv("CHAT_LOG_SAMPLE_RATE", "0.1")))
+
+# Connection handling shared by the WebSocket endpoints (chat, task events).
+#
+# Protocol, from the client:
+#   {"is_heartbeat_msg": true}   every ~40 seconds; a socket silent for WEBSOCKET_IDLE_SECONDS is closed
+#   {"close_connection": true}   to leave
+#   anything else is passed to the endpoint's on_message handler
+#
+# Every socket gets a bounded send queue drained by its own writer task, so a broadcast is a put per socket:
+# messages reach each client in publish order, and a client that stops reading is dropped instead of slowing
+# the sender or the other clients down. Broadcasts go through the pub/sub broker (api/broker.py), which hands
+# them to the registry of the same namespace in every app process.
+
+WEBSOCKET_IDLE_SECONDS : float = float(os.getenv("WEBSOCKET_IDLE_SECONDS", "50"))
+WEBSOCKET_SEND_QUEUE_SIZE : int = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "256"))
+_CLOSE = object()
+
+
+def encode(payload: dict) -> str:
+    return json.dumps(payload, default=_json_default)
+
+
+def _is_set(message: dict, flag: str) -> bool:
+    return message.get(flag) in (True, "True")
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.loop = asyncio.get_running_loop()
+        self.queue : asyncio.Queue = asyncio.Queue(maxsize=WEBSOCKET_SEND_QUEUE_SIZE)
+        self.writer = asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        while (text := await self.queue.get()) is not _CLOSE:
+            try:
+                await self.websocket.send_text(text)
+            except Exception:
+                return  # the receive loop notices the disconnect and cleans up
+
+    def _put(self, text) -> None:
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            pass  # lost a race for the last slot; the next send() reports the client as behind
+
+    def send(self, text: str) -> bool:
+        """Queue a message; False when the client is too far behind. Safe to call from any thread or event loop."""
+        if self.queue.full():
+            return False
+        self.loop.call_soon_threadsafe(self._put, text)
+        return True
+
+    def _finish(self) -> None:
+        try:
+            self.queue.put_nowait(_CLOSE)
+        except asyncio.QueueFull:
+            self.writer.cancel()
+
+    async def close(self) -> None:
+        # queued behind the messages already handed to send(), so the writer flushes them (e.g. the reply to a
+        # close request) before the socket is closed
+        self.loop.call_soon_threadsafe(self._finish)
+        try:
+            await asyncio.wait_for(asyncio.gather(self.writer, return_exceptions=True), timeout=5)
+        except asyncio.TimeoutError:
+            self.writer.cancel()
+        try:
+            await self.websocket.close()
+        except RuntimeError:
+            pass  # already closed by the client
+
+
+class ConnectionRegistry:
+    """The open sockets of this process, by key (a chat id, a group id), for one namespace ("chat", "tasks")."""
+
+    def __init__(self, namespace: str, broker: Broker = broker):
+        self.connections : dict[str, list[Connection]] = {}
+        self.broker = broker
+        self.namespace = namespace
+        broker.subscribe(namespace, self.deliver)
+
+    def count(self, key: str) -> int:
+        """Sockets open under `key` in this process."""
+        return len(self.connections.get(key, []))
+
+    def add(self, key: str, websocket: WebSocket) -> Connection:
+        connection = Connection(websocket)
+        self.connections.setdefault(key, []).append(connection)
+        return connection
+
+    def remove(self, key: str, connection: Connection) -> None:
+        connections = self.connections.get(key, [])
+        if connection in connections:
+            connections.remove(connection)
+        if not connections:
+            self.connections.pop(key, None)
+
+    def publish(self, key: str, payload: dict) -> None:
+        """Send `payload` to every socket under `key`, in every process, without waiting for them."""
+        if self.broker.local_only and key not in self.connections:
+            return
+        self.broker.publish(self.namespace, key, encode(payload))
+
+    def deliver(self, key: str, text: str) -> None:
+        """Send a published message to the sockets under `key` in this process."""
+        connections = self.connections.get(key)
+        if not connections:
+            return
+        for connection in list(connections):
+            if not connection.send(text):
+                logger.warning("WebSocket send queue full for %s, dropping the connection", key)
+                self.remove(key, connection)
+                asyncio.run_coroutine_threadsafe(connection.close(), connection.loop)
+
+
+async def serve(
+    websocket: WebSocket,
+    registry: ConnectionRegistry,
+    key: str,
+    on_message: Optional[Callable[[Connection, dict], Awaitable[None]]] = None,
+) -> None:
+    """Run an accepted socket until the client leaves or goes idle, with the shared heartbeat / close protocol."""
+    connection = registry.add(key, websocket)
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout=WEBSOCKET_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                logger.info("WebSocket for %s inactive, closing connection", key)
+                break
+            if _is_set(message, "close_connection"):
+                logger.info("Received close request for %s", key)
+                connection.send(encode({"message": "Close Connection request is successful"}))
+                break
+            if _is_set(message, "is_heartbeat_msg"):
+                connection.send(encode({"message": "Health ping received!", "live_users": registry.count(key)}))
+                continue
+            if on_message is not None:
+                await on_message(connection, message)
+    except WebSocketDisconnect:
+        logger.info("WebSocket disconnected from %s", key)
+    finally:
+        registry.remove(key, connection)
+        await connection.close()
+        logger.info("WebSocket connection for %s closed", key)
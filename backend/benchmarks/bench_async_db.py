@@ -0,0 +1,73 @@
+"""
+Requests/sec of an async route doing Mongo round-trips, before and after the async repository layer.
+
+"before" calls the pymongo collection directly inside the `async def` route (what the routers used to do),
+"after" goes through db.repository.AsyncRepository which runs the call on the database thread pool.
+The collection is a stand-in that sleeps for MONGO_LATENCY_MS to simulate a network round-trip,
+so no MongoDB server is needed.
+
+Run from backend/:
+    TEST_PIPELINE=True python -m benchmarks.bench_async_db
+"""
+import asyncio
+import os
+import sys
+import time
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.repository import AsyncRepository
+
+MONGO_LATENCY_MS = float(os.getenv("MONGO_LATENCY_MS", "5"))
+TOTAL_REQUESTS = int(os.getenv("TOTAL_REQUESTS", "1000"))
+CONCURRENCY = int(os.getenv("CONCURRENCY", "100"))
+
+
+class SlowCollection:
+    """Blocking collection stand-in with a fixed round-trip time."""
+
+    def find_one(self, query):
+        time.sleep(MONGO_LATENCY_MS / 1000)
+        return {"_id": "1", **query}
+
+
+collection = SlowCollection()
+repository = AsyncRepository(collection)
+app = FastAPI()
+
+
+@app.get("/before")
+async def before():
+    return collection.find_one({"email": "user@example.com"})
+
+
+@app.get("/after")
+async def after():
+    return await repository.find_one({"email": "user@example.com"})
+
+
+async def measure(path: str) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one_request():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(TOTAL_REQUESTS)))
+        return TOTAL_REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    print(f"{TOTAL_REQUESTS} requests, concurrency {CONCURRENCY}, simulated Mongo latency {MONGO_LATENCY_MS}ms")
+    for label, path in (("before (blocking)", "/before"), ("after (async repository)", "/after")):
+        print(f"{label:<26} {await measure(path):>8.1f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
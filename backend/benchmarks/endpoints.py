@@ -0,0 +1,362 @@
+"""
+Endpoint benchmark suite.
+
+Seeds a database with synthetic users, groups, tasks, subteams, chats and notifications, then drives the real
+FastAPI app (main.app) in-process through httpx and reports p50/p95/p99 latency and throughput per route.
+Results are written as JSON so runs can be compared across commits.
+
+By default the data lives in an in-memory mongomock database; pass --mongodb-url to run against a real
+(local) MongoDB instead, in which case the indexes from db/indexes.py are created first and the
+benchmark database is dropped afterwards.
+
+Run from backend/:
+    python -m benchmarks.endpoints                                  # default volumes, mongomock
+    python -m benchmarks.endpoints --groups 200 --tasks-per-group 100 --requests 500 --concurrency 50
+    python -m benchmarks.endpoints --mongodb-url mongodb://localhost:27017
+    python -m benchmarks.endpoints --compare results/old.json results/new.json
+
+Emails are not sent and email validation is syntax-only (no DNS lookups) so results are deterministic.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("TEST_PIPELINE", "True")  # no Gmail / Google Calendar clients
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+import httpx
+import jwt
+import mongomock
+from bson import ObjectId
+from email_validator import validate_email, EmailNotValidError
+from pymongo import MongoClient
+from pymongo.collection import Collection
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# collection methods the app uses; they are redirected to the benchmark database
+MONGO_OPERATIONS = (
+    "find_one", "find", "count_documents", "aggregate", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "find_one_and_update",
+    "delete_one", "delete_many", "bulk_write",
+)
+
+
+def serialized(method):
+    """
+    mongomock is not thread-safe (it edits the projection dict it is given while reading), so calls on the
+    in-memory database are run one at a time, with copied arguments and cursors read to the end.
+    """
+    def call(*args, **kwargs):
+        with _mongomock_lock:
+            result = method(*copy.deepcopy(args), **copy.deepcopy(kwargs))
+            return list(result) if isinstance(result, Iterator) else result
+    return call
+
+
+_mongomock_lock = threading.Lock()
+
+
+def bind_collections(target_db) -> None:
+    """Redirect every collection in db.database to the collection of the same name in target_db."""
+    import db.database
+    from db.mongomock_support import replay_bulk_write
+    in_memory = isinstance(target_db, mongomock.Database)
+    for collection in vars(db.database).values():
+        if isinstance(collection, Collection):
+            target = target_db[collection.name]
+            if in_memory:
+                target.bulk_write = replay_bulk_write(target)
+            for operation in MONGO_OPERATIONS:
+                method = getattr(target, operation)
+                setattr(collection, operation, serialized(method) if in_memory else method)
+
+
+def seed(target_db, args) -> dict:
+    """Insert the synthetic data set and return the ids/emails the routes are called with."""
+    from db.task_search import task_search_tokens
+    from db.task_rank import rank_between
+    from db.migrations import move_chat_history_to_buckets
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    emails = [f"user{i}@example.com" for i in range(args.users)]
+    group_ids = [ObjectId() for _ in range(args.groups)]
+
+    members_by_group = {group_id: rng.sample(emails, min(args.members_per_group, len(emails))) for group_id in group_ids}
+    groups_by_user = {email: [] for email in emails}
+    for group_id, members in members_by_group.items():
+        for email in members:
+            groups_by_user[email].append(str(group_id))
+
+    tasks, tasks_by_group, last_ranks = [], {group_id: [] for group_id in group_ids}, {}
+    for group_id, members in members_by_group.items():
+        for i in range(args.tasks_per_group):
+            task_id = ObjectId()
+            tasks_by_group[group_id].append(str(task_id))
+            tasks.append({
+                "_id": task_id,
+                "assigned_to": rng.sample(members, min(2, len(members))),
+                "subteam": None,
+                "name": f"Task {i}",
+                "description": "Synthetic benchmark task " * 3,
+                "due_date": (now + timedelta(days=rng.randint(-10, 30))).replace(hour=0, minute=0, second=0, microsecond=0),
+                "reminder_sent": False,
+                "status": rng.choice(["To Do", "In Progress", "Completed"]),
+                "group": str(group_id),
+                "priority": rng.choice(["Low", "Medium", "High"]),
+                "labels": rng.sample(["report", "code", "design", "research"], 2),
+                "comment_count": 0,
+            })
+            tasks[-1]["search_tokens"] = task_search_tokens(tasks[-1])
+            column = (group_id, tasks[-1]["status"])
+            tasks[-1]["rank"] = last_ranks[column] = rank_between(last_ranks.get(column), None)
+
+    target_db["users"].insert_many([{
+        "email": email,
+        "name": f"User {i}",
+        "password": "not-a-real-hash",
+        "status": "Active",
+        "groups": groups_by_user[email],
+        "skills": ["python"],
+        "free_time": {"free_time": {"Monday": [{"start": "09:00", "end": "10:00"}]}},
+    } for i, email in enumerate(emails)])
+    target_db["groups"].insert_many([{
+        "_id": group_id,
+        "members": members,
+        "name": f"Group {i}",
+        "tasks": tasks_by_group[group_id],
+        "pending_members": [],
+        "member_names": {email.replace(".", "[dot]"): email.split("@")[0] for email in members},
+    } for i, (group_id, members) in enumerate(members_by_group.items())])
+    if tasks:
+        target_db["tasks"].insert_many(tasks)
+
+    subteam_ids = []
+    for group_id, members in members_by_group.items():
+        subteam_ids.append(target_db["subteams"].insert_one({
+            "team_name": f"Subteam {group_id}",
+            "members": members[:3],
+            "group": group_id,
+            "tasks": tasks_by_group[group_id][: args.tasks_per_group // 2],
+        }).inserted_id)
+
+    target_db["chats"].insert_many([{
+        "is_groupchat": True,
+        "participants": members,
+        "chat_history": [{
+            "sender": rng.choice(members),
+            "message": f"message {m}",
+            "delivered_time": now - timedelta(minutes=args.messages_per_chat - m),
+        } for m in range(args.messages_per_chat)],
+        "group_id": str(group_id),
+    } for group_id, members in members_by_group.items()])
+    # the app reads messages from chat_messages buckets (db/chat_messages.py): store them the way the migration does
+    move_chat_history_to_buckets(target_db)
+
+    notifications = [{
+        "user": email,
+        "task_id": str(ObjectId()),
+        "group_id": rng.choice(groups_by_user[email]) if groups_by_user[email] else str(ObjectId()),
+        "notification_type": "Task Assigned",
+        "message": "You have been assigned a new task",
+        "timestamp": now - timedelta(minutes=n),
+        "read": rng.random() < 0.5,
+    } for email in emails for n in range(args.notifications_per_user)]
+    if notifications:
+        target_db["notifications"].insert_many(notifications)
+
+    return {
+        "emails": [email for email in emails if groups_by_user[email]],
+        "group_ids": [str(group_id) for group_id in group_ids],
+        "subteam_ids": [str(subteam_id) for subteam_id in subteam_ids],
+        "members_by_group": {str(group_id): members for group_id, members in members_by_group.items()},
+    }
+
+
+def build_scenarios(data: dict, rng: random.Random) -> dict:
+    """Route name -> function returning the (method, url, kwargs) of one request."""
+    secret = os.environ["JWT_SECRET"]
+
+    def auth(email):
+        return {"Authorization": f"Bearer {jwt.encode({'id': 'benchmark', 'email': email}, secret, algorithm='HS256')}"}
+
+    tokens = {email: auth(email) for email in data["emails"]}
+
+    def group_and_member():
+        group_id = rng.choice(data["group_ids"])
+        return group_id, rng.choice(data["members_by_group"][group_id])
+
+    def create_task():
+        group_id, member = group_and_member()
+        return "POST", "/tasks/", {"json": {
+            "assigned_to": [member], "name": f"Bench task {ObjectId()}", "description": "created by the benchmark",
+            "due_date": "2030-01-01", "status": "To Do", "group": group_id, "priority": "Medium", "labels": [],
+        }}
+
+    return {
+        "GET /": lambda: ("GET", "/", {}),
+        "GET /api/group/": lambda: ("GET", "/api/group/", {"headers": tokens[rng.choice(data["emails"])]}),
+        "GET /tasks/?assigned_to": lambda: ("GET", "/tasks/", {"params": {"assigned_to": rng.choice(data["emails"])}}),
+        "GET /api/subteams/getTasksBySubteam": lambda: (
+            "GET", "/api/subteams/getTasksBySubteam", {"json": {"subteam_id": rng.choice(data["subteam_ids"])}}),
+        "GET /api/notifications/get_notifications_by_user": lambda: (
+            "GET", "/api/notifications/get_notifications_by_user", {"params": {"user_email": rng.choice(data["emails"])}}),
+        "GET /api/chat/{group_id}": lambda: (
+            lambda group_id, member: ("GET", f"/api/chat/{group_id}", {"headers": tokens[member]}))(*group_and_member()),
+        "GET /tasks/search": lambda: ("GET", "/tasks/search", {"params": {
+            "q": rng.choice(["task 1", "synth", "code", "research bench"]), "group": rng.choice(data["group_ids"])}}),
+        "GET /tasks/board": lambda: ("GET", "/tasks/board", {"params": {"group": rng.choice(data["group_ids"])}}),
+        "POST /tasks/": create_task,
+    }
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_route(app, make_request, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def one_request():
+            nonlocal errors
+            method, url, kwargs = make_request()
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}")
+    print(f"{'route':<52} {'p50 ms':>17} {'p99 ms':>17} {'req/s':>17}")
+    for route, result in new["routes"].items():
+        before = old["routes"].get(route)
+        if not before:
+            continue
+        cells = [f"{before[key]:>7} -> {result[key]:<7}" for key in ("p50_ms", "p99_ms", "throughput_rps")]
+        print(f"{route:<52} {' '.join(cells)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--members-per-group", type=int, default=6)
+    parser.add_argument("--tasks-per-group", type=int, default=50)
+    parser.add_argument("--messages-per-chat", type=int, default=200)
+    parser.add_argument("--notifications-per-user", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--routes", nargs="*", help="only run these route names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongodb-url", help="run against this MongoDB instead of the in-memory stand-in")
+    parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR}/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files and exit")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.mongodb_url:
+        client = MongoClient(args.mongodb_url)
+        target_db = client["GroupGradeBenchmark"]
+        client.drop_database(target_db.name)
+        from db.indexes import ensure_indexes
+        ensure_indexes(target_db)
+    else:
+        target_db = mongomock.MongoClient().GroupGradeBenchmark
+
+    from main import app
+    import api.routes.tasks, api.routes.notifications
+    bind_collections(target_db)
+    api.routes.tasks.email_sender = SimpleNamespace(send_email=lambda **kwargs: True)
+
+    def syntax_only(email: str) -> bool:
+        try:
+            validate_email(email, check_deliverability=False)
+            return True
+        except EmailNotValidError:
+            return False
+    for module in (api.routes.tasks, api.routes.notifications):
+        module.is_valid_email = syntax_only
+
+    data = seed(target_db, args)
+    scenarios = build_scenarios(data, random.Random(args.seed))
+    if args.routes:
+        scenarios = {name: scenario for name, scenario in scenarios.items() if name in args.routes}
+
+    results = {}
+    print(f"{'route':<52} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+    for name, make_request in scenarios.items():
+        result = await run_route(app, make_request, args.requests, args.concurrency)
+        results[name] = result
+        print(f"{name:<52} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} {result['throughput_rps']:>9} {result['errors']:>7}")
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(),
+            "backend": "mongodb" if args.mongodb_url else "mongomock",
+            "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+            "routes": results,
+        }, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.mongodb_url:
+        client.drop_database(target_db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import os
+from typing import Optional
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from db.models import utc_now
+from db.repository import chat_messages_repository
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Chat messages are stored in buckets rather than in one ever-growing array on the chat document: a bucket holds
+# the messages of one chat and one (UTC) day, up to MESSAGES_PER_BUCKET of them, after which the next message
+# opens a new bucket. Appending is a single upsert that touches one small document, and a page of messages
+# reads a few buckets through the (chat_id, first_id / last_id) indexes however long the chat is.
+#   {"_id": ..., "chat_id": str, "day": "YYYY-MM-DD", "count": n, "first_id": ObjectId, "last_id": ObjectId,
+#    "messages": [{"_id": ObjectId, "sender": email, "message": str, "delivered_time": datetime}, ...]}
+# Messages are ordered by _id; clients page with the id of the oldest / newest message they have.
+
+MESSAGES_PER_BUCKET : int = int(os.getenv("CHAT_MESSAGES_PER_BUCKET", "200"))
+BUCKETS_PER_READ = 3
+
+
+async def append_chat_message(chat_id: str, sender: str, message: str) -> dict:
+    """Store a new message in the chat's current bucket and return it."""
+    new_message = {"_id": ObjectId(), "sender": sender, "message": message, "delivered_time": utc_now()}
+    await chat_messages_repository.update_one(
+        {"chat_id": chat_id, "day": new_message["delivered_time"].strftime("%Y-%m-%d"), "count": {"$lt": MESSAGES_PER_BUCKET}},
+        {
+            "$push": {"messages": new_message},
+            "$inc": {"count": 1},
+            "$min": {"first_id": new_message["_id"]},
+            "$max": {"last_id": new_message["_id"]},
+        },
+        upsert=True,
+    )
+    return new_message
+
+
+async def chat_messages_page(
+    chat_id: str, limit: int, before: Optional[ObjectId] = None, after: Optional[ObjectId] = None,
+) -> tuple[list[dict], bool]:
+    """
+    Up to `limit` messages of a chat, oldest first: the latest ones, the ones just before the message `before`
+    or the ones just after the message `after`. Also returns whether there are more in that direction.
+    """
+    if after is not None:
+        query, sort, keep = {"chat_id": chat_id, "last_id": {"$gt": after}}, [("first_id", ASCENDING)], lambda m: m["_id"] > after
+    else:
+        query, sort = {"chat_id": chat_id}, [("first_id", DESCENDING)]
+        if before is not None:
+            query["first_id"] = {"$lt": before}
+        keep = (lambda m: m["_id"] < before) if before is not None else (lambda m: True)
+
+    messages = []
+    while len(messages) <= limit:
+        buckets = await chat_messages_repository.find(query, {"first_id": 1, "messages": 1}, sort=sort, limit=BUCKETS_PER_READ)
+        messages += [message for bucket in buckets for message in bucket["messages"] if keep(message)]
+        if len(buckets) < BUCKETS_PER_READ:
+            break
+        query = {**query, "first_id": {"$gt" if after is not None else "$lt": buckets[-1]["first_id"]}}
+
+    messages.sort(key=lambda message: message["_id"], reverse=after is None)
+    has_more = len(messages) > limit
+    page = messages[:limit]
+    if after is None:
+        page.reverse()
+    return page, has_more
+
+
+def chat_messages_json(messages: list[dict]) -> list[dict]:
+    return [
+        {"id": str(m["_id"]), "sender": m["sender"], "message": m["message"], "delivered_time": m["delivered_time"]}
+        for m in messages
+    ]
@@ -11,7 +11,16 @@ db : Database = client.GroupGrade
 users_collection : Collection = db["users"] 
 groups_collection : Collection = db["groups"]
 tasks_collection : Collection = db["tasks"]
+archived_tasks_collection : Collection = db["archived_tasks"]  # tasks completed long ago (dispatch_service/archiver.py)
 subteams_collection : Collection = db["subteams"]
 files_collection : Collection = db["files"]
 chat_collection : Collection = db["chats"]
-notifications_collection : Collection = db["notifications"]
\ No newline at end of file
+notifications_collection : Collection = db["notifications"]
+comments_collection : Collection = db["comments"]  # task comments, one document each
+task_stats_collection : Collection = db["task_stats"]  # task counters per group / user / subteam (db/task_stats.py)
+outbox_collection : Collection = db["outbox"]  # background email / notification jobs (dispatch_service)
+versions_collection : Collection = db["versions"]  # version counters behind list ETags (db/versions.py)
+idempotency_collection : Collection = db["idempotency_keys"]  # responses of requests sent with an Idempotency-Key (db/idempotency.py)
+status_log_collection : Collection = db["status_log"]  # append-only task status history (db/status_log.py)
+status_daily_collection : Collection = db["status_daily"]  # daily status summaries per group / user (db/status_log.py)
+chat_messages_collection : Collection = db["chat_messages"]  # chat messages in buckets (db/chat_messages.py)
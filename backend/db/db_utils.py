@@ -1,18 +1,131 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pymongo import MongoClient
+from pymongo import monitoring
+from db.query_stats import command_stats_listener
+from log_service.logging_utils import get_logger
 from dotenv import load_dotenv
 # import certifi # uncomment if you are having issues with connecting to mongoDB
 
 load_dotenv()
+logger = get_logger("db")
 
 MONGODB_URL : str = os.getenv("MONGODB_URL")
 
+# Connection pool settings (see https://pymongo.readthedocs.io/en/stable/api/pymongo/mongo_client.html)
+MONGODB_MAX_POOL_SIZE : int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE : int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))
+MONGODB_MAX_IDLE_TIME_MS : int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS : int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS : int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS : int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+# comma separated, in order of preference, e.g. "zstd,snappy,zlib" (zstd and snappy need python-zstandard / python-snappy)
+MONGODB_COMPRESSORS : str = os.getenv("MONGODB_COMPRESSORS", "zlib")
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Keeps connection pool counters so pool saturation can be reported."""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_checkout_wait = 0.0  # seconds
+        self.max_checkout_wait = 0.0  # seconds
+        self.pool_clears = 0
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self.total_checkout_wait += event.duration
+            self.max_checkout_wait = max(self.max_checkout_wait, event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    # events we do not need to count
+    def connection_check_out_started(self, event): pass
+    def connection_ready(self, event): pass
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "saturation": round(self.checked_out / self.max_pool_size, 3),
+                "peak_saturation": round(self.peak_checked_out / self.max_pool_size, 3),
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_wait_ms": round(1000 * self.total_checkout_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_checkout_wait_ms": round(1000 * self.max_checkout_wait, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetrics(MONGODB_MAX_POOL_SIZE)
+
+
 def connect_to_mongodb() -> MongoClient:
+    # connect=False: no socket or monitor thread is opened until the first operation, so a client built at
+    # import time is still created fresh in each gunicorn worker (the first operation runs in the worker's
+    # startup hook, after the fork) rather than being shared with the parent process.
     try:
         # client : MongoClient = MongoClient(MONGODB_URL, tlsCAFile=certifi.where()) # uncomment if you are having issues with connecting to mongoDB
-        client : MongoClient = MongoClient(MONGODB_URL)
-        print(f"MongoDB Connected: {client.HOST}:{client.PORT}")
+        client : MongoClient = MongoClient(
+            MONGODB_URL,
+            connect=False,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+            compressors=MONGODB_COMPRESSORS or None,
+            event_listeners=[pool_metrics, command_stats_listener],
+        )
+        logger.info(f"MongoDB Connected: {client.HOST}:{client.PORT}")
         return client
     except Exception as e:
-        print(f"Error occured when attempting to connect to MongoDB server.\nError: {e}")
-        exit(1)
\ No newline at end of file
+        logger.error(f"Error occured when attempting to connect to MongoDB server.\nError: {e}")
+        exit(1)
+
+
+def warm_up_pool(client: MongoClient, connections: int = MONGODB_MIN_POOL_SIZE) -> dict:
+    """
+    Open `connections` pooled connections up front by running that many pings concurrently,
+    so the first requests after a deploy do not pay for the TCP/TLS handshake and authentication.
+    """
+    client.admin.command("ping")
+    if connections > 1:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(lambda _: client.admin.command("ping"), range(connections)))
+    return pool_metrics.snapshot()
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+from datetime import timedelta
+from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from db.models import utc_now
+from db.repository import idempotency_repository
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Safe retries of POST requests. A client sends the same Idempotency-Key header with every attempt of one
+# request; the first attempt claims the key, runs, and stores its response, later attempts get that response
+# back without running the request (and its emails / notifications) again. Records expire with the TTL index
+# on created_at (db/indexes.py), so a key can be reused a day later.
+#
+# Record: {"_id": "<scope>:<key>", "fingerprint": sha1 of the request body, "status": "pending" | "done",
+#          "status_code": int, "response": {...}, "created_at": datetime, "locked_until": datetime}
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+# a pending key whose request has not finished by then (e.g. the worker died) can be claimed by a retry
+IDEMPOTENCY_LOCK_SECONDS : float = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+
+def request_fingerprint(body: dict) -> str:
+    return hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _record_id(scope: str, key: str) -> str:
+    return f"{scope}:{key}"
+
+
+async def claim_idempotency_key(scope: str, key: str, fingerprint: str) -> Optional[dict]:
+    """None when this request now owns the key and should run; otherwise the record of the earlier attempt."""
+    now = utc_now()
+    locked_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+    try:
+        await idempotency_repository.insert_one({
+            "_id": _record_id(scope, key), "fingerprint": fingerprint, "status": "pending",
+            "created_at": now, "locked_until": locked_until,
+        })
+        return None
+    except DuplicateKeyError:
+        previous = await idempotency_repository.find_one({"_id": _record_id(scope, key)})
+    if previous is None:
+        return {"status": "pending", "fingerprint": fingerprint}  # expired or released just now: have the client retry
+    abandoned = previous["status"] == "pending" and previous["fingerprint"] == fingerprint and previous["locked_until"] < now
+    # take over an abandoned attempt of the same request, unless another retry just did
+    if abandoned and await idempotency_repository.find_one_and_update(
+        {"_id": previous["_id"], "status": "pending", "locked_until": previous["locked_until"]},
+        {"$set": {"locked_until": locked_until}},
+    ):
+        return None
+    return previous
+
+
+async def save_idempotent_response(scope: str, key: str, status_code: int, response: dict) -> None:
+    await idempotency_repository.update_one(
+        {"_id": _record_id(scope, key)},
+        {"$set": {"status": "done", "status_code": status_code, "response": response}, "$unset": {"locked_until": ""}},
+    )
+
+
+async def release_idempotency_key(scope: str, key: str) -> None:
+    """Forget a key whose request failed, so that a retry runs it again."""
+    await idempotency_repository.delete_one({"_id": _record_id(scope, key), "status": "pending"})
+
+
+def task_dedupe_key(group: str, name: str, assigned_to: list[str]) -> str:
+    """
+    Stored as "dedupe_key" on every task and unique in the database: a group cannot have two tasks with the
+    same name and the same assignees. Routes changing one of these fields recompute it.
+    """
+    return hashlib.sha1(json.dumps([str(group), name, list(assigned_to)]).encode()).hexdigest()
@@ -0,0 +1,140 @@
+import logging
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger("fastapi_app")
+
+# Indexes each collection is expected to have, keyed by collection name.
+# Every index is named explicitly so the startup check can compare by name.
+INDEX_REGISTRY : dict[str, list[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),  # get_current_user, login, every email lookup
+        IndexModel([("confirmation_code", ASCENDING)], name="confirmation_code", sparse=True),  # /api/user/confirm
+    ],
+    "groups": [
+        IndexModel([("members", ASCENDING)], name="members"),  # member removal / empty group cleanup
+    ],
+    "tasks": [
+        IndexModel([("assigned_to", ASCENDING), ("group", ASCENDING)], name="assigned_to_group"),  # GET /tasks/?assigned_to=
+        # one task per (group, name, assignees): enforced here, so concurrent creates cannot both succeed
+        IndexModel([("dedupe_key", ASCENDING)], name="dedupe_key_unique", unique=True, sparse=True),
+        # GET /tasks/ keyset pages: equality filter, then the sort key, then _id as the tie-breaker
+        IndexModel([("group", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)], name="group_due_date"),
+        IndexModel([("group", ASCENDING), ("status", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)], name="group_status_due_date"),
+        IndexModel([("assigned_to", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)], name="assigned_to_due_date"),
+        IndexModel([("due_date", ASCENDING), ("_id", ASCENDING)], name="due_date"),
+        # GET /tasks/board, and the bottom of a column for new tasks (db/task_rank.py)
+        IndexModel([("group", ASCENDING), ("status", ASCENDING), ("rank", ASCENDING), ("_id", ASCENDING)], name="group_status_rank"),
+        # due-date reminder scan: only tasks still waiting for their reminder are in this index
+        IndexModel([("due_date", ASCENDING)], name="due_date_reminder_pending", partialFilterExpression={"reminder_sent": False}),
+        # archiver scan: completed tasks only
+        IndexModel([("completed_at", ASCENDING)], name="completed_at_archivable", partialFilterExpression={"status": "Completed"}),
+        # GET /tasks/search: prefix scans of the word lists kept by db/task_search.py
+        IndexModel([("group", ASCENDING), ("search_tokens", ASCENDING)], name="group_search_tokens"),
+        IndexModel([("group", ASCENDING), ("comment_tokens", ASCENDING)], name="group_comment_tokens"),
+    ],
+    "archived_tasks": [
+        # GET /tasks/archive pages, most recently completed first
+        IndexModel([("group", ASCENDING), ("completed_at", DESCENDING), ("_id", DESCENDING)], name="group_completed_at"),
+        IndexModel([("assigned_to", ASCENDING), ("completed_at", DESCENDING), ("_id", DESCENDING)], name="assigned_to_completed_at"),
+    ],
+    "subteams": [
+        IndexModel([("group", ASCENDING)], name="group"),
+        IndexModel([("team_name", ASCENDING)], name="team_name"),
+    ],
+    "files": [
+        IndexModel([("group_id", ASCENDING), ("filename", ASCENDING)], name="group_id_filename"),
+        IndexModel([("user_email", ASCENDING), ("filename", ASCENDING)], name="user_email_filename"),
+    ],
+    "chats": [
+        IndexModel([("group_id", ASCENDING)], name="group_id"),
+    ],
+    "chat_messages": [
+        IndexModel([("chat_id", ASCENDING), ("day", ASCENDING)], name="chat_id_day"),  # appends
+        IndexModel([("chat_id", ASCENDING), ("first_id", DESCENDING)], name="chat_id_first_id"),  # latest / older pages
+        IndexModel([("chat_id", ASCENDING), ("last_id", ASCENDING)], name="chat_id_last_id"),  # newer pages
+    ],
+    "notifications": [
+        IndexModel([("user", ASCENDING), ("read", ASCENDING), ("timestamp", DESCENDING)], name="user_read_timestamp"),
+        IndexModel([("group_id", ASCENDING), ("read", ASCENDING), ("timestamp", DESCENDING)], name="group_id_read_timestamp"),
+    ],
+    "comments": [
+        IndexModel([("task_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="task_id_timestamp"),  # newest first pages
+    ],
+    "task_stats": [
+        IndexModel([("group", ASCENDING), ("scope", ASCENDING)], name="group_scope"),  # GET /tasks/stats?group=
+        IndexModel([("user", ASCENDING)], name="user", sparse=True),  # GET /tasks/stats?user=
+    ],
+    "outbox": [
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)], name="status_available_at"),  # claiming due jobs
+        IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)], name="status_locked_until"),  # reclaiming abandoned jobs
+        IndexModel([("claim", ASCENDING)], name="claim", sparse=True),
+        IndexModel([("completed_at", ASCENDING)], name="completed_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "status_log": [
+        IndexModel([("task", ASCENDING), ("at", ASCENDING)], name="task_at"),  # a task's history, when it was started
+        IndexModel([("at", ASCENDING)], name="at"),  # daily roll-up
+    ],
+    "status_daily": [
+        # GET /tasks/analytics
+        IndexModel([("group", ASCENDING), ("day", ASCENDING)], name="group_day", partialFilterExpression={"scope": "group"}),
+        IndexModel([("user", ASCENDING), ("day", ASCENDING)], name="user_day", partialFilterExpression={"scope": "user"}),
+    ],
+    "idempotency_keys": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=24 * 3600),  # retries within a day
+    ],
+}
+
+
+def ensure_indexes(db: Database, drop_extra: bool = False) -> dict:
+    """
+    Create any registry index missing from the database and report the differences.
+    Safe to run on every startup: existing indexes are left untouched.
+
+    Returns {collection: {"created": [...], "extra": [...], "conflicting": [...], "failed": [...]}}
+    where "extra" are indexes in the database that the registry does not declare
+    and "conflicting" are registry names that exist with a different key pattern.
+    """
+    report = {}
+    for collection_name, index_models in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        existing = collection.index_information()  # {name: {"key": [(field, direction), ...], ...}}
+        collection_report = {"created": [], "extra": [], "conflicting": [], "failed": []}
+
+        declared_names = set()
+        missing = []
+        for index_model in index_models:
+            spec = index_model.document
+            declared_names.add(spec["name"])
+            if spec["name"] not in existing:
+                missing.append(index_model)
+            elif list(existing[spec["name"]]["key"]) != list(spec["key"].items()):
+                collection_report["conflicting"].append(spec["name"])
+
+        for index_model in missing:
+            name = index_model.document["name"]
+            try:
+                collection.create_indexes([index_model])
+                collection_report["created"].append(name)
+            except OperationFailure as e:
+                # e.g. duplicate emails already stored prevent the unique index from being built
+                logger.error(f"Could not create index {collection_name}.{name}: {e}")
+                collection_report["failed"].append(name)
+
+        for name in existing:
+            if name != "_id_" and name not in declared_names:
+                collection_report["extra"].append(name)
+                if drop_extra:
+                    collection.drop_index(name)
+
+        report[collection_name] = collection_report
+    return report
+
+
+def log_index_report(report: dict) -> None:
+    for collection_name, collection_report in report.items():
+        for key, names in collection_report.items():
+            if names:
+                level = logging.INFO if key == "created" else logging.WARNING
+                logger.log(level, f"indexes {key} on {collection_name}: {', '.join(names)}")
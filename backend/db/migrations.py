@@ -0,0 +1,267 @@
+"""
+One-off data migrations. Each one is idempotent and works in batches, so it can be re-run or
+stopped at any point. Run from backend/:
+
+    python -m db.migrations <name> [--batch-size N]
+"""
+import argparse
+import os
+from itertools import groupby
+from bson import ObjectId
+from datetime import timedelta
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from pymongo.database import Database
+from db.database import db
+from db.task_stats import rebuild_task_stats
+from db.task_search import task_search_tokens, comment_search_tokens
+from db.models import parse_due_date, utc_now
+from db.idempotency import task_dedupe_key
+from db.task_rank import rank_between
+from db.status_log import DONE_STATUS, day_start, day_rollup_pipeline, day_summary_writes
+from db.chat_messages import MESSAGES_PER_BUCKET
+from log_service.logging_utils import get_logger
+
+logger = get_logger("migrations")
+
+
+def move_comments_to_collection(db: Database, batch_size: int = 500) -> int:
+    """
+    Move comments embedded in task documents ("comments" array) to the comments collection and replace
+    the array with comment_count / latest_comment. Returns the number of tasks migrated.
+    """
+    migrated = 0
+    while True:
+        tasks = list(db["tasks"].find({"comments": {"$exists": True}}, {"comments": 1, "latest_comment": 1}).limit(batch_size))
+        if not tasks:
+            return migrated
+        comments, task_updates = [], []
+        for task in tasks:
+            task_comments = [comment for comment in task["comments"] or [] if comment]
+            comments += [{"task_id": str(task["_id"]), "migrated": True, **comment} for comment in task_comments]
+            update = {"$inc": {"comment_count": len(task_comments)}, "$unset": {"comments": ""}}
+            # comments added since the new code was deployed are already counted and newer than the embedded ones
+            if task_comments and not task.get("latest_comment"):
+                update["$set"] = {"latest_comment": max(task_comments, key=lambda comment: comment.get("timestamp"))}
+            task_updates.append(UpdateOne({"_id": task["_id"]}, update))
+        # comments first: if the run stops in between, the task still has its array and is migrated again,
+        # after removing the copies the interrupted run inserted
+        db["comments"].delete_many({"task_id": {"$in": [str(task["_id"]) for task in tasks]}, "migrated": True})
+        if comments:
+            db["comments"].insert_many(comments)
+        db["tasks"].bulk_write(task_updates)
+        migrated += len(tasks)
+        logger.info("Moved comments of %d tasks", migrated)
+
+
+def index_task_search(db: Database, batch_size: int = 500) -> int:
+    """
+    Fill search_tokens / comment_tokens of tasks created before GET /tasks/search existed.
+    Run after comments_to_collection. Returns the number of tasks indexed.
+    """
+    indexed = 0
+    while True:
+        tasks = list(db["tasks"].find(
+            {"search_tokens": {"$exists": False}}, {"name": 1, "description": 1, "labels": 1},
+        ).limit(batch_size))
+        if not tasks:
+            return indexed
+        comment_tokens = {}
+        for comment in db["comments"].find({"task_id": {"$in": [str(task["_id"]) for task in tasks]}}, {"task_id": 1, "content": 1}):
+            comment_tokens.setdefault(comment["task_id"], set()).update(comment_search_tokens(comment.get("content")))
+        # $addToSet keeps the words of comments added while the migration runs
+        db["tasks"].bulk_write([
+            UpdateOne({"_id": task["_id"]}, {
+                "$set": {"search_tokens": task_search_tokens(task)},
+                "$addToSet": {"comment_tokens": {"$each": sorted(comment_tokens.get(str(task["_id"]), ()))}},
+            })
+            for task in tasks
+        ])
+        indexed += len(tasks)
+        logger.info("Indexed %d tasks for search", indexed)
+
+
+def normalize_due_dates(db: Database, batch_size: int = 500) -> int:
+    """
+    Convert due dates stored as strings to datetimes (see parse_due_date) and mark the tasks as waiting for their
+    due-date reminder unless they are already due. Unparseable dates are set to null and logged.
+    Returns the number of tasks converted.
+    """
+    converted = 0
+    now = utc_now()
+    while True:
+        tasks = list(db["tasks"].find({"due_date": {"$type": "string"}}, {"due_date": 1}).limit(batch_size))
+        if not tasks:
+            return converted
+        updates = []
+        for task in tasks:
+            try:
+                due_date = parse_due_date(task["due_date"])
+            except ValueError:
+                logger.warning("Task %s has an invalid due date %r, clearing it", task["_id"], task["due_date"])
+                due_date = None
+            updates.append(UpdateOne(
+                {"_id": task["_id"], "due_date": task["due_date"]},
+                {"$set": {"due_date": due_date, "reminder_sent": due_date is None or due_date < now}},
+            ))
+        db["tasks"].bulk_write(updates)
+        converted += len(tasks)
+        logger.info("Converted the due dates of %d tasks", converted)
+
+
+def add_task_dedupe_keys(db: Database, batch_size: int = 500) -> int:
+    """
+    Fill dedupe_key (db/idempotency.py) of tasks created before it existed; needs the dedupe_key_unique index
+    (created at startup). Of tasks that already duplicate each other, the oldest gets the key and the others are
+    logged and left without one. Returns the number of tasks given a key.
+    """
+    added, last_id = 0, None
+    while True:
+        query = {"dedupe_key": {"$exists": False}, **({"_id": {"$gt": last_id}} if last_id else {})}
+        tasks = list(db["tasks"].find(query, {"group": 1, "name": 1, "assigned_to": 1}).sort("_id", 1).limit(batch_size))
+        if not tasks:
+            return added
+        last_id = tasks[-1]["_id"]
+        for task in tasks:
+            key = task_dedupe_key(task.get("group"), task.get("name"), task.get("assigned_to") or [])
+            # one update per task: a duplicate fails on the unique index without affecting the others
+            try:
+                db["tasks"].update_one({"_id": task["_id"]}, {"$set": {"dedupe_key": key}})
+                added += 1
+            except DuplicateKeyError:
+                logger.warning("Task %s duplicates another task, leaving it without a dedupe key", task["_id"])
+        logger.info("Added the dedupe keys of %d tasks", added)
+
+
+def rank_tasks(db: Database, batch_size: int = 500) -> int:
+    """
+    Give tasks created before the board existed a rank (db/task_rank.py): the unranked tasks of each column go
+    to its bottom, soonest due first. Returns the number of tasks ranked.
+    """
+    ranked = 0
+    while task := db["tasks"].find_one({"rank": {"$exists": False}}, {"group": 1, "status": 1}):
+        column = {"group": task.get("group"), "status": task.get("status")}
+        last = db["tasks"].find_one({**column, "rank": {"$exists": True}}, {"rank": 1}, sort=[("rank", -1)])
+        previous = last["rank"] if last else None
+        updates = []
+        for unranked in db["tasks"].find({**column, "rank": {"$exists": False}}, {"_id": 1}).sort([("due_date", 1), ("_id", 1)]).limit(batch_size):
+            previous = rank_between(previous, None)
+            updates.append(UpdateOne({"_id": unranked["_id"]}, {"$set": {"rank": previous}}))
+        db["tasks"].bulk_write(updates)
+        ranked += len(updates)
+        logger.info("Ranked %d tasks", ranked)
+    return ranked
+
+
+def backfill_completed_at(db: Database, batch_size: int = 500) -> int:
+    """
+    Set completed_at of tasks completed before it was recorded, to their creation time (the only bound known),
+    so the archiver can move them. Returns the number of tasks updated.
+    """
+    updated = 0
+    while tasks := list(db["tasks"].find({"status": "Completed", "completed_at": None}, {"_id": 1}).limit(batch_size)):
+        db["tasks"].bulk_write([
+            UpdateOne({"_id": task["_id"]}, {"$set": {"completed_at": task["_id"].generation_time.replace(tzinfo=None)}})
+            for task in tasks
+        ])
+        updated += len(tasks)
+        logger.info("Set the completion time of %d tasks", updated)
+    return updated
+
+
+def seed_status_log(db: Database, batch_size: int = 500) -> int:
+    """
+    Give the tasks (live and archived) that predate the status log a history: created "To Do", and completed at
+    completed_at when known. Then roll up every day of the log into status_daily. Returns the number of entries added.
+    """
+    added = 0
+    for collection in ("tasks", "archived_tasks"):
+        last_id = None
+        while tasks := list(db[collection].find(
+            {"_id": {"$gt": last_id}} if last_id else {}, {"group": 1, "assigned_to": 1, "status": 1, "completed_at": 1},
+        ).sort("_id", 1).limit(batch_size)):
+            last_id = tasks[-1]["_id"]
+            logged = set(db["status_log"].distinct("task", {"task": {"$in": [str(task["_id"]) for task in tasks]}}))
+            entries = []
+            for task in tasks:
+                if str(task["_id"]) in logged:
+                    continue
+                created_at = task["_id"].generation_time.replace(tzinfo=None)
+                entry = {"task": str(task["_id"]), "group": str(task.get("group")), "users": task.get("assigned_to") or []}
+                completed = task.get("status") == DONE_STATUS and task.get("completed_at")
+                entries.append({**entry, "from": None, "to": "To Do" if completed else task.get("status"), "at": created_at})
+                if completed:
+                    entries.append({
+                        **entry, "from": "To Do", "to": DONE_STATUS, "at": task["completed_at"],
+                        "lead": max((task["completed_at"] - created_at).total_seconds(), 0),
+                    })
+            if entries:
+                db["status_log"].insert_many(entries)
+            added += len(entries)
+            logger.info("Added %d status log entries", added)
+
+    first = db["status_log"].find_one({}, {"at": 1}, sort=[("at", 1)])
+    day = day_start(first["at"]) if first else day_start(utc_now()) + timedelta(days=1)
+    while day <= utc_now():
+        summaries = day_summary_writes(day, list(db["status_log"].aggregate(day_rollup_pipeline(day)))[0])
+        if summaries:
+            db["status_daily"].bulk_write(summaries)
+        day += timedelta(days=1)
+    return added
+
+
+def move_chat_history_to_buckets(db: Database, batch_size: int = 500) -> int:
+    """
+    Move the messages embedded in chat documents ("chat_history" array) to chat_messages buckets
+    (db/chat_messages.py). Messages get ids carrying their delivery time. Returns the number of chats migrated.
+    """
+    migrated = 0
+    while chats := list(db["chats"].find({"chat_history": {"$exists": True}}, {"chat_history": 1}).limit(batch_size)):
+        for chat in chats:
+            chat_id = str(chat["_id"])
+            # a run stopped half-way through this chat left partial buckets
+            db["chat_messages"].delete_many({"chat_id": chat_id, "migrated": True})
+            history = sorted(chat["chat_history"] or [], key=lambda message: message["delivered_time"])
+            messages = [
+                {
+                    "_id": ObjectId(ObjectId.from_datetime(message["delivered_time"]).binary[:4] + os.urandom(5) + i.to_bytes(3, "big")),
+                    "sender": message["sender"], "message": message["message"], "delivered_time": message["delivered_time"],
+                }
+                for i, message in enumerate(history)
+            ]
+            buckets = []
+            for day, day_messages in groupby(messages, key=lambda message: message["delivered_time"].strftime("%Y-%m-%d")):
+                day_messages = list(day_messages)
+                for start in range(0, len(day_messages), MESSAGES_PER_BUCKET):
+                    bucket = day_messages[start:start + MESSAGES_PER_BUCKET]
+                    buckets.append({
+                        "chat_id": chat_id, "day": day, "count": len(bucket), "first_id": bucket[0]["_id"], "last_id": bucket[-1]["_id"],
+                        "messages": bucket, "migrated": True,
+                    })
+            if buckets:
+                db["chat_messages"].insert_many(buckets)
+            db["chats"].update_one({"_id": chat["_id"]}, {"$unset": {"chat_history": ""}})
+        migrated += len(chats)
+        logger.info("Moved the history of %d chats", migrated)
+    return migrated
+
+
+MIGRATIONS = {
+    "comments_to_collection": move_comments_to_collection,
+    "rebuild_task_stats": rebuild_task_stats,  # also safe to run periodically to repair counter drift
+    "index_task_search": index_task_search,
+    "normalize_due_dates": normalize_due_dates,
+    "task_dedupe_keys": add_task_dedupe_keys,
+    "rank_tasks": rank_tasks,
+    "backfill_completed_at": backfill_completed_at,
+    "seed_status_log": seed_status_log,  # also rolls up the whole log, e.g. after the app was down for days
+    "chat_history_to_buckets": move_chat_history_to_buckets,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("name", choices=MIGRATIONS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    print(f"{args.name}: {MIGRATIONS[args.name](db, batch_size=args.batch_size)} documents migrated")
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import datetime, timezone
 
 class Comment(BaseModel):
     commenter: str         # email or identifier of the user
@@ -31,18 +31,45 @@ class Group(BaseModel): #_id as Primary key, automatically created, can be found
     pending_members:Optional[List[str]] =[]
     member_names: Dict = {}
 
+VALID_TASK_STATUSES = ["To Do", "In Progress", "Completed"]
+VALID_TASK_PRIORITIES = ["Low", "Medium", "High"]
+
+
+def utc_now() -> datetime:
+    # naive UTC, the form pymongo returns stored datetimes in
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_due_date(value) -> datetime:
+    """
+    Due date as stored on tasks: naive UTC datetime. Accepts datetimes and ISO strings,
+    "YYYY-MM-DD" meaning midnight; raises ValueError for anything else.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid due date {value!r}, expected YYYY-MM-DD or an ISO datetime")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class Task(BaseModel):
     assigned_to: Optional[List[str]] = []         # Only used if assigning directly to users
     subteam: Optional[str] = None                 # Subteam ID if assigned to a subteam
     name: str
     description: str
-    due_date: str
+    due_date: datetime                            # naive UTC, see parse_due_date()
     status: str
     group: str
     priority: str
     labels: Optional[List[str]] = []
-    comments: Optional[List[Comment]] = []
+    # comment_count / latest_comment are kept by the server (see derived_task_fields()), not sent by clients;
+    # the comments themselves live in their own collection (GET /tasks/{id}/comments)
 
+    @field_validator("due_date", mode="before")
+    @classmethod
+    def normalize_due_date(cls, value):
+        return parse_due_date(value)
 
 
 class SubTeam(BaseModel): #_id as Primary key, automatically created, can be found using ObjectID
@@ -63,7 +90,6 @@ class Chat(BaseModel):
     chat_id: str = Field(alias="_id", default=None)
     is_groupchat: bool = False
     participants: list[str] = []
-    chat_history: list[Message] = []
     group_id : str = None
 
 class Notification(BaseModel):
@@ -71,7 +97,7 @@ class Notification(BaseModel):
     user: str # Foreign Key referencing User.email
     task_id: str # Foreign Key referencing Task.id
     group_id: str # Foreign Key referencing Group.id
-    notification_type: str # ["Task Assigned", "Task Updated", "Task Commented"
+    notification_type: str # ["Task Assigned", "Task Updated", "Task Commented", "Task Due Soon"
     message: str
     timestamp: datetime
     read: bool = False
\ No newline at end of file
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany, ReplaceOne
+
+# Helpers for running the app against an in-memory mongomock database (tests/conftest.py, benchmarks/endpoints.py).
+
+
+def replay_bulk_write(fake_collection):
+    """
+    mongomock's bulk_write cannot read the request objects of current pymongo versions,
+    so the operations are replayed one by one (still counted as one bulk_write).
+    """
+    def bulk_write(requests, ordered=True, **kwargs):
+        result = SimpleNamespace(inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0)
+        for request in requests:
+            if isinstance(request, InsertOne):
+                fake_collection.insert_one(request._doc)
+                result.inserted_count += 1
+            elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                method = {UpdateOne: "update_one", UpdateMany: "update_many", ReplaceOne: "replace_one"}[type(request)]
+                outcome = getattr(fake_collection, method)(request._filter, request._doc, upsert=request._upsert)
+                result.matched_count += outcome.matched_count
+                result.modified_count += outcome.modified_count
+                result.upserted_count += outcome.upserted_id is not None
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                method = "delete_one" if isinstance(request, DeleteOne) else "delete_many"
+                result.deleted_count += getattr(fake_collection, method)(request._filter).deleted_count
+        return result
+    return bulk_write
@@ -0,0 +1,108 @@
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from pymongo import monitoring
+
+
+class RequestDbStats:
+    """Mongo commands issued while handling one request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_command : Optional[str] = None
+
+    def record(self, command: str, duration_ms: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            if duration_ms >= self.slowest_ms:
+                self.slowest_ms = duration_ms
+                self.slowest_command = command
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header."""
+        header = f'db;desc="{self.count} queries";dur={self.total_ms:.2f}'
+        if self.slowest_command:
+            header += f', db-slowest;desc="{self.slowest_command}";dur={self.slowest_ms:.2f}'
+        return header
+
+
+# Stats of the request being handled; set by api.middleware.DbTimingMiddleware.
+# Context variables are copied into the worker threads that run the pymongo calls, so the listener sees it.
+current_request_stats : ContextVar[Optional[RequestDbStats]] = ContextVar("current_request_stats", default=None)
+
+
+class CommandStatsListener(monitoring.CommandListener):
+    """Attributes every Mongo command to the request that issued it."""
+
+    def __init__(self):
+        self._collections : dict[tuple, str] = {}  # (connection, request id) -> collection, until the command finishes
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if current_request_stats.get() is None:
+            return
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else event.database_name
+
+    def _finished(self, event):
+        stats = current_request_stats.get()
+        if stats is None:
+            return
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), None)
+        command = f"{event.command_name} {collection}" if collection else event.command_name
+        stats.record(command, event.duration_micros / 1000)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+class RouteDbStats:
+    """Per-route totals of the database work done by requests, for spotting N+1 query patterns."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes : dict[str, dict] = {}
+
+    def record(self, route: str, stats: RequestDbStats) -> None:
+        with self._lock:
+            totals = self._routes.setdefault(route, {
+                "requests": 0, "queries": 0, "max_queries": 0, "db_time_ms": 0.0,
+                "slowest_command": None, "slowest_command_ms": 0.0,
+            })
+            totals["requests"] += 1
+            totals["queries"] += stats.count
+            totals["max_queries"] = max(totals["max_queries"], stats.count)
+            totals["db_time_ms"] += stats.total_ms
+            if stats.slowest_command and stats.slowest_ms >= totals["slowest_command_ms"]:
+                totals["slowest_command"] = stats.slowest_command
+                totals["slowest_command_ms"] = stats.slowest_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    **totals,
+                    "avg_queries": round(totals["queries"] / totals["requests"], 2),
+                    "avg_db_time_ms": round(totals["db_time_ms"] / totals["requests"], 3),
+                    "db_time_ms": round(totals["db_time_ms"], 3),
+                    "slowest_command_ms": round(totals["slowest_command_ms"], 3),
+                }
+                for route, totals in self._routes.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+command_stats_listener = CommandStatsListener()
+route_db_stats = RouteDbStats()
@@ -0,0 +1,103 @@
+import os
+from functools import partial
+from anyio import CapacityLimiter, to_thread
+from pymongo.collection import Collection
+from db.db_utils import MONGODB_MAX_POOL_SIZE
+from db.database import (
+    users_collection,
+    groups_collection,
+    tasks_collection,
+    archived_tasks_collection,
+    subteams_collection,
+    files_collection,
+    chat_collection,
+    notifications_collection,
+    comments_collection,
+    task_stats_collection,
+    outbox_collection,
+    versions_collection,
+    idempotency_collection,
+    status_log_collection,
+    status_daily_collection,
+    chat_messages_collection,
+)
+
+# pymongo is blocking, so every database call is run on a worker thread instead of the event loop.
+# The limiter caps how many Mongo calls can be in flight at once (one thread per pooled connection).
+DB_THREAD_LIMIT : int = int(os.getenv("MONGODB_THREAD_LIMIT", str(MONGODB_MAX_POOL_SIZE)))
+db_thread_limiter = CapacityLimiter(DB_THREAD_LIMIT)
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the database thread pool."""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=db_thread_limiter)
+
+
+class AsyncRepository:
+    """Awaitable view of a pymongo collection.
+
+    Methods are looked up on the wrapped collection at call time, so anything patched
+    onto the collection (e.g. in tests) is picked up by the repository as well.
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    async def _run(self, method: str, *args, **kwargs):
+        return await run_db(getattr(self.collection, method), *args, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        return await self._run("find_one", *args, **kwargs)
+
+    async def find(self, *args, **kwargs) -> list[dict]:
+        # cursors do their network I/O while being iterated, so materialise them on the worker thread
+        return await run_db(lambda: list(self.collection.find(*args, **kwargs)))
+
+    async def count_documents(self, *args, **kwargs) -> int:
+        return await self._run("count_documents", *args, **kwargs)
+
+    async def aggregate(self, *args, **kwargs) -> list[dict]:
+        return await run_db(lambda: list(self.collection.aggregate(*args, **kwargs)))
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run("insert_one", *args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return await self._run("insert_many", *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run("update_one", *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._run("update_many", *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await self._run("find_one_and_update", *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._run("delete_one", *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await self._run("delete_many", *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await self._run("bulk_write", *args, **kwargs)
+
+
+# Async repositories used by the API routes
+users_repository = AsyncRepository(users_collection)
+groups_repository = AsyncRepository(groups_collection)
+tasks_repository = AsyncRepository(tasks_collection)
+archived_tasks_repository = AsyncRepository(archived_tasks_collection)
+subteams_repository = AsyncRepository(subteams_collection)
+files_repository = AsyncRepository(files_collection)
+chat_repository = AsyncRepository(chat_collection)
+notifications_repository = AsyncRepository(notifications_collection)
+comments_repository = AsyncRepository(comments_collection)
+task_stats_repository = AsyncRepository(task_stats_collection)
+outbox_repository = AsyncRepository(outbox_collection)
+versions_repository = AsyncRepository(versions_collection)
+idempotency_repository = AsyncRepository(idempotency_collection)
+status_log_repository = AsyncRepository(status_log_collection)
+status_daily_repository = AsyncRepository(status_daily_collection)
+chat_messages_repository = AsyncRepository(chat_messages_collection)
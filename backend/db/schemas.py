@@ -1,7 +1,36 @@
+from typing import Iterable, Optional
 from db.models import User, Group, Task, SubTeam, Notification
 
+# Mongo projections holding exactly the fields each serializer reads.
+# Pass them to find()/find_one() so the database never sends back fields an endpoint does not return.
+USER_PROJECTION = {"email": 1, "name": 1, "groups": 1, "skills": 1, "free_time": 1}  # never the password hash / tokens
+GROUP_PROJECTION = {"members": 1, "name": 1, "tasks": 1, "pending_members": 1, "member_names": 1}
+TASK_PROJECTION = {
+    "assigned_to": 1, "name": 1, "description": 1, "due_date": 1, "status": 1,
+    "group": 1, "priority": 1, "labels": 1, "comment_count": 1, "latest_comment": 1, "rank": 1,
+    "completed_at": 1,
+}
+SUBTEAM_PROJECTION = {"team_name": 1, "members": 1, "tasks": 1, "group": 1}
+NOTIFICATION_PROJECTION = {
+    "user": 1, "task_id": 1, "group_id": 1, "notification_type": 1, "message": 1, "timestamp": 1, "read": 1,
+}
 
-def _user_serial(user: dict) -> User:
+
+def projection(fields: Iterable[str]) -> dict:
+    """Mongo projection for a list of serialized field names ("id"/"_id" is the document's _id)."""
+    return {("_id" if field == "id" else field): 1 for field in fields}
+
+
+def _only(serialized: dict, fields: Optional[tuple]) -> dict:
+    return serialized if fields is None else {field: serialized[field] for field in fields}
+
+
+# Document -> JSON-ready dict serializers.
+# They read trusted documents from our own database, so no Pydantic model is built or validated; the dicts have
+# the same keys as the corresponding model dumped by alias. Optional fields are read with .get() so documents
+# fetched with a projection serialize as well. Return them through api.utils.FastJSONResponse on list endpoints.
+
+def _user_json(user: dict) -> dict:
     free_time = {}
     for day, slots in (user.get("free_time", {}).get("free_time", {}) or {}).items():
         valid_slots = []
@@ -11,80 +40,91 @@ def _user_serial(user: dict) -> User:
             except (TypeError, KeyError) as e:
                 pass
         free_time[day] = valid_slots
-    return User(
-        _id=str(user["_id"]),
-        email=user["email"],
-        name=user["name"],
-        groups=[str(group_id) for group_id in user.get("groups", []) or []],  # Ensure it's a list
-        skills=[str(skill) for skill in user.get("skills", []) or []],  # Ensure it's a list
-        free_time=free_time,
-        password=None,
-        token= None,
-        status=None,
-        confirmation_code=None
-    )
-
-    
+    return {
+        "_id": str(user["_id"]),
+        "email": user["email"],
+        "name": user.get("name"),
+        "groups": [str(group_id) for group_id in user.get("groups", []) or []],  # Ensure it's a list
+        "skills": [str(skill) for skill in user.get("skills", []) or []],  # Ensure it's a list
+        "free_time": free_time,
+        "password": None,
+        "token": None,
+        "status": None,
+        "confirmation_code": None
+    }
 
-def group_serial(group: dict) -> Group:
-    print(f"inside group_serial: {str(group['_id'])}\n")
-    
-    if "member_names" in group:
-        
-        processed_member_names = {key.replace('[dot]', '.'): value for key, value in group["member_names"].items()}
-        
-        return Group(  # Use the Group model instead of a plain dictionary
-            _id=str(group["_id"]),  # Ensure _id is a string
-            members=group["members"],
-            name=group["name"],
-            tasks=[str(task_id) for task_id in group.get("tasks", [])],  #  Convert task IDs to strings
-            pending_members=group["pending_members"],
-            member_names=processed_member_names
-        )
-    else:
-        return Group(  # Use the Group model instead of a plain dictionary
-            _id=str(group["_id"]),  # Ensure _id is a string
-            members=group["members"],
-            name=group["name"],
-            tasks=[str(task_id) for task_id in group.get("tasks", [])],  #  Convert task IDs to strings
-            pending_members=group["pending_members"]
-        )
-
-
-def _task_serial(task: dict) -> Task:
+def _group_json(group: dict) -> dict:
+    member_names = group.get("member_names")
+    return {
+        "_id": str(group["_id"]),  # Ensure _id is a string
+        "members": group.get("members", []),
+        "name": group.get("name"),
+        "tasks": [str(task_id) for task_id in group.get("tasks", [])],  #  Convert task IDs to strings
+        "pending_members": group.get("pending_members", []),
+        "member_names": {key.replace('[dot]', '.'): value for key, value in member_names.items()} if member_names else {}
+    }
+
+def _task_serial(task: dict) -> dict:
     return {
         "id": str(task["_id"]),
-        "assigned_to": task["assigned_to"],
-        "name": task["name"],
-        "description": task["description"],
-        "due_date": task["due_date"],
-        "status": task["status"],
-        "group": str(task["group"]),
-        "priority": task["priority"],    
-        "labels": task.get("labels", []), 
-        "comments": task.get("comments", [])  
+        "assigned_to": task.get("assigned_to", []),
+        "name": task.get("name"),
+        "description": task.get("description"),
+        "due_date": task.get("due_date"),
+        "status": task.get("status"),
+        "group": str(task.get("group")),
+        "priority": task.get("priority"),
+        "labels": task.get("labels", []),
+        "comment_count": task.get("comment_count", 0),
+        "latest_comment": task.get("latest_comment"),
+        "rank": task.get("rank"),
+        "completed_at": task.get("completed_at"),
+    }
+
+def _comment_json(comment: dict) -> dict:
+    return {
+        "id": str(comment["_id"]),
+        "task_id": comment.get("task_id"),
+        "commenter": comment.get("commenter"),
+        "content": comment.get("content"),
+        "timestamp": comment.get("timestamp"),
+    }
+
+def _subteam_json(subteam: dict) -> dict:
+    return {
+        "_id": str(subteam["_id"]),  # Ensure _id is a string
+        "team_name": subteam.get("team_name"),
+        "members": subteam.get("members", []),  # Assuming these are already emails or strings
+        "tasks": [str(task_id) for task_id in subteam.get("tasks", [])],  # Convert ObjectId to str
+        "group": str(subteam.get("group"))  # Convert group ObjectId to str
     }
 
+def _notification_json(notification: dict) -> dict:
+    return {
+        "_id": str(notification["_id"]),
+        "user": notification.get("user"),
+        "task_id": str(notification.get("task_id")),
+        "group_id": str(notification.get("group_id")),
+        "notification_type": notification.get("notification_type"),
+        "message": notification.get("message"),
+        "timestamp": notification.get("timestamp"),
+        "read": notification.get("read", False)
+    }
+
+
+# Document -> validated model serializers, for single documents
+
+def _user_serial(user: dict) -> User:
+    return User(**_user_json(user))
+
+def group_serial(group: dict) -> Group:
+    return Group(**_group_json(group))
+
 def _subteam_serial(subteam: dict) -> SubTeam:
-    return SubTeam(  # Use the SubTeam model
-        _id=str(subteam["_id"]),  # Ensure _id is a string
-        team_name=subteam["team_name"],
-        members=subteam["members"],  # Assuming these are already emails or strings
-        tasks=[str(task_id) for task_id in subteam.get("tasks", [])],  # Convert ObjectId to str
-        group=str(subteam["group"])  # Convert group ObjectId to str
-    )
+    return SubTeam(**_subteam_json(subteam))
 
 def _notification_serial(notification: dict) -> Notification:
-    return Notification(
-        _id=str(notification["_id"]),
-        user=notification["user"],
-        task_id=str(notification["task_id"]),
-        group_id=str(notification["group_id"]),
-        notification_type=notification["notification_type"],
-        message=notification["message"],
-        timestamp=notification["timestamp"],
-        read=notification["read"]
-    )
+    return Notification(**_notification_json(notification))
 
 
 def users_serial(users: list[dict]) -> list[User]:
@@ -93,11 +133,34 @@ def users_serial(users: list[dict]) -> list[User]:
 def groups_serial(groups: list[dict]) -> list[Group]:
     return [group_serial(group) for group in groups]
 
-def tasks_serial(tasks: list[dict]) -> list[Task]:
-    return [_task_serial(task) for task in tasks]
-
 def subteams_serial(subteams: list[dict]) -> list[SubTeam]:
     return [_subteam_serial(subteam) for subteam in subteams]
 
 def notifications_serial(notifications: list[dict]) -> list[Notification]:
     return [_notification_serial(notification) for notification in notifications]
+
+
+# Bulk serializers for list endpoints. `fields` limits each dict to those keys (fetch them with projection(fields)).
+
+def users_json(users: Iterable[dict], fields: Optional[Iterable[str]] = None) -> list[dict]:
+    fields = tuple(fields) if fields is not None else None
+    return [_only(_user_json(user), fields) for user in users]
+
+def groups_json(groups: Iterable[dict], fields: Optional[Iterable[str]] = None) -> list[dict]:
+    fields = tuple(fields) if fields is not None else None
+    return [_only(_group_json(group), fields) for group in groups]
+
+def tasks_serial(tasks: Iterable[dict], fields: Optional[Iterable[str]] = None) -> list[dict]:
+    fields = tuple(fields) if fields is not None else None
+    return [_only(_task_serial(task), fields) for task in tasks]
+
+def subteams_json(subteams: Iterable[dict], fields: Optional[Iterable[str]] = None) -> list[dict]:
+    fields = tuple(fields) if fields is not None else None
+    return [_only(_subteam_json(subteam), fields) for subteam in subteams]
+
+def notifications_json(notifications: Iterable[dict], fields: Optional[Iterable[str]] = None) -> list[dict]:
+    fields = tuple(fields) if fields is not None else None
+    return [_only(_notification_json(notification), fields) for notification in notifications]
+
+def comments_json(comments: Iterable[dict]) -> list[dict]:
+    return [_comment_json(comment) for comment in comments]
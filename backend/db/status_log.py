@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from bson import ObjectId
+from pymongo import ReplaceOne
+from db.models import utc_now
+from db.repository import status_log_repository, status_daily_repository
+
+# Status history: every status a task takes is appended to status_log by record_task_changes()
+# (db/task_stats.py), creation included:
+#   {"task": task id, "group": ..., "users": [assignees], "from": old status or None, "to": new status, "at": datetime}
+# Entries into "Completed" also carry "lead" (seconds since the task was created) and, when the task was ever
+# "In Progress", "cycle" (seconds since it first was), so the summaries never need to join entries.
+#
+# roll_up_day() folds one day of the log into status_daily, one document per group and per user and day:
+#   {"_id": "group:<group id>:<YYYY-MM-DD>", "scope": "group", "group": ..., "day": datetime,
+#    "created": n, "completed": n, "lead_sum": s, "lead_count": n, "cycle_sum": s, "cycle_count": n}
+# (user documents have "user" instead of "group"), which GET /tasks/analytics reads through analytics_json().
+# The scheduler in dispatch_service/status_rollups.py keeps the last two days current.
+
+STARTED_STATUS = "In Progress"
+DONE_STATUS = "Completed"
+
+
+def status_log_entries(changes: Iterable[tuple[Optional[dict], Optional[dict]]], at: datetime) -> list[dict]:
+    """Log entries of the task changes that set a status; the tasks need _id, group, assigned_to and status."""
+    entries = []
+    for before, after in changes:
+        if after is None or (before is not None and before.get("status") == after.get("status")):
+            continue
+        entries.append({
+            "task": str(after["_id"]),
+            "group": str(after.get("group")),
+            "users": after.get("assigned_to") or [],
+            "from": before.get("status") if before else None,
+            "to": after.get("status"),
+            "at": at,
+        })
+    return entries
+
+
+async def append_status_log(entries: list[dict]) -> None:
+    completions = [entry for entry in entries if entry["to"] == DONE_STATUS]
+    if completions:
+        started = {}
+        for entry in await status_log_repository.find(
+            {"task": {"$in": [entry["task"] for entry in completions]}, "to": STARTED_STATUS}, {"task": 1, "at": 1}, sort=[("at", 1)],
+        ):
+            started.setdefault(entry["task"], entry["at"])
+        for entry in completions:
+            entry["lead"] = (entry["at"] - ObjectId(entry["task"]).generation_time.replace(tzinfo=None)).total_seconds()
+            if entry["task"] in started:
+                entry["cycle"] = (entry["at"] - started[entry["task"]]).total_seconds()
+    await status_log_repository.insert_many(entries, ordered=False)
+
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _day_totals(key: str) -> dict:
+    return {"$group": {
+        "_id": key,
+        "created": {"$sum": {"$cond": [{"$eq": ["$from", None]}, 1, 0]}},
+        "completed": {"$sum": {"$cond": [{"$eq": ["$to", DONE_STATUS]}, 1, 0]}},
+        "lead_sum": {"$sum": "$lead"},
+        "lead_count": {"$sum": {"$cond": [{"$gt": ["$lead", None]}, 1, 0]}},
+        "cycle_sum": {"$sum": "$cycle"},
+        "cycle_count": {"$sum": {"$cond": [{"$gt": ["$cycle", None]}, 1, 0]}},
+    }}
+
+
+def day_rollup_pipeline(day: datetime) -> list[dict]:
+    return [
+        {"$match": {"at": {"$gte": day, "$lt": day + timedelta(days=1)}}},
+        {"$facet": {
+            "group": [_day_totals("$group")],
+            "user": [{"$unwind": "$users"}, _day_totals("$users")],
+        }},
+    ]
+
+
+def day_summary_writes(day: datetime, totals: dict) -> list[ReplaceOne]:
+    """Upserts of the summaries of one day from the result of day_rollup_pipeline()."""
+    summaries = []
+    for scope, rows in totals.items():
+        for row in rows:
+            key = row.pop("_id")
+            summary_id = f"{scope}:{key}:{day:%Y-%m-%d}"
+            summaries.append(ReplaceOne({"_id": summary_id}, {"_id": summary_id, "scope": scope, scope: key, "day": day, **row}, upsert=True))
+    return summaries
+
+
+async def roll_up_day(day: datetime) -> int:
+    """(Re)compute the summaries of one day from the log; returns the number of summary documents written."""
+    day = day_start(day)
+    summaries = day_summary_writes(day, (await status_log_repository.aggregate(day_rollup_pipeline(day)))[0])
+    if summaries:
+        await status_daily_repository.bulk_write(summaries, ordered=False)
+    return len(summaries)
+
+
+async def roll_up_recent(now: Optional[datetime] = None) -> int:
+    """Refresh today's summaries, and yesterday's for the changes made just before midnight."""
+    today = day_start(now or utc_now())
+    return await roll_up_day(today - timedelta(days=1)) + await roll_up_day(today)
+
+
+def _average_hours(total_seconds: float, count: int) -> Optional[float]:
+    return round(total_seconds / count / 3600, 2) if count else None
+
+
+def analytics_json(summaries: list[dict], since: datetime, weeks: int) -> dict:
+    """
+    Lead time, cycle time (average hours from creation / from first "In Progress" to "Completed") and
+    throughput over the daily summaries of one group or user since `since`, a Monday: overall, and per
+    week (weeks without any activity included) and per day.
+    """
+    counts = ("created", "completed", "lead_sum", "lead_count", "cycle_sum", "cycle_count")
+    totals = dict.fromkeys(counts, 0)
+    weekly = {since + timedelta(weeks=i): dict.fromkeys(counts, 0) for i in range(weeks)}
+    daily = []
+    for summary in sorted(summaries, key=lambda summary: summary["day"]):
+        week = weekly.get(summary["day"] - timedelta(days=summary["day"].weekday()))
+        for field in counts:
+            totals[field] += summary.get(field, 0)
+            if week is not None:
+                week[field] += summary.get(field, 0)
+        daily.append({"day": summary["day"].strftime("%Y-%m-%d"), "created": summary.get("created", 0), "completed": summary.get("completed", 0)})
+
+    def times(row: dict) -> dict:
+        return {
+            "created": row["created"],
+            "completed": row["completed"],
+            "lead_time_hours": _average_hours(row["lead_sum"], row["lead_count"]),
+            "cycle_time_hours": _average_hours(row["cycle_sum"], row["cycle_count"]),
+        }
+
+    return {
+        "since": since.strftime("%Y-%m-%d"),
+        **times(totals),
+        "weekly": [{"week": week.strftime("%Y-%m-%d"), **times(row)} for week, row in weekly.items()],
+        "daily": daily,
+    }
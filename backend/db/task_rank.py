@@ -0,0 +1,91 @@
+from typing import Optional
+from pymongo import UpdateOne
+from db.repository import tasks_repository
+from db.versions import bump_versions, task_keys
+
+# Board order: every task has a "rank", a string of base-62 digits read as a fraction (0.<digits>), so ordering
+# tasks by rank as strings orders them on the board and there is always room for a rank between two others.
+# Moving a task writes its own rank only. New tasks go to the bottom of their column by a fixed step; a task
+# moved between two others takes the midpoint, which gets about one digit longer every few moves into the
+# same gap. Columns whose ranks get too long are rewritten evenly by rebalance_column() in the background.
+# Ranks never end in "0", otherwise there could be nothing between "x" and "x0".
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"  # in ASCII order
+BASE = len(DIGITS)
+STEP_WIDTH = 6  # appending / prepending moves the 6th digit: 62**4 (~14M) steps before ranks grow
+STEP = BASE ** 2
+MAX_RANK_LENGTH = 24  # a longer rank makes its column due for rebalancing
+
+
+def _to_int(rank: str) -> int:
+    """The first STEP_WIDTH digits of `rank` as an integer (less than or equal to the rank)."""
+    value = 0
+    for digit in rank[:STEP_WIDTH].ljust(STEP_WIDTH, "0"):
+        value = value * BASE + DIGITS.index(digit)
+    return value
+
+
+def _from_int(value: int) -> str:
+    digits = []
+    for _ in range(STEP_WIDTH):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits)).rstrip("0")
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    """A rank strictly between `low` ("" for 0) and `high` (None for 1)."""
+    if high is not None:
+        shared = 0
+        while shared < len(high) and (low[shared] if shared < len(low) else "0") == high[shared]:
+            shared += 1
+        if shared:
+            return high[:shared] + _midpoint(low[shared:], high[shared:])
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    # adjacent digits: keep the lower one and go one digit deeper
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def rank_between(previous: Optional[str], next: Optional[str]) -> str:
+    """Rank for a task placed between the tasks ranked `previous` (above) and `next` (below); None is the column end."""
+    if previous is None and next is None:
+        return _from_int(BASE ** STEP_WIDTH // 2)
+    if next is None:
+        value = _to_int(previous) + STEP
+        return _from_int(value) if value < BASE ** STEP_WIDTH else _midpoint(previous, None)
+    if previous is None:
+        value = _to_int(next) - STEP
+        return _from_int(value) if value > 0 and _from_int(value) < next else _midpoint("", next)
+    if previous >= next:
+        raise ValueError(f"Rank {previous!r} is not before {next!r}")
+    return _midpoint(previous, next)
+
+
+def spread_ranks(count: int) -> list[str]:
+    """`count` increasing ranks evenly spaced over the whole range, the ranks of a rebalanced column."""
+    return [_from_int((i + 1) * BASE ** STEP_WIDTH // (count + 1)) for i in range(count)]
+
+
+def needs_rebalance(rank: str) -> bool:
+    return len(rank) > MAX_RANK_LENGTH
+
+
+async def rebalance_column(group: str, status: str) -> int:
+    """Give the tasks of one board column evenly spaced ranks, keeping their order. Returns the tasks re-ranked."""
+    tasks = await tasks_repository.find(
+        {"group": group, "status": status}, {"rank": 1, "group": 1, "assigned_to": 1}, sort=[("rank", 1), ("_id", 1)],
+    )
+    updates = [
+        # a task moved while this runs keeps the rank it was moved to
+        UpdateOne({"_id": task["_id"], "rank": task.get("rank")}, {"$set": {"rank": rank}})
+        for task, rank in zip(tasks, spread_ranks(len(tasks))) if task.get("rank") != rank
+    ]
+    if updates:
+        await tasks_repository.bulk_write(updates, ordered=False)
+        await bump_versions(task_keys(tasks))
+    return len(updates)
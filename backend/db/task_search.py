@@ -0,0 +1,86 @@
+import re
+from typing import Optional
+
+# Task search: every task stores the distinct lowercase words of its name, description and labels in
+# "search_tokens" and the words of its comments in "comment_tokens". Both are indexed together with "group",
+# so a prefix query (^term) on a token array is an index range scan. Matches are ranked in Python by where
+# the terms occur. Routes writing those fields call task_search_tokens() / comment_search_tokens().
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKENS_PER_FIELD = 500  # bounds the index entries a very long description can create
+MAX_QUERY_TERMS = 5
+SEARCH_CANDIDATES = 200  # matches fetched and ranked per query; broad prefixes rank a sample
+
+_WORD = re.compile(r"\w+")
+
+# weight of a term found in each field; an exact word counts double a prefix match
+WEIGHTS = {"name": 4.0, "labels": 3.0, "description": 1.0, "comments": 0.5}
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    tokens = {token for token in _WORD.findall((text or "").lower()) if len(token) >= MIN_TOKEN_LENGTH}
+    return sorted(tokens)[:MAX_TOKENS_PER_FIELD]
+
+
+def task_search_tokens(task: dict) -> list[str]:
+    tokens = set(tokenize(task.get("name"))) | set(tokenize(task.get("description")))
+    for label in task.get("labels") or []:
+        tokens.update(tokenize(label))
+    return sorted(tokens)
+
+
+def with_search_tokens(task: dict, update_data: dict) -> dict:
+    """$set document for an update of `task`, recomputing search_tokens when a searched field changes."""
+    if not any(field in update_data for field in ("name", "description", "labels")):
+        return update_data
+    return {**update_data, "search_tokens": task_search_tokens({**task, **update_data})}
+
+
+def comment_search_tokens(content: Optional[str]) -> list[str]:
+    return tokenize(content)
+
+
+def query_terms(q: str) -> list[str]:
+    terms = []
+    for term in _WORD.findall(q.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def search_filter(scope: dict, terms: list[str]) -> dict:
+    """
+    Tasks in `scope` containing a word starting with every term, in their own fields or in their comments.
+    The first term is the root $or, so each branch is a range scan on (group, search_tokens) or
+    (group, comment_tokens); the other terms are checked on the documents found.
+    """
+    def matches(term):
+        prefix = re.compile(f"^{re.escape(term)}")
+        return {"$or": [{"search_tokens": prefix}, {"comment_tokens": prefix}]}
+
+    first = re.compile(f"^{re.escape(terms[0])}")
+    rest = {"$and": [matches(term) for term in terms[1:]]} if len(terms) > 1 else {}
+    return {"$or": [{**scope, field: first, **rest} for field in ("search_tokens", "comment_tokens")]}
+
+
+def rank(tasks: list[dict], terms: list[str]) -> list[tuple[float, dict]]:
+    """(score, task) pairs, best first; tasks need name, description, labels and comment_tokens."""
+    patterns = [(re.compile(rf"\b{re.escape(term)}\b"), re.compile(rf"\b{re.escape(term)}")) for term in terms]
+    ranked = []
+    for task in tasks:
+        fields = (
+            ("name", (task.get("name") or "").lower()),
+            ("labels", " ".join(task.get("labels") or ()).lower()),
+            ("description", (task.get("description") or "").lower()),
+            ("comments", " ".join(task.get("comment_tokens") or ())),
+        )
+        score = 0.0
+        for exact, prefix in patterns:
+            for field, text in fields:
+                if exact.search(text):
+                    score += 2 * WEIGHTS[field]
+                elif prefix.search(text):
+                    score += WEIGHTS[field]
+        ranked.append((score, task))
+    ranked.sort(key=lambda pair: pair[0], reverse=True)
+    return ranked
@@ -0,0 +1,115 @@
+import asyncio
+from collections import Counter
+from itertools import chain
+from typing import Iterable, Optional
+from pymongo import UpdateOne
+from pymongo.database import Database
+from db.models import VALID_TASK_STATUSES, VALID_TASK_PRIORITIES, utc_now
+from db.repository import task_stats_repository
+from db.versions import bump_versions, task_keys
+from db.status_log import status_log_entries, append_status_log
+
+# Task counters, kept up to date by the routes that write tasks so GET /tasks/stats never scans tasks.
+# record_task_changes() is also where task writes bump the versions behind the task list ETags and append to the
+# status history (db/status_log.py).
+# One document per scope:
+#   {"_id": "group:<group id>",               "scope": "group",   "group": ...}
+#   {"_id": "user:<group id>:<email>",        "scope": "user",    "group": ..., "user": ...}
+#   {"_id": "subteam:<subteam id>",           "scope": "subteam", "group": ..., "subteam": ...}
+# each holding {"total": n, "status": {"To Do": n, ...}, "priority": {"Low": n, ...}}.
+# Overdue counts depend on the clock, so they are counted from the tasks indexes at read time instead.
+# Archived tasks (dispatch_service/archiver.py) stay counted, as Completed.
+# Writes that bypass these helpers make the counters drift; rebuild_task_stats() recomputes them.
+
+OPEN_STATUSES = [task_status for task_status in VALID_TASK_STATUSES if task_status != "Completed"]
+STATS_FIELDS = {"group": 1, "assigned_to": 1, "subteam": 1, "status": 1, "priority": 1}
+
+
+def _scopes(task: dict) -> list[tuple[str, dict]]:
+    group = str(task.get("group"))
+    scopes = [(f"group:{group}", {"scope": "group", "group": group})]
+    for user in set(task.get("assigned_to") or []):
+        scopes.append((f"user:{group}:{user}", {"scope": "user", "group": group, "user": user}))
+    if task.get("subteam"):
+        scopes.append((f"subteam:{task['subteam']}", {"scope": "subteam", "group": group, "subteam": str(task["subteam"])}))
+    return scopes
+
+
+def _counters(task: dict) -> list[str]:
+    # unknown values are counted as "other" so user input never becomes a field name
+    task_status = task.get("status") if task.get("status") in VALID_TASK_STATUSES else "other"
+    priority = task.get("priority") if task.get("priority") in VALID_TASK_PRIORITIES else "other"
+    return ["total", f"status.{task_status}", f"priority.{priority}"]
+
+
+def _deltas(changes: Iterable[tuple[Optional[dict], Optional[dict]]]) -> dict[str, tuple[dict, Counter]]:
+    deltas = {}
+    for before, after in changes:
+        for task, sign in ((before, -1), (after, 1)):
+            if task is None:
+                continue
+            for key, identity in _scopes(task):
+                counts = deltas.setdefault(key, (identity, Counter()))[1]
+                for counter in _counters(task):
+                    counts[counter] += sign
+    return deltas
+
+
+def stat_updates(changes: Iterable[tuple[Optional[dict], Optional[dict]]]) -> list[UpdateOne]:
+    """
+    Counter updates for a set of task changes, each given as (task before, task after);
+    None before means the task was created, None after that it was deleted.
+    """
+    updates = []
+    for key, (identity, counts) in _deltas(changes).items():
+        increments = {counter: n for counter, n in counts.items() if n}
+        if increments:
+            updates.append(UpdateOne({"_id": key}, {"$inc": increments, "$setOnInsert": identity}, upsert=True))
+    return updates
+
+
+async def record_task_changes(changes: Iterable[tuple[Optional[dict], Optional[dict]]], versions: Iterable[str] = ()) -> None:
+    """
+    Apply the counter updates of the given task changes, bump the versions of the task lists they touch
+    (plus any other `versions` keys the write changed) and log the new statuses, concurrently.
+    New and changed tasks need their _id.
+    """
+    changes = list(changes)
+    updates = stat_updates(changes)
+    writes = [bump_versions(task_keys(task for change in changes for task in change) | set(versions))]
+    if updates:
+        writes.append(task_stats_repository.bulk_write(updates, ordered=False))
+    if entries := status_log_entries(changes, utc_now()):
+        writes.append(append_status_log(entries))
+    await asyncio.gather(*writes)
+
+
+def stats_json(counters: Optional[dict], overdue: int = 0) -> dict:
+    counters = counters or {}
+    return {
+        "total": counters.get("total", 0),
+        "status": {task_status: counters.get("status", {}).get(task_status, 0) for task_status in VALID_TASK_STATUSES},
+        "priority": {priority: counters.get("priority", {}).get(priority, 0) for priority in VALID_TASK_PRIORITIES},
+        "overdue": overdue,
+    }
+
+
+def rebuild_task_stats(db: Database, batch_size: int = 1000) -> int:
+    """Recompute every counter from the tasks and archived_tasks collections. Returns the number of counter documents."""
+    tasks = chain(
+        db["tasks"].find({}, STATS_FIELDS, batch_size=batch_size),
+        db["archived_tasks"].find({}, STATS_FIELDS, batch_size=batch_size),
+    )
+    deltas = _deltas((None, task) for task in tasks)
+    documents = []
+    for key, (identity, counts) in deltas.items():
+        document = {"_id": key, **identity, "total": counts["total"], "status": {}, "priority": {}}
+        for counter, n in counts.items():
+            if "." in counter:
+                field, value = counter.split(".", 1)
+                document[field][value] = n
+        documents.append(document)
+    db["task_stats"].delete_many({})
+    if documents:
+        db["task_stats"].insert_many(documents)
+    return len(documents)
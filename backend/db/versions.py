@@ -0,0 +1,65 @@
+from typing import Iterable, Optional
+from pymongo import UpdateOne
+from db.repository import versions_repository, groups_repository
+
+# Version counters behind the ETags of list responses: one document {"_id": key, "v": n} per key, incremented
+# by every write that changes what the lists depending on that key return. A list's ETag is derived from the
+# versions of its keys, so a conditional GET is answered by reading these small documents only.
+# Writers bump after writing and readers read the versions before the data, so an ETag is never newer than
+# the response it is sent with.
+
+
+def tasks_of_group(group_id: str) -> str:
+    return f"tasks:group:{group_id}"
+
+
+def tasks_of_user(email: str) -> str:
+    return f"tasks:user:{email}"
+
+
+def groups_of_user(email: str) -> str:
+    return f"groups:user:{email}"
+
+
+def notifications_of_user(email: str) -> str:
+    return f"notifications:user:{email}"
+
+
+def notifications_of_group(group_id: str) -> str:
+    return f"notifications:group:{group_id}"
+
+
+def task_keys(tasks: Iterable[Optional[dict]]) -> set[str]:
+    """Keys of the task lists the given task documents appear in."""
+    keys = set()
+    for task in tasks:
+        if task is None:
+            continue
+        keys.add(tasks_of_group(str(task.get("group"))))
+        keys.update(tasks_of_user(user) for user in task.get("assigned_to") or [])
+    return keys
+
+
+def member_keys(groups: Iterable[dict]) -> set[str]:
+    """Group list keys of the members of the given groups."""
+    return {groups_of_user(email) for group in groups for email in group.get("members", [])}
+
+
+async def co_member_keys(email: str) -> set[str]:
+    """Group list keys of everyone sharing a group with `email`, whose group lists show that user's profile."""
+    groups = await groups_repository.find({"members": email}, {"members": 1})
+    return member_keys(groups) | {groups_of_user(email)}
+
+
+async def bump_versions(keys: Iterable[str]) -> None:
+    keys = set(keys)
+    if keys:
+        await versions_repository.bulk_write(
+            [UpdateOne({"_id": key}, {"$inc": {"v": 1}}, upsert=True) for key in sorted(keys)], ordered=False,
+        )
+
+
+async def get_versions(keys: Iterable[str]) -> dict[str, int]:
+    keys = list(keys)
+    found = {doc["_id"]: doc["v"] for doc in await versions_repository.find({"_id": {"$in": keys}})}
+    return {key: found.get(key, 0) for key in keys}
@@ -0,0 +1,77 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from db.models import utc_now
+from db.repository import tasks_repository, archived_tasks_repository, groups_repository, subteams_repository
+from db.versions import bump_versions, task_keys, member_keys
+from api.routes.task_events import publish_task_event
+from dispatch_service.dispatch_utils import periodic
+from log_service.logging_utils import get_logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = get_logger("archiver")
+
+# Archive tier: tasks completed more than ARCHIVE_AFTER_DAYS ago are moved from tasks to archived_tasks by a
+# periodic job (dispatch_utils.periodic), and their ids are removed from the tasks arrays of groups and subteams,
+# so boards, lists and duplicate checks only touch live tasks. Archived tasks keep their _id and stay in the
+# task counters (db/task_stats.py); GET /tasks/archive pages through them.
+
+ARCHIVE_AFTER_DAYS : float = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_INTERVAL_SECONDS : float = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_BATCH_SIZE : int = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _archivable(cutoff: datetime) -> dict:
+    return {"status": "Completed", "completed_at": {"$lt": cutoff}}
+
+
+async def archive_completed_tasks(now: Optional[datetime] = None) -> int:
+    """Move every task completed before the retention window to the archive; returns how many were archived."""
+    cutoff = (now or utc_now()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = 0
+    while tasks := await tasks_repository.find(_archivable(cutoff), limit=ARCHIVE_BATCH_SIZE):
+        archived_at = utc_now()
+        # copy first: if the run stops in between, the tasks are archived again and the copies already made skipped
+        try:
+            await archived_tasks_repository.insert_many([{**task, "archived_at": archived_at} for task in tasks], ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in e.details["writeErrors"]):
+                raise
+        ids = [task["_id"] for task in tasks]
+        # re-check the condition, a task reopened since it was read stays live
+        deleted = await tasks_repository.delete_many({"_id": {"$in": ids}, **_archivable(cutoff)})
+        if deleted.deleted_count < len(tasks):
+            reopened = [task["_id"] for task in await tasks_repository.find({"_id": {"$in": ids}}, {"_id": 1})]
+            await archived_tasks_repository.delete_many({"_id": {"$in": reopened}})
+            tasks = [task for task in tasks if task["_id"] not in reopened]
+
+        if not tasks:
+            continue
+
+        task_ids = [str(task["_id"]) for task in tasks]
+        ids_by_group = {}
+        for task in tasks:
+            ids_by_group.setdefault(str(task.get("group")), []).append(str(task["_id"]))
+        group_ids = [ObjectId(group_id) for group_id in ids_by_group if ObjectId.is_valid(group_id)]
+        groups = []
+        if group_ids:
+            await groups_repository.bulk_write([
+                UpdateOne({"_id": group_id}, {"$pull": {"tasks": {"$in": ids_by_group[str(group_id)]}}}) for group_id in group_ids
+            ], ordered=False)
+            # GET /api/group/ shows the tasks arrays too: its members' group lists change
+            groups = await groups_repository.find({"_id": {"$in": group_ids}}, {"members": 1})
+        await subteams_repository.update_many({"tasks": {"$in": task_ids}}, {"$pull": {"tasks": {"$in": task_ids}}})
+        await bump_versions(task_keys(tasks) | member_keys(groups))
+        for task in tasks:
+            publish_task_event(task["group"], "task_archived", task["_id"])
+        archived += len(tasks)
+    return archived
+
+
+periodic("Archiver", ARCHIVE_INTERVAL_SECONDS, archive_completed_tasks)
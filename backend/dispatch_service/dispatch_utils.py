@@ -0,0 +1,194 @@
+import asyncio
+import os
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+from db.models import utc_now
+from db.repository import outbox_repository
+from log_service.logging_utils import get_logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = get_logger("dispatch")
+
+# Fan-out work (emails, notifications) is written to the "outbox" collection by the request that causes it and
+# delivered afterwards by worker coroutines started in main.lifespan. A request only pays for one insert_many;
+# jobs survive restarts, are delivered in batches and are retried with backoff when delivery fails.
+#
+# Job document:
+#   {"kind": "notification", "payload": {...}, "status": "pending" | "processing" | "done" | "failed",
+#    "attempts": 0, "available_at": datetime, "locked_until": datetime, "claim": str, "last_error": str,
+#    "created_at": datetime, "completed_at": datetime}
+
+DISPATCH_WORKERS : int = int(os.getenv("DISPATCH_WORKERS", "2"))
+DISPATCH_BATCH_SIZE : int = int(os.getenv("DISPATCH_BATCH_SIZE", "50"))
+DISPATCH_MAX_ATTEMPTS : int = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "5"))
+DISPATCH_RETRY_BASE_SECONDS : float = float(os.getenv("DISPATCH_RETRY_BASE_SECONDS", "10"))
+# how long a claimed batch is reserved for its worker; after that another worker may take it over
+DISPATCH_LEASE_SECONDS : float = float(os.getenv("DISPATCH_LEASE_SECONDS", "120"))
+# idle workers look for due retries this often; new jobs wake them immediately
+DISPATCH_POLL_SECONDS : float = float(os.getenv("DISPATCH_POLL_SECONDS", "5"))
+
+# kind -> async handler(jobs) returning {job _id: error message} for the jobs that could not be delivered
+Handler = Callable[[list[dict]], Awaitable[dict]]
+_handlers : dict[str, Handler] = {}
+_wakeup : Optional[asyncio.Event] = None
+# name -> (interval in seconds, async job() returning how many items it handled), see periodic()
+_periodic_jobs : dict[str, tuple[float, Callable[[], Awaitable[int]]]] = {}
+
+
+def register_handler(kind: str, handler: Handler) -> None:
+    _handlers[kind] = handler
+
+
+def new_job(kind: str, payload: dict) -> dict:
+    now = utc_now()
+    return {
+        "kind": kind,
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "available_at": now,
+        "created_at": now,
+    }
+
+
+async def enqueue(jobs: list[dict]) -> None:
+    """Durably record jobs built with new_job() (one round trip) and wake the workers."""
+    if not jobs:
+        return
+    await outbox_repository.insert_many(jobs, ordered=False)
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def claim_batch(limit: int = DISPATCH_BATCH_SIZE) -> list[dict]:
+    """Reserve up to `limit` due jobs for this worker."""
+    now = utc_now()
+    claim = uuid.uuid4().hex
+    claimable = {"$or": [
+        {"status": "pending", "available_at": {"$lte": now}},
+        {"status": "processing", "locked_until": {"$lt": now}},  # worker died mid-batch
+    ]}
+    candidates = await outbox_repository.find(claimable, {"_id": 1}, limit=limit)
+    if not candidates:
+        return []
+    # re-check the condition so a job another worker claimed in the meantime is not taken twice
+    await outbox_repository.update_many(
+        {"$and": [{"_id": {"$in": [job["_id"] for job in candidates]}}, claimable]},
+        {"$set": {"status": "processing", "claim": claim, "locked_until": now + timedelta(seconds=DISPATCH_LEASE_SECONDS)}},
+    )
+    return await outbox_repository.find({"claim": claim, "status": "processing"})
+
+
+async def process_batch(jobs: list[dict]) -> None:
+    """Deliver claimed jobs (grouped by kind, one handler call per kind) and record the outcome."""
+    by_kind : dict[str, list[dict]] = {}
+    for job in jobs:
+        by_kind.setdefault(job["kind"], []).append(job)
+
+    errors : dict = {}
+    for kind, kind_jobs in by_kind.items():
+        handler = _handlers.get(kind)
+        if handler is None:
+            errors.update({job["_id"]: f"No handler registered for {kind}" for job in kind_jobs})
+            continue
+        try:
+            errors.update(await handler(kind_jobs))
+        except Exception as e:
+            logger.exception("Dispatch handler for %s failed", kind)
+            errors.update({job["_id"]: str(e) for job in kind_jobs})
+
+    now = utc_now()
+    delivered = [job["_id"] for job in jobs if job["_id"] not in errors]
+    if delivered:
+        await outbox_repository.update_many(
+            {"_id": {"$in": delivered}},
+            {"$set": {"status": "done", "completed_at": now}, "$unset": {"claim": "", "locked_until": ""}},
+        )
+    for job in jobs:
+        if job["_id"] not in errors:
+            continue
+        attempts = job["attempts"] + 1
+        gave_up = attempts >= DISPATCH_MAX_ATTEMPTS
+        await outbox_repository.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {
+                    "status": "failed" if gave_up else "pending",
+                    "attempts": attempts,
+                    "last_error": errors[job["_id"]],
+                    "available_at": now + timedelta(seconds=DISPATCH_RETRY_BASE_SECONDS * 2 ** (attempts - 1)),
+                },
+                "$unset": {"claim": "", "locked_until": ""},
+            },
+        )
+        if gave_up:
+            logger.error("Dispatch job %s (%s) failed %d times: %s", job["_id"], job["kind"], attempts, errors[job["_id"]])
+
+
+async def drain() -> int:
+    """Deliver every job that is due right now; returns how many were processed."""
+    processed = 0
+    while jobs := await claim_batch():
+        await process_batch(jobs)
+        processed += len(jobs)
+    return processed
+
+
+async def _worker(number: int) -> None:
+    while True:
+        try:
+            _wakeup.clear()
+            if await drain():
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Dispatch worker %d error: %s", number, e)
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=DISPATCH_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_workers(count: int = DISPATCH_WORKERS) -> list[asyncio.Task]:
+    global _wakeup
+    _wakeup = asyncio.Event()
+    return [asyncio.create_task(_worker(number)) for number in range(count)]
+
+
+async def stop_workers(workers: list[asyncio.Task]) -> None:
+    # jobs of an interrupted batch stay "processing" and are reclaimed when their lease runs out
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+def periodic(name: str, interval: float, job: Callable[[], Awaitable[int]]) -> None:
+    """Have `job` run every `interval` seconds (after each run finishes) once start_periodic() is called."""
+    _periodic_jobs[name] = (interval, job)
+
+
+async def _run_periodic(name: str, interval: float, job: Callable[[], Awaitable[int]]) -> None:
+    while True:
+        try:
+            handled = await job()
+            if handled:
+                logger.info("%s: %d handled", name, handled)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("%s scheduler error: %s", name, e)
+        await asyncio.sleep(interval)
+
+
+def start_periodic() -> list[asyncio.Task]:
+    return [asyncio.create_task(_run_periodic(name, interval, job)) for name, (interval, job) in _periodic_jobs.items()]
+
+
+async def stop_periodic(schedulers: list[asyncio.Task]) -> None:
+    for scheduler in schedulers:
+        scheduler.cancel()
+    await asyncio.gather(*schedulers, return_exceptions=True)
@@ -0,0 +1,62 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from db.models import utc_now
+from db.repository import tasks_repository
+from db.task_stats import OPEN_STATUSES
+from api.routes.notifications import notification_job
+from api.request_model.notifications_request_schema import CreateNotificationRequest
+from dispatch_service.dispatch_utils import enqueue, periodic
+from log_service.logging_utils import get_logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = get_logger("reminders")
+
+# "Task Due Soon" notifications. Tasks are written with reminder_sent=False (reset whenever the due date changes);
+# a periodic job (dispatch_utils.periodic) walks the partial index on due_date of those tasks in
+# batches, claims each batch and queues one notification per assignee through the outbox.
+
+REMINDER_WINDOW_HOURS : float = float(os.getenv("REMINDER_WINDOW_HOURS", "24"))
+REMINDER_INTERVAL_SECONDS : float = float(os.getenv("REMINDER_INTERVAL_SECONDS", "300"))
+REMINDER_BATCH_SIZE : int = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+REMINDER_FIELDS = {"assigned_to": 1, "group": 1, "name": 1, "due_date": 1}
+
+
+def reminder_job(user_email: str, task: dict) -> dict:
+    return notification_job(CreateNotificationRequest(
+        user_email=user_email,
+        group_id=str(task["group"]),
+        notification_type="Task Due Soon",
+        content=f"Your task {task['name']} is due on {task['due_date']:%Y-%m-%d %H:%M} UTC",
+        task_id=str(task["_id"]),
+    ))
+
+
+async def send_due_reminders(now: Optional[datetime] = None) -> int:
+    """Queue reminders for every open task due within the window; returns how many tasks were reminded."""
+    now = now or utc_now()
+    due_soon = {
+        "reminder_sent": False,
+        "due_date": {"$gte": now, "$lte": now + timedelta(hours=REMINDER_WINDOW_HOURS)},
+        "status": {"$in": OPEN_STATUSES},
+    }
+    reminded = 0
+    while candidates := await tasks_repository.find(due_soon, {"_id": 1}, sort=[("due_date", 1)], limit=REMINDER_BATCH_SIZE):
+        # claim the batch first so that several app instances never remind the same task twice
+        claim = uuid.uuid4().hex
+        await tasks_repository.update_many(
+            {"_id": {"$in": [task["_id"] for task in candidates]}, "reminder_sent": False},
+            {"$set": {"reminder_sent": True, "reminder_claim": claim}},
+        )
+        tasks = await tasks_repository.find(
+            {"_id": {"$in": [task["_id"] for task in candidates]}, "reminder_claim": claim}, REMINDER_FIELDS,
+        )
+        await enqueue([reminder_job(user, task) for task in tasks for user in task.get("assigned_to", [])])
+        reminded += len(tasks)
+    return reminded
+
+
+periodic("Due-date reminders", REMINDER_INTERVAL_SECONDS, send_due_reminders)
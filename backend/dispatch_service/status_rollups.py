@@ -0,0 +1,15 @@
+import os
+from db.status_log import roll_up_recent
+from dispatch_service.dispatch_utils import periodic
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Keeps the daily status summaries read by GET /tasks/analytics (db/status_log.py) current: a periodic job
+# (dispatch_utils.periodic) re-rolls yesterday and today from the status log, so today's numbers lag by at most
+# an interval. Older days are rolled up by the seed_status_log migration.
+
+ROLLUP_INTERVAL_SECONDS : float = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "900"))
+
+
+periodic("Status roll-ups", ROLLUP_INTERVAL_SECONDS, roll_up_recent)
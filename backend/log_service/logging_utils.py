@@ -0,0 +1,112 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOGGER_NAME = "fastapi_app"
+LOG_LEVEL : str = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT : str = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+# records waiting for the writer thread; when full new records are dropped instead of blocking the request
+LOG_QUEUE_SIZE : int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Correlation id of the request being handled; set by api.middleware.RequestIdMiddleware
+request_id_var : ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# attributes every LogRecord has; anything else was passed through `extra=` and is added to the JSON output
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the correlation id of the request that logged it."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of the records below WARNING, for loggers on noisy paths."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full rather than waiting for the writer."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging() -> logging.Logger:
+    """
+    Configure the "fastapi_app" logger. Request handlers only put records on a queue; a QueueListener thread
+    formats them and writes them to stdout, so logging never does blocking I/O on the event loop.
+    Safe to call more than once.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if any(isinstance(handler, NonBlockingQueueHandler) for handler in logger.handlers):
+        return logger
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        console_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - [%(request_id)s] %(message)s"))
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flush what is still queued on shutdown
+    return logger
+
+
+def get_logger(name: str, sample_rate: float = 1.0) -> logging.Logger:
+    """Child of the "fastapi_app" logger; below WARNING only `sample_rate` of its records are kept."""
+    setup_logging()
+    logger = logging.getLogger(f"{LOGGER_NAME}.{name}")
+    if sample_rate < 1.0 and not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(sample_rate))
+    return logger
@@ -6,10 +6,21 @@ from api.routes.calendar import calendar_router
 from api.routes.user import user_router
 from api.routes.files import files_router
 from api.routes.chat import chat_router
+from api.routes.task_events import task_events_router
 from api.routes.notifications import notifications_router
 from api.routes.subteams import subteam_router
 from fastapi.middleware.cors import CORSMiddleware
-import logging
+from api.middleware import DbTimingMiddleware, RequestIdMiddleware, REQUEST_ID_HEADER
+from api.pagination import NEXT_CURSOR_HEADER
+from api.broker import broker
+from contextlib import asynccontextmanager
+from db.database import db, client
+from db.db_utils import warm_up_pool
+from db.indexes import ensure_indexes, log_index_report
+from db.repository import run_db
+from log_service.logging_utils import setup_logging
+from dispatch_service.dispatch_utils import start_workers, stop_workers, start_periodic, stop_periodic
+from dispatch_service import reminders, archiver, status_rollups  # register their periodic jobs
 import os
 from dotenv import load_dotenv
 import uvicorn
@@ -17,22 +28,40 @@ import uvicorn
 load_dotenv()
 
 
-# Create logger
-logger = logging.getLogger("fastapi_app")
-logger.setLevel(logging.DEBUG)
+# "fastapi_app" logger: JSON lines written by a background thread (see log_service/logging_utils.py)
+logger = setup_logging()
 
-# Create handler (console output)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
 
-# Define log format
-formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-console_handler.setFormatter(formatter)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # runs inside each worker after gunicorn forks: open the pool now rather than on the first request
+    try:
+        logger.info(f"MongoDB pool warmed up: {await run_db(warm_up_pool, client)}")
+    except Exception as e:
+        logger.error(f"MongoDB pool warm-up failed: {e}")
 
-# Add handler to logger
-logger.addHandler(console_handler)
+    # make sure every collection has the indexes declared in db/indexes.py (idempotent)
+    if os.getenv("MONGODB_ENSURE_INDEXES", "True").lower() == "true":
+        try:
+            log_index_report(await run_db(ensure_indexes, db))
+        except Exception as e:
+            logger.error(f"Index bootstrap failed: {e}")
 
-app = FastAPI()
+    # WebSocket broadcasts between the app processes (api/broker.py)
+    await broker.start()
+    # deliver queued emails / notifications in the background (dispatch_service)
+    dispatch_workers = start_workers()
+    # periodic jobs: "Task Due Soon" notifications (dispatch_service/reminders.py), moving long-completed tasks
+    # to the archive (dispatch_service/archiver.py), the daily summaries behind GET /tasks/analytics
+    # (dispatch_service/status_rollups.py)
+    schedulers = start_periodic()
+    yield
+    await stop_periodic(schedulers)
+    await stop_workers(dispatch_workers)
+    await broker.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -41,7 +70,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", REQUEST_ID_HEADER, NEXT_CURSOR_HEADER, "ETag"],
 )
+# per-request Mongo query count / time (Server-Timing header and GET /health/db/routes)
+app.add_middleware(DbTimingMiddleware)
+# correlation id for the logs of each request (X-Request-ID header)
+app.add_middleware(RequestIdMiddleware)
 # https://group-grade-backend-5f919d63857a.herokuapp.com/api/calendar/getUserFreeTime
 # routers
 app.include_router(greeting_router, prefix="", tags=["greeting"])
@@ -51,6 +85,7 @@ app.include_router(calendar_router, prefix="/api/calendar", tags=["Calendar"])
 app.include_router(user_router, prefix="/api/user", tags=["User"])
 app.include_router(files_router, prefix="/api/files", tags=["Files"])
 app.include_router(chat_router, tags=["Chat"])
+app.include_router(task_events_router, tags=["Task Events"])
 app.include_router(tasks_router, prefix="/api", tags=["Task Comments"])
 app.include_router(notifications_router, prefix="/api/notifications", tags=["Notifications"])
 app.include_router(subteam_router, prefix="/api/subteams", tags=["Subteams"])
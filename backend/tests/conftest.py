@@ -1,7 +1,10 @@
 import sys
 import os
 import pytest
+import mongomock
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
+from pymongo.collection import Collection
 
 # have to make sure that 'backend/' is in python module search path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -9,9 +12,62 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 
 from backend.main import app
+from db.mongomock_support import replay_bulk_write
 
 @pytest.fixture(scope ="module")
 def test_client():
 
     client=TestClient(app)
     yield client
+
+
+# collection methods that talk to MongoDB
+MONGO_OPERATIONS = (
+    "find_one", "find", "count_documents", "aggregate", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "find_one_and_update",
+    "delete_one", "delete_many", "bulk_write", "create_index", "create_indexes",
+)
+
+
+class QueryBudget:
+    """Counts the operations issued against the in-memory database."""
+
+    def __init__(self, db):
+        self.db = db  # mongomock database, use it to seed test data
+        self.operations = []
+
+    def _counted(self, collection_name, operation, method):
+        def counted(*args, **kwargs):
+            self.operations.append(f"{collection_name}.{operation}")
+            return method(*args, **kwargs)
+        return counted
+
+    @contextmanager
+    def __call__(self, budget: int):
+        """Fail if the code inside the block issues more than `budget` database operations."""
+        self.operations = []
+        yield self
+        assert len(self.operations) <= budget, (
+            f"{len(self.operations)} database operations, budget is {budget}: {self.operations}"
+        )
+
+
+@pytest.fixture
+def query_budget(monkeypatch):
+    """
+    Points every collection in db.database at an in-memory mongomock database and counts the operations
+    each request issues, so endpoints can declare a query budget:
+
+        with query_budget(3):
+            response = test_client.get("/api/group/")
+    """
+    import db.database
+
+    budget = QueryBudget(mongomock.MongoClient().GroupGrade)
+    for collection in vars(db.database).values():
+        if isinstance(collection, Collection):
+            fake_collection = budget.db[collection.name]
+            fake_collection.bulk_write = replay_bulk_write(fake_collection)
+            for operation in MONGO_OPERATIONS:
+                monkeypatch.setattr(collection, operation, budget._counted(collection.name, operation, getattr(fake_collection, operation)))
+    yield budget
@@ -0,0 +1,58 @@
+import asyncio
+import fakeredis
+from api import broker as broker_module
+from api.broker import RedisBroker
+from api.websockets import ConnectionRegistry
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self):
+        pass
+
+
+async def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_broadcasts_reach_the_sockets_of_every_process(monkeypatch):
+    monkeypatch.setattr(broker_module, "PUBSUB_RECONNECT_SECONDS", 0.01)
+
+    async def run():
+        server = fakeredis.FakeServer()  # stands in for Redis, shared by the two "workers"
+        workers = [RedisBroker(fakeredis.FakeAsyncRedis(server=server), prefix="test") for _ in range(2)]
+        registries = [ConnectionRegistry("chat", broker=worker) for worker in workers]
+        for worker in workers:
+            await worker.start()  # returns once subscribed: nothing published from here on is missed
+        assert all(worker.subscribed for worker in workers)
+
+        sockets = [FakeWebSocket(), FakeWebSocket(), FakeWebSocket()]
+        registries[0].add("chat-1", sockets[0])
+        registries[1].add("chat-1", sockets[1])
+        registries[1].add("chat-2", sockets[2])
+        registries[0].publish("chat-1", {"message": "hello"})
+        registries[0].publish("chat-1", {"message": "again"})
+        await wait_for(lambda: len(sockets[0].sent) == len(sockets[1].sent) == 2)
+
+        # while Redis is unreachable messages wait, and are sent once it is back
+        server.connected = False
+        registries[1].publish("chat-1", {"message": "during the outage"})
+        await asyncio.sleep(0.05)
+        server.connected = True
+        await wait_for(lambda: len(sockets[0].sent) == 3)
+
+        for worker in workers:
+            await worker.stop()
+        return [socket.sent for socket in sockets]
+
+    received = asyncio.run(run())
+    assert received[0] == received[1] == ['{"message": "hello"}', '{"message": "again"}', '{"message": "during the outage"}']
+    assert received[2] == []
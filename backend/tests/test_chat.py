@@ -0,0 +1,40 @@
+import asyncio
+from api.utils import get_current_user
+from db import chat_messages
+from db.chat_messages import append_chat_message
+
+
+def test_chat_messages_are_bucketed_and_paged(test_client, query_budget, monkeypatch):
+    monkeypatch.setattr(chat_messages, "MESSAGES_PER_BUCKET", 3)
+    db = query_budget.db
+    chat_id = str(db["chats"].insert_one({"is_groupchat": True, "participants": ["a@example.com"], "group_id": "g"}).inserted_id)
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": "a@example.com"}
+
+    for i in range(9):
+        asyncio.run(append_chat_message(chat_id, "a@example.com", f"m{i}"))
+    with test_client.websocket_connect(f"/ws/chat/{chat_id}/a@example.com") as websocket:
+        websocket.send_json({"message": "m9", "close_connection": False, "is_heartbeat_msg": False})
+        assert websocket.receive_json()["message"] == "m9"
+        websocket.send_json({"message": "", "close_connection": True, "is_heartbeat_msg": False})
+    assert db["chat_messages"].count_documents({}) == 4
+    assert "chat_history" not in db["chats"].find_one()
+
+    def texts(messages):
+        return [message["message"] for message in messages]
+
+    with query_budget(3):  # the chat, then a single read of the latest buckets
+        chat = test_client.get("/api/chat/g").json()["data"]
+    assert texts(chat["chat_history"]) == [f"m{i}" for i in range(10)]
+    assert chat["has_older_messages"] is False
+
+    page = test_client.get("/api/chat/g/messages", params={"limit": 4}).json()
+    assert (texts(page["messages"]), page["has_more"]) == (["m6", "m7", "m8", "m9"], True)
+    page = test_client.get("/api/chat/g/messages", params={"limit": 4, "before": page["messages"][0]["id"]}).json()
+    assert (texts(page["messages"]), page["has_more"]) == (["m2", "m3", "m4", "m5"], True)
+    oldest = test_client.get("/api/chat/g/messages", params={"limit": 4, "before": page["messages"][0]["id"]}).json()
+    assert (texts(oldest["messages"]), oldest["has_more"]) == (["m0", "m1"], False)
+    newer = test_client.get("/api/chat/g/messages", params={"limit": 3, "after": page["messages"][-1]["id"]}).json()
+    assert (texts(newer["messages"]), newer["has_more"]) == (["m6", "m7", "m8"], True)
+
+    assert test_client.get("/api/chat/g/messages", params={"before": "x"}).status_code == 400
+    test_client.app.dependency_overrides.pop(get_current_user)
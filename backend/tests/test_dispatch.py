@@ -0,0 +1,200 @@
+import asyncio
+from datetime import timedelta
+from db.models import utc_now
+from dispatch_service import dispatch_utils
+from dispatch_service.dispatch_utils import new_job, enqueue, drain, register_handler
+
+
+def test_failed_jobs_are_retried_then_given_up(query_budget, monkeypatch):
+    monkeypatch.setattr(dispatch_utils, "DISPATCH_MAX_ATTEMPTS", 2)
+    calls = []
+
+    async def flaky(jobs):
+        calls.append(len(jobs))
+        return {job["_id"]: "smtp down" for job in jobs if job["payload"]["fail"]}
+    register_handler("test_flaky", flaky)
+
+    asyncio.run(enqueue([new_job("test_flaky", {"fail": False}), new_job("test_flaky", {"fail": True})]))
+    assert asyncio.run(drain()) == 2
+    assert calls == [2]  # one handler call per batch
+
+    outbox = query_budget.db["outbox"]
+    assert outbox.count_documents({"status": "done"}) == 1
+    failed = outbox.find_one({"status": "pending"})
+    assert failed["attempts"] == 1 and failed["last_error"] == "smtp down"
+    assert failed["available_at"] > utc_now()
+
+    # not due yet, so nothing happens until the backoff has passed
+    assert asyncio.run(drain()) == 0
+    outbox.update_one({"_id": failed["_id"]}, {"$set": {"available_at": utc_now() - timedelta(seconds=1)}})
+    assert asyncio.run(drain()) == 1
+    assert outbox.find_one({"_id": failed["_id"]})["status"] == "failed"
+
+
+def test_abandoned_batches_are_reclaimed(query_budget):
+    delivered = []
+
+    async def record(jobs):
+        delivered.extend(job["payload"]["n"] for job in jobs)
+        return {}
+    register_handler("test_record", record)
+
+    job = new_job("test_record", {"n": 1})
+    job.update(status="processing", claim="dead-worker", locked_until=utc_now() - timedelta(seconds=1))
+    query_budget.db["outbox"].insert_one(job)
+
+    assert asyncio.run(drain()) == 1
+    assert delivered == [1]
+
+
+def test_notifications_are_not_duplicated_on_retry(query_budget, monkeypatch):
+    monkeypatch.setattr("api.routes.notifications.is_valid_email", lambda _: True)
+    from api.routes.notifications import notification_job, deliver_notifications
+    from api.request_model.notifications_request_schema import CreateNotificationRequest
+
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g"}).inserted_id)
+    jobs = [notification_job(CreateNotificationRequest(
+        user_email=f"user{i}@example.com", group_id=group_id, notification_type="Task Updated", content="c", task_id="t",
+    )) for i in range(3)]
+    asyncio.run(enqueue(jobs))
+    stored = list(query_budget.db["outbox"].find())
+
+    asyncio.run(deliver_notifications(stored[:2]))
+    assert asyncio.run(deliver_notifications(stored)) == {}
+    assert query_budget.db["notifications"].count_documents({}) == 3
+    # stamped when requested, not when delivered
+    assert all(n["timestamp"] == job["payload"]["requested_at"] for n, job in zip(query_budget.db["notifications"].find().sort("_id", 1), stored))
+
+
+def test_invalid_notifications_are_reported(query_budget, monkeypatch):
+    monkeypatch.setattr("api.routes.notifications.is_valid_email", lambda email: " " not in email)
+    from api.routes.notifications import notification_job
+    from api.request_model.notifications_request_schema import CreateNotificationRequest
+
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g"}).inserted_id)
+    requests = [("user@example.com", group_id), ("not an email", group_id), ("user@example.com", "64b000000000000000000000"), ("user@example.com", "g")]
+    asyncio.run(enqueue([notification_job(CreateNotificationRequest(
+        user_email=email, group_id=group, notification_type="Task Updated", content="c", task_id="t",
+    )) for email, group in requests]))
+    asyncio.run(drain())
+
+    assert [n["user"] for n in query_budget.db["notifications"].find()] == ["user@example.com"]
+    errors = sorted(job["last_error"] for job in query_budget.db["outbox"].find({"status": "pending"}))
+    assert errors == ["Group with ID 64b000000000000000000000 does not exist.", "Group with ID g does not exist.", "Invalid email format"]
+
+
+def test_due_soon_reminders_are_sent_once(query_budget, monkeypatch):
+    monkeypatch.setattr("api.routes.notifications.is_valid_email", lambda _: True)
+    from dispatch_service.reminders import send_due_reminders
+    db = query_budget.db
+    now = utc_now()
+    group_id = str(db["groups"].insert_one({"name": "g"}).inserted_id)
+    db["tasks"].insert_many([
+        {"name": "soon", "group": group_id, "assigned_to": ["a@example.com", "b@example.com"], "status": "To Do",
+         "due_date": now + timedelta(hours=3), "reminder_sent": False},
+        {"name": "done", "group": group_id, "assigned_to": ["a@example.com"], "status": "Completed",
+         "due_date": now + timedelta(hours=3), "reminder_sent": False},
+        {"name": "later", "group": group_id, "assigned_to": ["a@example.com"], "status": "To Do",
+         "due_date": now + timedelta(days=5), "reminder_sent": False},
+    ])
+
+    assert asyncio.run(send_due_reminders(now)) == 1
+    assert asyncio.run(send_due_reminders(now)) == 0
+    asyncio.run(drain())
+    reminders = list(db["notifications"].find({"notification_type": "Task Due Soon"}))
+    assert sorted(reminder["user"] for reminder in reminders) == ["a@example.com", "b@example.com"]
+
+
+def test_delivered_notifications_change_the_list_etag(test_client, query_budget, monkeypatch):
+    monkeypatch.setattr("api.routes.notifications.is_valid_email", lambda _: True)
+    from api.routes.notifications import notification_job
+    from api.request_model.notifications_request_schema import CreateNotificationRequest
+
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g"}).inserted_id)
+    params = {"user_email": "user@example.com"}
+    etag = test_client.get("/api/notifications/get_notifications_by_user", params=params).headers["ETag"]
+    assert test_client.get("/api/notifications/get_notifications_by_user", params=params, headers={"If-None-Match": etag}).status_code == 304
+    # the POST lookup is never conditional
+    response = test_client.post("/api/notifications/get_notifications_by_user", json=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and "ETag" not in response.headers
+
+    asyncio.run(enqueue([notification_job(CreateNotificationRequest(
+        user_email="user@example.com", group_id=group_id, notification_type="Task Updated", content="c", task_id="t",
+    ))]))
+    asyncio.run(drain())
+    response = test_client.get("/api/notifications/get_notifications_by_user", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and len(response.json()["notifications"]) == 1
+
+    # a group that no longer exists is a 404, whatever ETag the client holds
+    group_etag = test_client.get("/api/notifications/get_notifications_by_group", params={"group_id": group_id}).headers["ETag"]
+    query_budget.db["groups"].delete_one({})
+    response = test_client.get("/api/notifications/get_notifications_by_group", params={"group_id": group_id}, headers={"If-None-Match": group_etag})
+    assert response.status_code == 404
+
+
+def test_old_completed_tasks_are_archived(test_client, query_budget):
+    from bson import ObjectId
+    from db.task_stats import rebuild_task_stats
+    from api.utils import get_current_user
+    from dispatch_service.archiver import archive_completed_tasks
+    db = query_budget.db
+    now = utc_now()
+    group_id = ObjectId()
+    tasks = [
+        {"name": "old", "status": "Completed", "completed_at": now - timedelta(days=400)},
+        {"name": "older", "status": "Completed", "completed_at": now - timedelta(days=500)},
+        {"name": "recent", "status": "Completed", "completed_at": now - timedelta(days=3)},
+        {"name": "open", "status": "To Do", "completed_at": None},
+    ]
+    task_ids = db["tasks"].insert_many([
+        {**task, "group": str(group_id), "assigned_to": ["a@example.com"], "priority": "Low"} for task in tasks
+    ]).inserted_ids
+    db["groups"].insert_one({"_id": group_id, "members": ["a@example.com"], "tasks": [str(task_id) for task_id in task_ids]})
+    db["users"].insert_one({"email": "a@example.com", "name": "A", "groups": [str(group_id)]})
+    db["subteams"].insert_one({"team_name": "t", "tasks": [str(task_ids[0]), str(task_ids[3])]})
+    rebuild_task_stats(db)
+    stats_before = list(db["task_stats"].find())
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": "a@example.com"}
+    group_etag = test_client.get("/api/group/").headers["ETag"]
+
+    assert asyncio.run(archive_completed_tasks(now)) == 2
+    assert asyncio.run(archive_completed_tasks(now)) == 0
+
+    # the member's group list no longer holds the archived ids
+    response = test_client.get("/api/group/", headers={"If-None-Match": group_etag})
+    test_client.app.dependency_overrides.pop(get_current_user)
+    assert response.status_code == 200
+    assert response.json()["data"][0]["tasks"] == [str(task_ids[2]), str(task_ids[3])]
+
+    assert sorted(task["name"] for task in db["tasks"].find()) == ["open", "recent"]
+    assert db["groups"].find_one()["tasks"] == [str(task_ids[2]), str(task_ids[3])]
+    assert db["subteams"].find_one()["tasks"] == [str(task_ids[3])]
+    rebuild_task_stats(db)
+    assert list(db["task_stats"].find()) == stats_before  # archived tasks are still counted
+
+    response = test_client.get("/tasks/archive", params={"group": str(group_id), "limit": 1})
+    assert [task["name"] for task in response.json()] == ["old"]
+    response = test_client.get("/tasks/archive", params={"group": str(group_id), "cursor": response.headers["X-Next-Cursor"]})
+    assert [task["name"] for task in response.json()] == ["older"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_periodic_jobs_keep_running_after_errors(monkeypatch):
+    monkeypatch.setattr(dispatch_utils, "_periodic_jobs", {})
+    runs = []
+
+    async def job():
+        runs.append(len(runs))
+        if len(runs) == 1:
+            raise RuntimeError("first run fails")
+        return 1
+
+    async def run():
+        dispatch_utils.periodic("test job", 0, job)
+        schedulers = dispatch_utils.start_periodic()
+        while len(runs) < 3:
+            await asyncio.sleep(0)
+        await dispatch_utils.stop_periodic(schedulers)
+        return all(scheduler.cancelled() for scheduler in schedulers)
+
+    assert asyncio.run(run())
@@ -35,7 +35,7 @@ from fastapi import status
 
 #     test_client.app.dependency_overrides.pop(get_current_user)
 
-def test_create_group_handler(test_client, monkeypatch):
+def test_create_group_handler(test_client, monkeypatch, query_budget):
     from fastapi import status
     from db.database import users_collection, groups_collection, chat_collection
     import api.routes.group as group
@@ -92,10 +92,10 @@ def test_create_group_handler(test_client, monkeypatch):
     # Now verify that a chat was created.
     assert captured_chat.get("is_groupchat") is True
     assert captured_chat.get("participants") == ["test@example.com"]
-    assert captured_chat.get("chat_history") == []
+    assert "chat_history" not in captured_chat  # messages are stored in buckets (db/chat_messages.py)
     assert captured_chat.get("group_id") == "507f191e810c19729de860ea"
 
-def test_confirm_member_success(test_client, monkeypatch):
+def test_confirm_member_success(test_client, monkeypatch, query_budget):
     group_id = "507f191e810c19729de860ea"
     # Dummy group with new@example.com as pending and an initially empty member_names.
     dummy_group = {
@@ -0,0 +1,32 @@
+import json
+import logging
+from log_service.logging_utils import JsonFormatter, RequestIdFilter, SamplingFilter, request_id_var
+
+
+def test_request_id_is_generated_and_echoed(test_client):
+    response = test_client.get("/")
+    assert len(response.headers["X-Request-ID"]) == 32
+
+    response = test_client.get("/", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["X-Request-ID"] == "abc-123"
+
+
+def test_records_carry_the_request_id():
+    record = logging.LogRecord("fastapi_app.tasks", logging.INFO, __file__, 1, "updated %s", ("task",), None)
+    record.task_id = "t1"
+    token = request_id_var.set("abc-123")
+    RequestIdFilter().filter(record)
+    request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "updated task"
+    assert entry["request_id"] == "abc-123"
+    assert entry["task_id"] == "t1"
+
+
+def test_sampling_keeps_warnings():
+    sampler = SamplingFilter(0.0)
+    info = logging.LogRecord("fastapi_app.chat", logging.INFO, __file__, 1, "msg", None, None)
+    warning = logging.LogRecord("fastapi_app.chat", logging.WARNING, __file__, 1, "msg", None, None)
+    assert not sampler.filter(info)
+    assert sampler.filter(warning)
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+from db.migrations import move_comments_to_collection, normalize_due_dates, add_task_dedupe_keys, rank_tasks, backfill_completed_at, seed_status_log, move_chat_history_to_buckets
+from db.idempotency import task_dedupe_key
+from db.indexes import INDEX_REGISTRY
+from db.models import utc_now
+
+
+def test_move_comments_to_collection(query_budget):
+    db = query_budget.db
+    first = datetime(2025, 3, 1)
+    db["tasks"].insert_many([
+        {"name": "two comments", "comments": [
+            {"commenter": "a@example.com", "content": "first", "timestamp": first},
+            {"commenter": "b@example.com", "content": "second", "timestamp": first + timedelta(days=1)},
+        ]},
+        {"name": "no comments", "comments": []},
+        # commented on after the deploy, before the migration ran
+        {"name": "mixed", "comments": [{"commenter": "a@example.com", "content": "old", "timestamp": first}],
+         "comment_count": 1, "latest_comment": {"commenter": "b@example.com", "content": "new", "timestamp": first + timedelta(days=9)}},
+    ])
+    mixed_id = str(db["tasks"].find_one({"name": "mixed"})["_id"])
+    db["comments"].insert_one({"task_id": mixed_id, "commenter": "b@example.com", "content": "new", "timestamp": first + timedelta(days=9)})
+
+    assert move_comments_to_collection(db, batch_size=2) == 3
+    assert move_comments_to_collection(db) == 0  # nothing left to do
+
+    tasks = {task["name"]: task for task in db["tasks"].find()}
+    assert all("comments" not in task for task in tasks.values())
+    assert tasks["two comments"]["comment_count"] == 2
+    assert tasks["two comments"]["latest_comment"]["content"] == "second"
+    assert tasks["no comments"]["comment_count"] == 0
+    assert tasks["mixed"]["comment_count"] == 2
+    assert tasks["mixed"]["latest_comment"]["content"] == "new"
+    assert db["comments"].count_documents({}) == 4
+
+
+def test_normalize_due_dates(query_budget):
+    db = query_budget.db
+    db["tasks"].insert_many([
+        {"name": "date", "due_date": "2999-05-01"},
+        {"name": "iso with offset", "due_date": "2999-05-01T12:00:00+02:00"},
+        {"name": "past", "due_date": "2001-05-01"},
+        {"name": "garbage", "due_date": "someday"},
+        {"name": "already converted", "due_date": datetime(2999, 1, 1), "reminder_sent": False},
+    ])
+
+    assert normalize_due_dates(db, batch_size=2) == 4
+    assert normalize_due_dates(db) == 0
+
+    tasks = {task["name"]: task for task in db["tasks"].find()}
+    assert tasks["date"]["due_date"] == datetime(2999, 5, 1) and tasks["date"]["reminder_sent"] is False
+    assert tasks["iso with offset"]["due_date"] == datetime(2999, 5, 1, 10)
+    assert tasks["past"]["reminder_sent"] is True  # already due, no reminder
+    assert tasks["garbage"]["due_date"] is None
+
+
+def test_add_task_dedupe_keys(query_budget):
+    db = query_budget.db
+    db["tasks"].create_indexes([index for index in INDEX_REGISTRY["tasks"] if index.document["name"] == "dedupe_key_unique"])
+    db["tasks"].insert_many([
+        {"name": "a", "group": "g", "assigned_to": ["x@example.com"]},
+        {"name": "a", "group": "g", "assigned_to": ["y@example.com"]},
+        {"name": "a", "group": "g", "assigned_to": ["x@example.com"]},  # duplicate of the first one
+    ])
+
+    assert add_task_dedupe_keys(db, batch_size=2) == 2
+    assert add_task_dedupe_keys(db) == 0
+
+    first, other, duplicate = db["tasks"].find().sort("_id", 1)
+    assert first["dedupe_key"] == task_dedupe_key("g", "a", ["x@example.com"])
+    assert other["dedupe_key"] != first["dedupe_key"]
+    assert "dedupe_key" not in duplicate
+
+
+def test_rank_tasks(query_budget):
+    db = query_budget.db
+    db["tasks"].insert_many([
+        {"name": "ranked", "group": "g", "status": "To Do", "rank": "V", "due_date": datetime(2030, 1, 9)},
+        {"name": "later", "group": "g", "status": "To Do", "due_date": datetime(2030, 1, 5)},
+        {"name": "sooner", "group": "g", "status": "To Do", "due_date": datetime(2030, 1, 1)},
+        {"name": "other column", "group": "g", "status": "Completed", "due_date": datetime(2030, 1, 1)},
+    ])
+
+    assert rank_tasks(db, batch_size=1) == 3
+    assert rank_tasks(db) == 0
+
+    to_do = [task["name"] for task in db["tasks"].find({"status": "To Do"}).sort("rank", 1)]
+    assert to_do == ["ranked", "sooner", "later"]
+    assert db["tasks"].find_one({"name": "other column"})["rank"]
+
+
+def test_backfill_completed_at(query_budget):
+    db = query_budget.db
+    db["tasks"].insert_many([
+        {"name": "done", "status": "Completed"},
+        {"name": "done, recorded", "status": "Completed", "completed_at": datetime(2030, 1, 1)},
+        {"name": "open", "status": "To Do"},
+    ])
+
+    assert backfill_completed_at(db, batch_size=1) == 1
+    assert backfill_completed_at(db) == 0
+
+    tasks = {task["name"]: task for task in db["tasks"].find()}
+    assert tasks["done"]["completed_at"] == tasks["done"]["_id"].generation_time.replace(tzinfo=None)
+    assert tasks["done, recorded"]["completed_at"] == datetime(2030, 1, 1)
+    assert "completed_at" not in tasks["open"]
+
+
+def test_seed_status_log(query_budget):
+    db = query_budget.db
+    created = db["tasks"].insert_many([
+        {"name": "open", "status": "In Progress", "group": "g", "assigned_to": ["a@example.com"]},
+        {"name": "done", "status": "Completed", "group": "g", "assigned_to": ["a@example.com"], "completed_at": utc_now()},
+    ]).inserted_ids
+    db["archived_tasks"].insert_one({"name": "archived", "status": "Completed", "group": "g", "assigned_to": [], "completed_at": utc_now()})
+
+    assert seed_status_log(db, batch_size=1) == 5
+    assert seed_status_log(db) == 0
+
+    assert [entry["to"] for entry in db["status_log"].find({"task": str(created[1])}).sort("at", 1)] == ["To Do", "Completed"]
+    group_summary = db["status_daily"].find_one({"scope": "group", "group": "g"})
+    assert (group_summary["created"], group_summary["completed"], group_summary["lead_count"]) == (3, 2, 2)
+    assert db["status_daily"].find_one({"scope": "user", "user": "a@example.com"})["created"] == 2
+
+
+def test_move_chat_history_to_buckets(query_budget, monkeypatch):
+    from db import migrations
+    monkeypatch.setattr(migrations, "MESSAGES_PER_BUCKET", 2)
+    db = query_budget.db
+    history = [{"sender": "a@example.com", "message": f"m{i}", "delivered_time": datetime(2025, 3, 1 + i // 3, 12, i)} for i in range(5)]
+    chat_id = db["chats"].insert_one({"participants": ["a@example.com"], "group_id": "g", "chat_history": history[::-1]}).inserted_id
+    db["chats"].insert_one({"participants": [], "group_id": "h"})
+
+    assert move_chat_history_to_buckets(db, batch_size=1) == 1
+    assert move_chat_history_to_buckets(db) == 0
+
+    assert "chat_history" not in db["chats"].find_one({"_id": chat_id})
+    buckets = list(db["chat_messages"].find({"chat_id": str(chat_id)}).sort("first_id", 1))
+    assert [(bucket["day"], bucket["count"]) for bucket in buckets] == [("2025-03-01", 2), ("2025-03-01", 1), ("2025-03-02", 2)]
+    messages = [message for bucket in buckets for message in bucket["messages"]]
+    assert [message["message"] for message in sorted(messages, key=lambda message: message["_id"])] == [f"m{i}" for i in range(5)]
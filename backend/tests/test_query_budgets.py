@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+from bson import ObjectId
+from api.utils import get_current_user
+from dispatch_service.dispatch_utils import drain
+
+# Maximum number of database operations each endpoint may issue.
+# Lower these when an endpoint gets cheaper; raising one needs a good reason (usually an N+1 loop crept in).
+GET_GROUPS_BUDGET = 4  # including the ETag version read
+GET_GROUPS_NOT_MODIFIED_BUDGET = 1  # If-None-Match hit: the version read only
+CREATE_TASK_BUDGET = 9  # any number of assignees: one lookup for all of them, the column's last rank, counter and version updates, the status log entry, one insert for the outbox; duplicates are refused by the unique index
+GET_TASKS_BY_SUBTEAM_BUDGET = 2
+BULK_CREATE_TASKS_BUDGET = 11  # any number of tasks, including the last rank of every board column they go to and one status log insert
+BULK_UPDATE_TASKS_BUDGET = 7  # any number of tasks; status changes add the status log insert, completions one read of when the tasks were started
+DISPATCH_CREATE_TASK_BUDGET = 8  # claim (3), one lookup of the groups, notifications insert and version bump, mark done, final empty claim; no user lookups
+
+MEMBERS = ["member1@example.com", "member2@example.com", "member3@example.com"]
+
+
+def seed_group(db):
+    group_id = ObjectId()
+    db["users"].insert_many([
+        {"email": email, "name": f"Member {i}", "groups": [str(group_id)], "skills": [], "free_time": {}}
+        for i, email in enumerate(MEMBERS)
+    ])
+    db["groups"].insert_one({
+        "_id": group_id,
+        "members": MEMBERS,
+        "name": "Test Group",
+        "tasks": [],
+        "pending_members": [],
+        "member_names": {email.replace(".", "[dot]"): f"Member {i}" for i, email in enumerate(MEMBERS)},
+    })
+    return group_id
+
+
+def test_get_groups_query_budget(test_client, query_budget):
+    seed_group(query_budget.db)
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": MEMBERS[0]}
+
+    with query_budget(GET_GROUPS_BUDGET):
+        response = test_client.get("/api/group/")
+
+    assert response.status_code == 200
+    assert len(response.json()["data"][0]["members_details"]) == len(MEMBERS)
+
+    with query_budget(GET_GROUPS_NOT_MODIFIED_BUDGET):
+        response = test_client.get("/api/group/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    test_client.app.dependency_overrides.pop(get_current_user)
+
+
+def test_create_task_query_budget(test_client, query_budget, monkeypatch):
+    group_id = seed_group(query_budget.db)
+    sent_emails = []
+    monkeypatch.setattr("api.routes.tasks.email_sender", SimpleNamespace(send_email=lambda **kwargs: sent_emails.append(kwargs)))
+    monkeypatch.setattr("api.routes.tasks.is_valid_email", lambda _: True)
+    monkeypatch.setattr("api.routes.notifications.is_valid_email", lambda _: True)
+
+    payload = {
+        "assigned_to": MEMBERS,
+        "name": "Write report",
+        "description": "First draft",
+        "due_date": "2025-04-30",
+        "status": "To Do",
+        "group": str(group_id),
+        "priority": "High",
+        "labels": [],
+    }
+    with query_budget(CREATE_TASK_BUDGET):
+        response = test_client.post("/tasks/", json=payload)
+
+    assert response.status_code == 200
+    assert sent_emails == []
+
+    with query_budget(DISPATCH_CREATE_TASK_BUDGET):
+        asyncio.run(drain())
+    assert len(sent_emails) == len(MEMBERS)
+    assert query_budget.db["notifications"].count_documents({}) == len(MEMBERS)
+
+
+def test_get_tasks_by_subteam_query_budget(test_client, query_budget):
+    group_id = seed_group(query_budget.db)
+    task_ids = query_budget.db["tasks"].insert_many([
+        {"assigned_to": MEMBERS[:2], "name": f"Task {i}", "description": "", "due_date": "2025-04-30",
+         "status": "To Do", "group": str(group_id), "priority": "Low", "labels": []}
+        for i in range(5)
+    ]).inserted_ids
+    subteam_id = query_budget.db["subteams"].insert_one({
+        "team_name": "Writers", "members": MEMBERS[:2], "group": group_id, "tasks": [str(task_id) for task_id in task_ids],
+    }).inserted_id
+
+    with query_budget(GET_TASKS_BY_SUBTEAM_BUDGET):
+        response = test_client.request("GET", "/api/subteams/getTasksBySubteam", json={"subteam_id": str(subteam_id)})
+
+    assert response.status_code == 200
+    assert [task["name"] for task in response.json()["data"]["tasks"]] == [f"Task {i}" for i in range(5)]
+
+
+def test_bulk_create_and_update_tasks_query_budget(test_client, query_budget):
+    group_id = seed_group(query_budget.db)
+    subteam_id = query_budget.db["subteams"].insert_one({
+        "team_name": "Writers", "members": MEMBERS[:2], "group": group_id, "tasks": [],
+    }).inserted_id
+    tasks = [{
+        "assigned_to": [str(subteam_id)] if i == 0 else MEMBERS[i % 3:],
+        "name": f"Kickoff {i}", "description": "", "due_date": "2025-04-30",
+        "status": "To Do", "group": str(group_id), "priority": "Low", "labels": [],
+    } for i in range(10)]
+
+    with query_budget(BULK_CREATE_TASKS_BUDGET):
+        response = test_client.post("/tasks/bulk", json={"tasks": tasks})
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert len(ids) == 10
+    assert query_budget.db["groups"].find_one({"_id": group_id})["tasks"] == ids
+    assert query_budget.db["tasks"].find_one({"name": "Kickoff 0"})["assigned_to"] == MEMBERS[:2]
+
+    # the same batch again is rejected as a whole
+    response = test_client.post("/tasks/bulk", json={"tasks": tasks})
+    assert response.status_code == 400
+    assert query_budget.db["tasks"].count_documents({}) == 10
+
+    updates = [{"task_id": task_id, "updated_fields": {"status": "Completed"}} for task_id in ids]
+    with query_budget(BULK_UPDATE_TASKS_BUDGET):
+        response = test_client.put("/tasks/bulk", json={"updates": updates})
+    assert response.status_code == 200
+    assert response.json()["modified"] == 10
+    assert query_budget.db["tasks"].count_documents({"status": "Completed"}) == 10
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+from api.utils import get_current_user
+from db.query_stats import command_stats_listener, route_db_stats
+
+
+def fake_command(command_name, collection, duration_ms):
+    """Emit the pymongo monitoring events a real command would produce."""
+    event = SimpleNamespace(
+        command_name=command_name,
+        command={command_name: collection},
+        database_name="GroupGrade",
+        connection_id=("localhost", 27017),
+        request_id=1,
+        duration_micros=int(duration_ms * 1000),
+    )
+    command_stats_listener.started(event)
+    command_stats_listener.succeeded(event)
+
+
+def test_server_timing_and_route_stats(test_client, monkeypatch):
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": "user@example.com"}
+    monkeypatch.setattr("api.routes.calendar.is_valid_email", lambda _: True)
+    route_db_stats.reset()
+
+    def fake_find_one(query):
+        fake_command("find", "users", 4)
+        fake_command("find", "users", 1)
+        return {"email": "user@example.com", "free_time": {}}
+    from db.database import users_collection
+    monkeypatch.setattr(users_collection, "find_one", fake_find_one)
+
+    response = test_client.get("/api/calendar/getUserFreeTime")
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"] == 'db;desc="2 queries";dur=5.00, db-slowest;desc="find users";dur=4.00'
+
+    route = route_db_stats.snapshot()["GET /api/calendar/getUserFreeTime"]
+    assert route["requests"] == 1
+    assert route["queries"] == 2
+    assert route["slowest_command"] == "find users"
+
+    test_client.app.dependency_overrides.pop(get_current_user)
+
+
+def test_commands_outside_requests_are_ignored():
+    route_db_stats.reset()
+    fake_command("find", "users", 1)
+    assert route_db_stats.snapshot() == {}
@@ -1,5 +1,427 @@
+from datetime import datetime, timedelta
+
+
 # def test_get_tasks(test_client):
 #     response = test_client.get("/tasks/")
 #     assert response.status_code == 200
 #     assert isinstance(response.json(), list)
 
+
+
+def seed_tasks(db, count, group="group1"):
+    db["tasks"].insert_many([{
+        "assigned_to": ["user@example.com"],
+        "name": f"Task {i}",
+        "description": "",
+        "due_date": datetime(2030, 1, i % 5 + 1),
+        "status": "Completed" if i % 2 else "To Do",
+        "group": group,
+        "priority": "Medium",
+        "labels": ["code"] if i % 3 == 0 else [],
+    } for i in range(count)])
+
+
+def test_get_tasks_pages_with_cursor(test_client, query_budget):
+    seed_tasks(query_budget.db, 12)
+    seed_tasks(query_budget.db, 3, group="group2")
+
+    names, cursor, pages = [], None, 0
+    while True:
+        params = {"group": "group1", "limit": 5, **({"cursor": cursor} if cursor else {})}
+        with query_budget(2):  # the page and the ETag versions
+            response = test_client.get("/tasks/", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 5
+        names += [task["name"] for task in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(names) == len(set(names)) == 12
+    due_dates = [task["due_date"] for task in query_budget.db["tasks"].find({"group": "group1"})]
+    assert sorted(due_dates) == [datetime(2030, 1, int(name.split()[1]) % 5 + 1) for name in names]
+
+
+def test_get_tasks_pages_across_null_due_dates(test_client, query_budget):
+    seed_tasks(query_budget.db, 4)
+    query_budget.db["tasks"].insert_many([{"name": f"Undated {i}", "group": "group1", "due_date": None} for i in range(3)])
+
+    for sort in ("due_date", "-due_date"):
+        names, cursor = [], None
+        while True:
+            response = test_client.get("/tasks/", params={"group": "group1", "sort": sort, "limit": 2, **({"cursor": cursor} if cursor else {})})
+            names += [task["name"] for task in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert len(names) == len(set(names)) == 7
+        undated = [name for name in names if name.startswith("Undated")]
+        assert (names[:3] if sort == "due_date" else names[-3:]) == undated
+
+
+def test_get_tasks_filters(test_client, query_budget):
+    seed_tasks(query_budget.db, 12)
+
+    response = test_client.get("/tasks/", params={"group": "group1", "status": "To Do", "label": "code", "due_to": "2030-01-03"})
+    assert response.status_code == 200
+    assert sorted(task["name"] for task in response.json()) == ["Task 0", "Task 6"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_tasks_rejects_bad_cursor(test_client, query_budget):
+    assert test_client.get("/tasks/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_comments_are_stored_outside_the_task(test_client, query_budget):
+    from api.utils import get_current_user
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": "user@example.com"}
+    seed_tasks(query_budget.db, 1)
+    task_id = str(query_budget.db["tasks"].find_one()["_id"])
+
+    for i in range(5):
+        assert test_client.post(f"/tasks/{task_id}/comments", json={"content": f"comment {i}"}).status_code == 200
+
+    task = test_client.get("/tasks/", params={"group": "group1"}).json()[0]
+    assert task["comment_count"] == 5
+    assert task["latest_comment"]["content"] == "comment 4"
+    assert "comments" not in task
+
+    contents, cursor = [], None
+    while True:
+        response = test_client.get(f"/tasks/{task_id}/comments", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        contents += [comment["content"] for comment in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert contents == [f"comment {i}" for i in reversed(range(5))]
+
+    assert test_client.post(f"/tasks/{'0' * 24}/comments", json={"content": "lost"}).status_code == 404
+    test_client.app.dependency_overrides.pop(get_current_user)
+
+
+def test_task_stats_follow_task_writes(test_client, query_budget):
+    from bson import ObjectId
+    from db.task_stats import rebuild_task_stats
+    group_id = str(ObjectId())
+    db = query_budget.db
+    db["groups"].insert_one({"_id": ObjectId(group_id), "name": "G", "members": ["a@example.com", "b@example.com"], "tasks": []})
+    db["users"].insert_many([{"email": "a@example.com", "name": "A"}, {"email": "b@example.com", "name": "B"}])
+    subteam_id = str(db["subteams"].insert_one({"team_name": "S", "members": ["a@example.com"], "group": ObjectId(group_id), "tasks": []}).inserted_id)
+
+    def task(name, assigned_to, due_date, priority="Low"):
+        return {"assigned_to": assigned_to, "name": name, "description": "", "due_date": due_date,
+                "status": "To Do", "group": group_id, "priority": priority, "labels": []}
+    ids = test_client.post("/tasks/bulk", json={"tasks": [
+        task("one", ["a@example.com"], "2000-01-01"),
+        task("two", ["a@example.com", "b@example.com"], "2999-01-01", "High"),
+    ]}).json()["ids"]
+    test_client.post("/tasks/", json=task("three", ["b@example.com"], "2000-01-01"))
+    test_client.put("/tasks/edit/", params={"task_id": ids[0]}, json={"updated_fields": {"status": "Completed"}})
+    test_client.put("/tasks/assign/", params={"task_id": ids[0], "new_user_email": "b@example.com"})
+    test_client.put("/api/subteams/assignTaskToSubteam", json={"subteam_id": subteam_id, "task_id": ids[1]})
+
+    with query_budget(2):
+        stats = test_client.get("/tasks/stats", params={"group": group_id}).json()
+    assert stats["group"]["total"] == 3
+    assert stats["group"]["status"] == {"To Do": 2, "In Progress": 0, "Completed": 1}
+    assert stats["group"]["priority"]["High"] == 1
+    assert stats["group"]["overdue"] == 1  # "one" is overdue but completed
+    assert stats["users"]["b@example.com"]["total"] == 3
+    assert stats["users"]["b@example.com"]["overdue"] == 1
+    assert stats["users"]["a@example.com"]["status"]["Completed"] == 1
+    assert stats["subteams"][subteam_id]["total"] == 1
+
+    user_stats = test_client.get("/tasks/stats", params={"user": "a@example.com"}).json()
+    assert user_stats["user"]["total"] == 2
+    assert user_stats["groups"][group_id]["total"] == 2
+
+    # the rebuild job agrees with the incremental counters
+    rebuild_task_stats(db)
+    assert test_client.get("/tasks/stats", params={"group": group_id}).json() == stats
+
+
+def test_search_tasks_by_prefix_and_rank(test_client, query_budget):
+    from api.utils import get_current_user
+    from db.migrations import index_task_search
+    db = query_budget.db
+    seed_tasks(db, 30)
+    seed_tasks(db, 5, group="group2")
+    db["tasks"].update_one({"name": "Task 7"}, {"$set": {"description": "deploy the release branch"}})
+    db["tasks"].update_one({"name": "Task 8"}, {"$set": {"name": "Release notes"}})
+    assert index_task_search(db, batch_size=10) == 35
+
+    with query_budget(1):
+        response = test_client.get("/tasks/search", params={"q": "relea", "group": "group1"})
+    assert [task["name"] for task in response.json()] == ["Release notes", "Task 7"]  # name hits rank first
+    assert len(test_client.get("/tasks/search", params={"q": "code task", "group": "group1"}).json()) == 10
+    assert test_client.get("/tasks/search", params={"q": "code", "group": "group2"}).json()[0]["group"] == "group2"
+    assert test_client.get("/tasks/search", params={"q": "code"}).status_code == 400
+
+    # edits and comments keep the words up to date
+    task_id = str(db["tasks"].find_one({"name": "Task 7"})["_id"])
+    test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"description": "hotfix"}})
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": "user@example.com"}
+    test_client.post(f"/tasks/{task_id}/comments", json={"content": "Waiting on QA sign-off"})
+    test_client.app.dependency_overrides.pop(get_current_user)
+    assert [task["name"] for task in test_client.get("/tasks/search", params={"q": "relea", "group": "group1"}).json()] == ["Release notes"]
+    assert [task["id"] for task in test_client.get("/tasks/search", params={"q": "hotfix sign", "user": "user@example.com"}).json()] == [task_id]
+
+
+def test_upcoming_and_overdue_tasks(test_client, query_budget):
+    from db.models import utc_now
+    db = query_budget.db
+    today = utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    seed_tasks(db, 6)
+    for i, days in enumerate([-3, -1, 0, 2, 6, 30]):
+        db["tasks"].update_one({"name": f"Task {i}"}, {"$set": {"due_date": today + timedelta(days=days, hours=12), "status": "To Do"}})
+    db["tasks"].update_one({"name": "Task 1"}, {"$set": {"status": "Completed"}})
+
+    with query_budget(1):
+        response = test_client.get("/tasks/upcoming", params={"group": "group1", "days": 7, "limit": 2})
+    assert [task["name"] for task in response.json()] == ["Task 2", "Task 3"]
+    rest = test_client.get("/tasks/upcoming", params={"group": "group1", "days": 7, "cursor": response.headers["X-Next-Cursor"]})
+    assert [task["name"] for task in rest.json()] == ["Task 4"]
+
+    overdue = test_client.get("/tasks/overdue", params={"user": "user@example.com"}).json()
+    assert [task["name"] for task in overdue] == ["Task 0"]
+    assert test_client.get("/tasks/overdue").status_code == 400
+
+
+def test_due_dates_are_validated(test_client, query_budget):
+    seed_tasks(query_budget.db, 1)
+    task_id = str(query_budget.db["tasks"].find_one()["_id"])
+
+    response = test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"due_date": "next week"}})
+    assert response.status_code == 400
+    response = test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"due_date": "2031-02-03T10:00:00+01:00"}})
+    assert response.status_code == 200
+    task = query_budget.db["tasks"].find_one()
+    assert task["due_date"] == datetime(2031, 2, 3, 9) and task["reminder_sent"] is False
+    assert test_client.get("/tasks/", params={"due_from": "soon"}).status_code == 400
+
+
+def test_task_list_etag(test_client, query_budget):
+    seed_tasks(query_budget.db, 3)
+    task_id = str(query_budget.db["tasks"].find_one()["_id"])
+    params = {"group": "group1"}
+
+    first = test_client.get("/tasks/", params=params)
+    etag = first.headers["ETag"]
+    with query_budget(1):  # the versions only, never the tasks
+        response = test_client.get("/tasks/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["ETag"] == etag
+    # another filter is another list
+    assert test_client.get("/tasks/", params={**params, "status": "To Do"}, headers={"If-None-Match": etag}).status_code == 200
+
+    test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"name": "renamed"}})
+    response = test_client.get("/tasks/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert "renamed" in [task["name"] for task in response.json()]
+    # the user's list changed too
+    user_etag = test_client.get("/tasks/", params={"assigned_to": "user@example.com"}).headers["ETag"]
+    test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"priority": "High"}})
+    assert test_client.get("/tasks/", params={"assigned_to": "user@example.com"}, headers={"If-None-Match": user_etag}).status_code == 200
+
+
+def test_task_events_are_pushed_to_group_members(test_client, query_budget, monkeypatch):
+    import jwt
+    from api.utils import get_current_user, principal_cache
+    monkeypatch.setattr("api.utils.JWT_SECRET", "test-secret")
+    principal_cache.clear()
+    test_client.app.dependency_overrides[get_current_user] = lambda: {"email": "user@example.com"}
+    query_budget.db["users"].insert_many([{"email": "user@example.com", "name": "User"}, {"email": "stranger@example.com", "name": "Stranger"}])
+    group_id = str(query_budget.db["groups"].insert_one({"group_name": "g", "members": ["user@example.com"]}).inserted_id)
+    seed_tasks(query_budget.db, 1, group=group_id)
+    task_id = str(query_budget.db["tasks"].find_one()["_id"])
+
+    def token(email):
+        return jwt.encode({"email": email}, "test-secret", algorithm="HS256")
+
+    # no token, a forged one, or a member's email in the path with somebody else's token
+    with test_client.websocket_connect(f"/ws/tasks/{group_id}/user@example.com") as websocket:
+        assert websocket.receive_json() == {"message": "Invalid token"}
+    with test_client.websocket_connect(f"/ws/tasks/{group_id}/user@example.com?token={jwt.encode({'email': 'user@example.com'}, 'guess', algorithm='HS256')}") as websocket:
+        assert websocket.receive_json() == {"message": "Invalid token"}
+    with test_client.websocket_connect(f"/ws/tasks/{group_id}/user@example.com?token={token('stranger@example.com')}") as websocket:
+        assert websocket.receive_json() == {"message": "You are not authorized to follow this group"}
+    with test_client.websocket_connect(f"/ws/tasks/{group_id}/stranger@example.com?token={token('stranger@example.com')}") as websocket:
+        assert websocket.receive_json() == {"message": "You are not authorized to follow this group"}
+
+    # the token as a subprotocol, as browsers send it
+    with test_client.websocket_connect(f"/ws/tasks/{group_id}/user@example.com", subprotocols=["bearer", token("user@example.com")]) as websocket:
+        assert websocket.accepted_subprotocol == "bearer"
+        websocket.send_json({"is_heartbeat_msg": True})
+        assert websocket.receive_json() == {"message": "Health ping received!", "live_users": 1}
+
+    with test_client.websocket_connect(f"/ws/tasks/{group_id}/user@example.com?token={token('user@example.com')}") as websocket:
+        websocket.send_json({"is_heartbeat_msg": True})
+        assert websocket.receive_json() == {"message": "Health ping received!", "live_users": 1}
+
+        test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"name": "renamed"}})
+        event = websocket.receive_json()
+        assert (event["type"], event["group_id"], event["task_id"]) == ("task_updated", group_id, task_id)
+        assert event["changes"] == {"name": "renamed"}
+
+        test_client.post(f"/tasks/{task_id}/comments", json={"content": "looks good"})
+        event = websocket.receive_json()
+        assert event["type"] == "task_commented" and event["comment_count"] == 1
+        assert event["comment"]["content"] == "looks good"
+
+        websocket.send_json({"close_connection": True})
+        assert websocket.receive_json() == {"message": "Close Connection request is successful"}
+    test_client.app.dependency_overrides.pop(get_current_user)
+
+
+def test_create_task_is_idempotent_and_deduplicated(test_client, query_budget, monkeypatch):
+    from db.indexes import INDEX_REGISTRY
+    monkeypatch.setattr("api.routes.tasks.is_valid_email", lambda _: True)
+    query_budget.db["tasks"].create_indexes([index for index in INDEX_REGISTRY["tasks"] if index.document.get("unique")])
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g", "members": ["user@example.com"], "tasks": []}).inserted_id)
+    query_budget.db["users"].insert_one({"email": "user@example.com", "name": "User"})
+    payload = {"assigned_to": ["user@example.com"], "name": "Write report", "description": "", "due_date": "2030-04-30",
+               "status": "To Do", "group": group_id, "priority": "High", "labels": []}
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = test_client.post("/tasks/", json=payload, headers=headers)
+    assert first.status_code == 200
+    outbox = query_budget.db["outbox"].count_documents({})
+
+    with query_budget(2):  # the refused claim and the stored response
+        retry = test_client.post("/tasks/", json=payload, headers=headers)
+    assert retry.status_code == 200 and retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+    assert query_budget.db["tasks"].count_documents({}) == 1
+    assert query_budget.db["outbox"].count_documents({}) == outbox  # no second round of emails and notifications
+
+    # same key, other request
+    assert test_client.post("/tasks/", json={**payload, "name": "Other"}, headers=headers).status_code == 422
+
+    # without a key (or with a new one) the unique index refuses the duplicate, and the key is released
+    assert test_client.post("/tasks/", json=payload).status_code == 400
+    assert test_client.post("/tasks/", json=payload, headers={"Idempotency-Key": "retry-2"}).status_code == 400
+    assert query_budget.db["idempotency_keys"].count_documents({}) == 1
+
+    # renaming another task onto it is refused too
+    other_id = test_client.post("/tasks/", json={**payload, "name": "Other"}).json()["id"]
+    response = test_client.put("/tasks/edit/", params={"task_id": other_id}, json={"updated_fields": {"name": "Write report"}})
+    assert response.status_code == 400
+
+
+def test_comment_summary_is_set_by_the_server(test_client, query_budget):
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g", "members": ["user@example.com"], "tasks": []}).inserted_id)
+    query_budget.db["users"].insert_one({"email": "user@example.com", "name": "User"})
+    payload = {"assigned_to": ["user@example.com"], "description": "", "due_date": "2030-04-30",
+               "status": "To Do", "group": group_id, "priority": "High", "labels": [],
+               "comment_count": 99, "latest_comment": {"commenter": "mallory@example.com", "content": "forged", "timestamp": "2030-01-01T00:00:00"}}
+    assert test_client.post("/tasks/", json={**payload, "name": "Single"}).status_code == 200
+    assert test_client.post("/tasks/bulk", json={"tasks": [{**payload, "name": "Bulk"}]}).status_code == 200
+
+    for task in query_budget.db["tasks"].find({}):
+        assert task["comment_count"] == 0 and task["latest_comment"] is None
+
+
+def test_bulk_create_reports_request_indexes(test_client, query_budget):
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g", "members": ["user@example.com"], "tasks": []}).inserted_id)
+    query_budget.db["users"].insert_one({"email": "user@example.com", "name": "User"})
+    payload = {"assigned_to": ["user@example.com"], "name": "Twice", "description": "", "due_date": "2030-04-30",
+               "status": "To Do", "group": group_id, "priority": "High", "labels": []}
+
+    # the first task is left out of the duplicate check, the duplicate is still reported at its own position
+    response = test_client.post("/tasks/bulk", json={"tasks": [{**payload, "group": "0" * 24}, payload, payload]})
+    assert response.status_code == 400
+    assert [error["index"] for error in response.json()["detail"]] == [0, 2]
+    assert "twice" in response.json()["detail"][1]["detail"]
+
+    # a task that is already in the database
+    assert test_client.post("/tasks/", json=payload).status_code == 200
+    response = test_client.post("/tasks/bulk", json={"tasks": [{**payload, "name": "New"}, payload]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == [{"index": 1, "detail": "Task already exists for this user/subteam in the group"}]
+
+
+def test_board_order_and_moves(test_client, query_budget):
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g", "members": ["user@example.com"], "tasks": []}).inserted_id)
+    query_budget.db["users"].insert_one({"email": "user@example.com", "name": "User"})
+    payload = {"assigned_to": ["user@example.com"], "description": "", "due_date": "2030-04-30",
+               "status": "To Do", "group": group_id, "priority": "High", "labels": []}
+    ids = [test_client.post("/tasks/", json={**payload, "name": f"Task {i}"}).json()["id"] for i in range(3)]
+    ids += test_client.post("/tasks/bulk", json={"tasks": [{**payload, "name": f"Task {i}"} for i in (3, 4)]}).json()["ids"]
+
+    def column(status="To Do"):
+        return [task["name"] for task in test_client.get("/tasks/board", params={"group": group_id}).json()["columns"][status]]
+
+    assert column() == [f"Task {i}" for i in range(5)]
+
+    with query_budget(4):  # the three tasks, the move, counters and versions
+        response = test_client.put(f"/tasks/{ids[4]}/move", json={"previous_id": ids[0], "next_id": ids[1]})
+    assert response.status_code == 200
+    assert column() == ["Task 0", "Task 4", "Task 1", "Task 2", "Task 3"]
+    assert test_client.put(f"/tasks/{ids[2]}/move", json={"next_id": ids[0]}).status_code == 200
+    assert column() == ["Task 2", "Task 0", "Task 4", "Task 1", "Task 3"]
+
+    # to another column, which updates the counters
+    assert test_client.put(f"/tasks/{ids[1]}/move", json={"status": "In Progress"}).status_code == 200
+    assert column("In Progress") == ["Task 1"]
+    assert test_client.get("/tasks/stats", params={"group": group_id}).json()["group"]["status"]["In Progress"] == 1
+
+    # completing a task records when, for the archive
+    test_client.put(f"/tasks/{ids[1]}/move", json={"status": "Completed"})
+    assert test_client.get("/tasks/board", params={"group": group_id}).json()["columns"]["Completed"][0]["completed_at"]
+    test_client.put("/tasks/edit/", params={"task_id": ids[1]}, json={"updated_fields": {"status": "In Progress"}})
+    assert query_budget.db["tasks"].find_one({"name": "Task 1"})["completed_at"] is None
+
+    # neighbours from a stale board
+    assert test_client.put(f"/tasks/{ids[3]}/move", json={"previous_id": ids[4], "next_id": ids[2]}).status_code == 409
+    assert test_client.put(f"/tasks/{ids[3]}/move", json={"previous_id": ids[1]}).status_code == 400
+
+    # without neighbours a task goes to the bottom of the column
+    assert test_client.put(f"/tasks/{ids[2]}/move", json={}).status_code == 200
+    assert column() == ["Task 0", "Task 4", "Task 3", "Task 2"]
+    assert test_client.put(f"/tasks/{ids[0]}/move", json={"status": "In Progress"}).status_code == 200
+    assert column("In Progress") == ["Task 1", "Task 0"]
+
+
+def test_status_history_and_analytics(test_client, query_budget):
+    import asyncio
+    from db.status_log import roll_up_recent
+    group_id = str(query_budget.db["groups"].insert_one({"name": "g", "members": ["user@example.com"], "tasks": []}).inserted_id)
+    query_budget.db["users"].insert_one({"email": "user@example.com", "name": "User"})
+    payload = {"assigned_to": ["user@example.com"], "description": "", "due_date": "2030-04-30",
+               "status": "To Do", "group": group_id, "priority": "High", "labels": []}
+    task_id = test_client.post("/tasks/", json={**payload, "name": "Started"}).json()["id"]
+    test_client.post("/tasks/bulk", json={"tasks": [{**payload, "name": "Done", "status": "Completed"}]})
+    test_client.put(f"/tasks/{task_id}/move", json={"status": "In Progress"})
+    test_client.put("/tasks/edit/", params={"task_id": task_id}, json={"updated_fields": {"description": "same status"}})
+    test_client.put(f"/tasks/{task_id}/move", json={"status": "Completed"})
+
+    history = test_client.get(f"/tasks/{task_id}/history").json()
+    assert [(entry["from"], entry["to"]) for entry in history] == [(None, "To Do"), ("To Do", "In Progress"), ("In Progress", "Completed")]
+    completion = query_budget.db["status_log"].find_one({"task": task_id, "to": "Completed"})
+    assert completion["lead"] >= completion["cycle"] >= 0
+
+    assert asyncio.run(roll_up_recent()) == 2  # the group and the user, today
+    analytics = test_client.get("/tasks/analytics", params={"group": group_id, "weeks": 3}).json()
+    assert (analytics["created"], analytics["completed"]) == (2, 2)
+    assert analytics["lead_time_hours"] is not None and analytics["cycle_time_hours"] is not None
+    assert [week["completed"] for week in analytics["weekly"]] == [0, 0, 2]
+    assert len(analytics["daily"]) == 1
+    assert test_client.get("/tasks/analytics", params={"user": "user@example.com"}).json()["completed"] == 2
+    assert test_client.get("/tasks/analytics").status_code == 400
+
+
+def test_rebalance_column_keeps_the_order(query_budget):
+    import asyncio
+    from db.task_rank import rank_between, rebalance_column, needs_rebalance
+    ranks = ["V", "W"]
+    for _ in range(120):  # always moving into the same gap
+        ranks.insert(1, rank_between(ranks[0], ranks[1]))
+    assert needs_rebalance(max(ranks, key=len))
+    query_budget.db["tasks"].insert_many([{"group": "g", "status": "To Do", "rank": r, "n": i} for i, r in enumerate(ranks)])
+
+    assert asyncio.run(rebalance_column("g", "To Do")) == len(ranks)
+    tasks = list(query_budget.db["tasks"].find().sort("rank", 1))
+    assert [task["n"] for task in tasks] == list(range(len(ranks)))
+    assert not any(needs_rebalance(task["rank"]) for task in tasks)
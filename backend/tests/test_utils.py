@@ -0,0 +1,61 @@
+import jwt
+import pytest
+from fastapi import HTTPException
+import api.utils as utils
+
+
+def make_token(email):
+    return jwt.encode({"id": "dummy_user_id", "email": email}, "test_secret", algorithm="HS256")
+
+
+def test_get_current_user_is_cached_until_invalidated(monkeypatch):
+    monkeypatch.setattr(utils, "JWT_SECRET", "test_secret")
+    utils.principal_cache.clear()
+
+    # count database lookups and record the projection used
+    calls = []
+    def fake_find_one(query, projection):
+        calls.append(projection)
+        return {"_id": "dummy_user_id", "email": query["email"], "name": "Test User"}
+    from db.database import users_collection
+    monkeypatch.setattr(users_collection, "find_one", fake_find_one)
+
+    token = make_token("user@example.com")
+    assert utils.get_current_user(token)["name"] == "Test User"
+    assert utils.get_current_user(token)["email"] == "user@example.com"
+    # second call is served from the cache, and only identity fields are requested
+    assert calls == [utils.PRINCIPAL_PROJECTION]
+    assert "password" not in utils.PRINCIPAL_PROJECTION
+
+    utils.invalidate_principal("user@example.com")
+    utils.get_current_user(token)
+    assert len(calls) == 2
+
+
+def test_get_current_user_unknown_user(monkeypatch):
+    monkeypatch.setattr(utils, "JWT_SECRET", "test_secret")
+    utils.principal_cache.clear()
+    from db.database import users_collection
+    monkeypatch.setattr(users_collection, "find_one", lambda query, projection: None)
+
+    with pytest.raises(HTTPException) as error:
+        utils.get_current_user(make_token("unknown@example.com"))
+    assert error.value.status_code == 401
+
+
+def test_principal_cache_evicts_least_recently_used():
+    cache = utils.PrincipalCache(max_size=2, ttl=60)
+    cache.set("a@example.com", {"email": "a@example.com"})
+    cache.set("b@example.com", {"email": "b@example.com"})
+    cache.get("a@example.com")
+    cache.set("c@example.com", {"email": "c@example.com"})
+
+    assert cache.get("b@example.com") is None
+    assert cache.get("a@example.com") == {"email": "a@example.com"}
+    assert cache.get("c@example.com") == {"email": "c@example.com"}
+
+
+def test_principal_cache_entries_expire():
+    cache = utils.PrincipalCache(max_size=2, ttl=-1)
+    cache.set("a@example.com", {"email": "a@example.com"})
+    assert cache.get("a@example.com") is None
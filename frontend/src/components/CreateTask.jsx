@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import * as Dialog from "@radix-ui/react-dialog";
 import { Cross2Icon } from "@radix-ui/react-icons";
 import axios from "axios";
@@ -17,6 +17,8 @@ const CreateTask = ({ projectName, projectId, onCreate }) => {
 
   // NEW: Text input for comma-separated labels
   const [labelString, setLabelString] = useState("");
+  // resubmitting the same form (e.g. after a network error) reuses the key, so the task is created only once
+  const lastAttempt = useRef({ body: null, key: null });
 
   useEffect(() => {
     console.log("CreateTask component mounted. Checking projectId:", projectId);
@@ -176,9 +178,14 @@ const CreateTask = ({ projectName, projectId, onCreate }) => {
 
       console.log("Creating task with data:", taskData);
 
+      const body = JSON.stringify(taskData);
+      if (lastAttempt.current.body !== body) {
+        lastAttempt.current = { body, key: crypto.randomUUID() };
+      }
       const response = await axios.post("/tasks/", taskData, {
-        headers: { Authorization: `Bearer ${user.token}` },
+        headers: { Authorization: `Bearer ${user.token}`, "Idempotency-Key": lastAttempt.current.key },
       });
+      lastAttempt.current = { body: null, key: null };
 
       console.log("Task Created:", response.data);
 
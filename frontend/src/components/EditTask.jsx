@@ -17,7 +17,7 @@ const EditTask = ({ task, onEdit, onClose }) => {
     if (task) {
       setTaskName(task.name || "");
       setTaskDescription(task.description || "");
-      setDueDate(task.due_date || "");
+      setDueDate((task.due_date || "").slice(0, 10));
       setTaskPriority(task.priority || "Medium");
       setLabelString(Array.isArray(task.labels) ? task.labels.join(", ") : "");
     }
@@ -50,15 +50,14 @@ const Sidebar = () => {
       const user = JSON.parse(localStorage.getItem("user"));
       if (!user || !user.token || !user.email) return;
       try {
-        const response = await axios.post(
-          "/api/notifications/get_notifications_by_user",
-          { user_email: user.email },
-          { headers: { Authorization: `Bearer ${user.token}` } }
+        const response = await axios.get(
+          "/api/notifications/get_unread_notifications_by_user",
+          {
+            params: { user_email: user.email },
+            headers: { Authorization: `Bearer ${user.token}` },
+          }
         );
-        const unread = response.data.notifications.filter(
-          (notification) => !notification.read
-        );
-        setUnreadCount(unread.length);
+        setUnreadCount(response.data.notifications.length);
       } catch (err) {
         console.error(
           "Error fetching unread notifications:",
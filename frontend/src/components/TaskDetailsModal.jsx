@@ -17,15 +17,38 @@ function TaskDetailsModal({ visible, onClose, task }) {
   const diffDays = Math.ceil(diffMs / (1000 * 60 * 60 * 24));
   const daysLeftText = diffDays > 0 ? `${diffDays} days left` : "Due date passed";
 
-  // Local state for comments
-  const [comments, setComments] = useState(task.comments || []);
+  // Local state for comments (loaded page by page, shown oldest first)
+  const [comments, setComments] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
   const [newComment, setNewComment] = useState("");
 
+  // Fetch a page of comments; pages come newest first, `cursor` asks for older ones
+  const fetchComments = async (cursor) => {
+    try {
+      const user = JSON.parse(localStorage.getItem("user"));
+      if (!user?.token) return;
+
+      const response = await axios.get(`/tasks/${task.id}/comments`, {
+        headers: { Authorization: `Bearer ${user.token}` },
+        params: { cursor },
+      });
+      const page = [...response.data].reverse();
+      setComments((prev) => (cursor ? [...page, ...prev] : page));
+      setOlderCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      console.error("Failed to load comments:", error);
+    }
+  };
+
   // Reset local comment state if `task` changes
   useEffect(() => {
-    setComments(task.comments || []);
+    setComments([]);
+    setOlderCursor(null);
     setNewComment("");
-  }, [task]);
+    if (visible && task.comment_count > 0) {
+      fetchComments(null);
+    }
+  }, [task, visible]);
 
   // Update the task’s status
   const handleStatusChange = async (newStatus) => {
@@ -107,7 +130,7 @@ function TaskDetailsModal({ visible, onClose, task }) {
           {/* Task Info */}
           <Dialog.Description className="DialogDescription" style={{ marginRight: "2.5rem" }}>
             <div style={{ marginTop: "0.2rem" }}>
-              <strong>Due:</strong> {task.due_date} ({daysLeftText})
+              <strong>Due:</strong> {task.due_date?.slice(0, 10)} ({daysLeftText})
             </div>
             <div style={{ margin: "0.2rem 0" }}>
               <strong>Description:</strong>{" "}
@@ -176,6 +199,14 @@ function TaskDetailsModal({ visible, onClose, task }) {
 
             {/* Existing Comments */}
             <div style={{ marginTop: "0.6rem" }}>
+              {olderCursor && (
+                <button
+                  className="show-older-comments-btn"
+                  onClick={() => fetchComments(olderCursor)}
+                >
+                  Show older comments
+                </button>
+              )}
               {comments.length === 0 ? (
                 <div style={{ fontStyle: "italic", color: "#777" }}>
                   No comments yet.
@@ -96,14 +96,21 @@ export default function HomePage() {
           setLoading(false);
           return;
         }
-        const response = await axios.get("/tasks/", {
-          headers: { Authorization: `Bearer ${user.token}` },
-          params: { assigned_to: user.email },
-        });
-        if (response.data) {
+        // tasks come in pages; follow X-Next-Cursor until the last one
+        let allTasks = [];
+        let cursor = null;
+        do {
+          const response = await axios.get("/tasks/", {
+            headers: { Authorization: `Bearer ${user.token}` },
+            params: { assigned_to: user.email, cursor },
+          });
+          allTasks = allTasks.concat(response.data);
+          cursor = response.headers["x-next-cursor"];
+        } while (cursor);
+        if (allTasks) {
 
           const priorityOrder = { High: 0, Medium: 1, Low: 2 };
-          const sortedTasks = response.data.sort((a, b) => {
+          const sortedTasks = allTasks.sort((a, b) => {
             const prioA = priorityOrder[a.priority] ?? 999;
             const prioB = priorityOrder[b.priority] ?? 999;
             if (prioA !== prioB) return prioA - prioB;
@@ -266,7 +273,7 @@ export default function HomePage() {
                           <strong>Project:</strong> {projects[task.group] || "Unknown Project"}
                         </p>
                         <div className="task-card-footer">
-                          <span className="task-date">{task.due_date}</span>
+                          <span className="task-date">{task.due_date?.slice(0, 10)}</span>
                           <div className="task-labels">
                             {task.labels &&
                               task.labels.map((label, index) => (
@@ -295,7 +302,7 @@ export default function HomePage() {
                           <strong>Project:</strong> {projects[task.group] || "Unknown Project"}
                         </p>
                         <div className="task-card-footer">
-                          <span className="task-date">{task.due_date}</span>
+                          <span className="task-date">{task.due_date?.slice(0, 10)}</span>
                           <div className="task-labels">
                             {task.labels &&
                               task.labels.map((label, index) => (
@@ -324,7 +331,7 @@ export default function HomePage() {
                           <strong>Project:</strong> {projects[task.group] || "Unknown Project"}
                         </p>
                         <div className="task-card-footer">
-                          <span className="task-date">{task.due_date}</span>
+                          <span className="task-date">{task.due_date?.slice(0, 10)}</span>
                           <div className="task-labels">
                             {task.labels &&
                               task.labels.map((label, index) => (
@@ -16,18 +16,16 @@ const NotificationsPage = () => {
       }
 
       try {
-        // Fetch all notifications for user
-        const response = await axios.post(
-          "/api/notifications/get_notifications_by_user",
-          { user_email: user.email },
-          { headers: { Authorization: `Bearer ${user.token}` } }
+        // Fetch the user's unread notifications
+        const response = await axios.get(
+          "/api/notifications/get_unread_notifications_by_user",
+          {
+            params: { user_email: user.email },
+            headers: { Authorization: `Bearer ${user.token}` },
+          }
         );
 
-        // If you only want to show unread notifications, you can filter them here:
-        const unreadNotifications = response.data.notifications.filter(
-          (notification) => !notification.read
-        );
-        setNotifications(unreadNotifications);
+        setNotifications(response.data.notifications);
       } catch (err) {
         console.error(
           "Error loading notifications:",
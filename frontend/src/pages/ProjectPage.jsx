@@ -116,15 +116,22 @@ function ProjectPage() {
           return;
         }
 
-        const response = await axios.get("/tasks/", {
-          headers: { Authorization: `Bearer ${user.token}` },
-        });
-
-        if (response.data) {
+        // tasks come in pages; follow X-Next-Cursor until the last one
+        let allTasks = [];
+        let cursor = null;
+        do {
+          const response = await axios.get("/tasks/", {
+            headers: { Authorization: `Bearer ${user.token}` },
+            params: { group: projectId, cursor },
+          });
+          allTasks = allTasks.concat(response.data);
+          cursor = response.headers["x-next-cursor"];
+        } while (cursor);
+
+        if (allTasks) {
           // Sort by priority first, then due date
           const priorityOrder = { High: 0, Medium: 1, Low: 2 };
-          const projectTasks = response.data
-            .filter((task) => task.group === projectId)
+          const projectTasks = allTasks
             .sort((a, b) => {
               const prioA = priorityOrder[a.priority] ?? 999;
               const prioB = priorityOrder[b.priority] ?? 999;
@@ -338,7 +345,7 @@ function ProjectPage() {
                         </p>
                       )}
                       <div className="task-card-footer">
-                        <span className="task-date">{task.due_date}</span>
+                        <span className="task-date">{task.due_date?.slice(0, 10)}</span>
                         <div className="task-labels">
                           {task.labels &&
                             task.labels.map((label, index) => (
@@ -374,7 +381,7 @@ function ProjectPage() {
                         </p>
                       )}
                       <div className="task-card-footer">
-                        <span className="task-date">{task.due_date}</span>
+                        <span className="task-date">{task.due_date?.slice(0, 10)}</span>
                         <div className="task-labels">
                           {task.labels &&
                             task.labels.map((label, index) => (
@@ -410,7 +417,7 @@ function ProjectPage() {
                         </p>
                       )}
                       <div className="task-card-footer">
-                        <span className="task-date">{task.due_date}</span>
+                        <span className="task-date">{task.due_date?.slice(0, 10)}</span>
                         <div className="task-labels">
                           {task.labels &&
                             task.labels.map((label, index) => (